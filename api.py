@@ -1,58 +1,721 @@
-from typing import Optional
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
-from chatbot.nlp import predict_intent
-from chatbot.handlers import handle_intent
+from chatbot.config import (
+    CHAT_DEGRADE_ON_OVERLOAD,
+    CHAT_DEGRADE_QUEUE_SECONDS,
+    CHAT_EXECUTOR_BACKEND,
+    CHAT_EXECUTOR_WORKERS,
+    CHAT_MAX_CONCURRENCY,
+    CHAT_MAX_QUEUE,
+    CHAT_REQUEST_TIMEOUT_SECONDS,
+)
+from chatbot.executor import ChatExecutor, DeadlineExceeded, Expired, Overloaded, QueueFull
+from chatbot.faq import DEFAULT_TENANT, FAQ_INDEXES, tenant_exists
+from chatbot.interaction_log import INTERACTION_LOG
+from chatbot.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_SECONDS,
+    REQUESTS_DEGRADED,
+    REQUESTS_SHED,
+    CallbackMetric,
+)
+from chatbot.nlp import (
+    FAST_PATH,
+    MODEL_WATCHER,
+    active_model_version,
+    model_info,
+    rollback_model,
+    swap_model,
+)
+from chatbot.handlers import (
+    ORDER_LOG,
+    ORDER_REFRESHER,
+    start_order_refresher,
+    stop_order_refresher,
+)
+from chatbot.pipeline import (
+    cache_stats,
+    classify_turn,
+    degraded_turn,
+    finish_turn,
+    run_chat_batch,
+    run_chat_turn,
+    warm_caches,
+)
+from chatbot.profiling import REQUEST_PROFILER, profiled_call
+from chatbot.sessions import SESSION_STORE
+
+CHAT_EXECUTOR = ChatExecutor(
+    backend=CHAT_EXECUTOR_BACKEND,
+    workers=CHAT_EXECUTOR_WORKERS,
+    max_concurrency=CHAT_MAX_CONCURRENCY,
+    timeout=CHAT_REQUEST_TIMEOUT_SECONDS,
+    max_queue=CHAT_MAX_QUEUE,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-compute replies for the most common messages before serving
+    warm_caches()
+    # Replay the order write log; pick up order status changes without restarting
+    start_order_refresher()
+    # Follow model swaps made through other workers
+    MODEL_WATCHER.start()
+    # Start the pipeline workers (process workers preload models here)
+    CHAT_EXECUTOR.start()
+    yield
+    CHAT_EXECUTOR.shutdown()
+    # Write out buffered interactions before exiting
+    INTERACTION_LOG.close()
+    MODEL_WATCHER.stop()
+    # Commits pending order changes before closing the log
+    stop_order_refresher()
+
 
 app = FastAPI(
     title="Customer Support Chatbot API",
     description="FastAPI backend for intent classification and chatbot replies.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-
 class ChatRequest(BaseModel):
     message: str
     last_intent: Optional[str] = None  # for multi-turn flows (optional)
+    session_id: Optional[str] = None  # server-side context instead of last_intent
+    tenant: Optional[str] = None  # FAQ set for fallback answers (default if omitted)
 
 
 class ChatResponse(BaseModel):
     intent: str
     reply: str
     next_intent: Optional[str] = None  # frontend can store this for context
+    model_version: Optional[str] = None  # intent model that produced the reply
+    session_id: Optional[str] = None  # send back on the next turn
+    degraded: bool = False  # answered without the model (server overloaded)
+
+
+class ModelSwapRequest(BaseModel):
+    version: str
+
+
+class FastPathToggle(BaseModel):
+    enabled: bool
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool
+    sample_rate: Optional[float] = None  # share of requests profiled (0-1)
+    mode: Optional[str] = None  # "cprofile" or "sample"
+    sample_interval_seconds: Optional[float] = None
+    min_latency_seconds: Optional[float] = None  # only keep slower requests
+    duration_seconds: Optional[float] = None  # stop again after this long
+
+
+class ChatBatchRequest(BaseModel):
+    messages: List[ChatRequest]
+
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]
+
+
+def _to_response(turn, session_id: str | None = None) -> ChatResponse:
+    return ChatResponse(
+        intent=turn.intent,
+        reply=turn.reply,
+        next_intent=turn.next_intent,
+        model_version=turn.model_version,
+        session_id=session_id,
+        degraded=turn.degraded,
+    )
+
+
+def _open_session(request: ChatRequest):
+    """
+    (session_id, state, context) for a chat request; context is the
+    (last_intent, last_order_id) to run the turn with. Unknown or expired
+    session IDs start a new session under a new ID. Requests without a
+    session_id stay stateless (last_intent from the payload).
+    """
+    if request.session_id is None:
+        return None, None, (request.last_intent, None)
+    state = SESSION_STORE.get(request.session_id)
+    session_id = request.session_id
+    if state is None:
+        session_id, state = SESSION_STORE.create()
+    return session_id, state, (state.last_intent, state.last_order_id)
+
+
+def _tenant(tenant: str | None) -> str | None:
+    """
+    Validated FAQ tenant of a request (None for the default one); 404 if
+    it has no FAQ data.
+    """
+    if tenant is None or tenant == DEFAULT_TENANT:
+        return None
+    if not tenant_exists(tenant):
+        raise HTTPException(status_code=404, detail=f"Unknown tenant {tenant!r}")
+    return tenant
+
+
+def _queued_seconds(request_start: str | None) -> float:
+    """
+    How long ago the request was sent, from an X-Request-Start header
+    ("t=<epoch>" or "<epoch>" in s, ms or µs, as set by load balancers
+    and benchmarks/load_test.py); 0 if absent or malformed. Covers the
+    time spent waiting for the event loop, which CHAT_EXECUTOR can't see.
+    """
+    if not request_start:
+        return 0.0
+    try:
+        sent = float(request_start.removeprefix("t="))
+    except ValueError:
+        return 0.0
+    if sent > 1e14:
+        sent /= 1e6
+    elif sent > 1e11:
+        sent /= 1e3
+    return max(0.0, time.time() - sent)
+
+
+def _profile_mode(request: Request) -> str | None:
+    """
+    Profile mode for this request (see chatbot/profiling.py), or None.
+    """
+    # A single attribute check while profiling is off
+    if not REQUEST_PROFILER.enabled:
+        return None
+    return REQUEST_PROFILER.choose(request.headers.get(REQUEST_PROFILER.header))
+
+
+def _deadline(request_timeout: float | None, queued: float = 0.0) -> float | None:
+    """
+    Time left for a request: the server's deadline, or the client's
+    X-Request-Timeout if that is shorter, minus the time it has already
+    been queued.
+    """
+    timeout = CHAT_EXECUTOR.timeout
+    if request_timeout is not None and request_timeout > 0:
+        timeout = request_timeout if timeout is None else min(timeout, request_timeout)
+    if timeout is None:
+        return None
+    return timeout - queued
+
+
+async def _run_pipeline(
+    endpoint: str,
+    fn,
+    *args,
+    timeout: float | None = None,
+    queued: float = 0.0,
+    degrade=None,
+    profile: str | None = None,
+):
+    """
+    Run a blocking pipeline call on CHAT_EXECUTOR so the event loop (and
+    /health) stays responsive, mapping overload / deadline to HTTP errors.
+
+    If the request is shed for overload (executor queue full, no slot
+    in time, or already `queued` CHAT_DEGRADE_QUEUE_SECONDS before
+    reaching here) and `degrade` is given, return degrade() (a cheap
+    reply built on the event loop) instead of a 503. Requests whose
+    deadline has passed get a 504 without running. Latency is recorded
+    per endpoint and outcome.
+
+    With a `profile` mode, fn runs under that profiler in the worker and
+    the profile is saved tagged with the intent and latency.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        if timeout is not None and timeout <= 0:
+            raise Expired("Deadline passed before the request was handled")
+        if degrade is not None and queued >= CHAT_DEGRADE_QUEUE_SECONDS:
+            REQUESTS_SHED.labels(endpoint, "queue_age").inc()
+            outcome = "degraded"
+            return degrade()
+        if profile is None:
+            result = await CHAT_EXECUTOR.run(fn, *args, timeout=timeout)
+        else:
+            result, data = await CHAT_EXECUTOR.run(
+                profiled_call, profile, REQUEST_PROFILER.interval, fn, *args, timeout=timeout
+            )
+            # File I/O: off the event loop
+            await asyncio.to_thread(
+                REQUEST_PROFILER.save,
+                profile, data, endpoint, getattr(result, "intent", "batch"), time.perf_counter() - start,
+            )
+        outcome = "ok"
+        return result
+    except Overloaded as exc:
+        REQUESTS_SHED.labels(endpoint, "queue_full" if isinstance(exc, QueueFull) else "no_slot").inc()
+        if degrade is not None:
+            outcome = "degraded"
+            return degrade()
+        outcome = "overloaded"
+        raise HTTPException(status_code=503, detail=str(exc))
+    except DeadlineExceeded as exc:
+        if isinstance(exc, Expired):
+            # The client has given up: no point answering in degraded mode
+            REQUESTS_SHED.labels(endpoint, "expired").inc()
+            outcome = "expired"
+        else:
+            outcome = "timeout"
+        raise HTTPException(status_code=504, detail=str(exc))
+    finally:
+        REQUEST_SECONDS.labels(endpoint, outcome).observe_since(start)
+
+
+# Stats already tracked elsewhere, read at scrape time
+def _cache_metric(field: str) -> dict:
+    return {(name,): stats[field] for name, stats in cache_stats().items()}
+
+
+REGISTRY.register(CallbackMetric(
+    "chatbot_cache_hits_total", "Reply cache hits.", ("cache",),
+    lambda: _cache_metric("hits"), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_cache_misses_total", "Reply cache misses.", ("cache",),
+    lambda: _cache_metric("misses"), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_executor_in_flight", "Chat requests currently in the pipeline.", (),
+    lambda: {(): CHAT_EXECUTOR.in_flight},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_executor_waiting", "Chat requests waiting for a pipeline slot.", (),
+    lambda: {(): CHAT_EXECUTOR.waiting},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_sessions_active", "Conversation sessions held by the session store.", (),
+    lambda: {(): len(SESSION_STORE)},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_websocket_connections", "Open /ws/chat connections.", (),
+    lambda: {(): WS_CONNECTIONS["open"]},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_faq_index_bytes", "Estimated memory of each loaded tenant FAQ index.", ("tenant",),
+    lambda: {(t,): s["bytes"] for t, s in FAQ_INDEXES.stats()["tenants"].items()},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_faq_index_load_seconds", "Load time of each loaded tenant FAQ index.", ("tenant",),
+    lambda: {(t,): s["load_seconds"] for t, s in FAQ_INDEXES.stats()["tenants"].items()},
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_faq_index_evictions_total", "Tenant FAQ indexes evicted from memory.", (),
+    lambda: {(): FAQ_INDEXES.evictions}, kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_order_writes_total", "Order changes submitted to the order write log, by outcome.", ("result",),
+    lambda: {
+        ("committed",): ORDER_LOG.writes,
+        ("rejected",): ORDER_LOG.rejected,
+        ("withdrawn",): ORDER_LOG.withdrawn,
+    },
+    kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_order_log_fsyncs_total", "fsyncs of the order write log (one per group commit).", (),
+    lambda: {(): ORDER_LOG.fsyncs}, kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "chatbot_interaction_log_dropped_total", "Interaction log rows dropped.", (),
+    lambda: {(): INTERACTION_LOG.rows_dropped}, kind="counter",
+))
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "model_version": active_model_version()}
+
+
+# -------------------------
+# Admin: model versions
+# -------------------------
+
+
+@app.get("/admin/model")
+async def model_status():
+    """
+    Active / previous model version and all registered versions.
+    """
+    return model_info()
+
+
+@app.post("/admin/model/swap")
+async def model_swap(payload: ModelSwapRequest):
+    """
+    Load a registered version in the background, warm it, then switch
+    traffic to it. Other workers follow via the registry manifest.
+    """
+    try:
+        # Unpickling + warm-up happen off the event loop
+        active = await asyncio.to_thread(swap_model, payload.version)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc.args[0]))
+    return {"active": active}
+
+
+@app.post("/admin/model/rollback")
+async def model_rollback():
+    """
+    Switch back to the previously active model version.
+    """
+    try:
+        active = await asyncio.to_thread(rollback_model)
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc.args[0]))
+    return {"active": active}
+
+
+# -------------------------
+# Admin: rule-based fast path
+# -------------------------
+
+
+@app.get("/admin/fast-path")
+async def fast_path_status():
+    """
+    On / off, exact-match table size, hits per rule and intent, misses and
+    the share of messages that skipped the model.
+    """
+    return FAST_PATH.stats()
+
+
+@app.post("/admin/fast-path")
+async def fast_path_toggle(payload: FastPathToggle):
+    """
+    Turn the fast path on or off in this process, e.g. to compare latency
+    with and without it. Restarts go back to FAST_PATH_ENABLED.
+    """
+    FAST_PATH.enabled = payload.enabled
+    return FAST_PATH.stats()
+
+
+# -------------------------
+# Admin: request profiling
+# -------------------------
+
+
+@app.get("/admin/profiling")
+async def profiling_status():
+    """
+    Profiling on / off, settings, profiles written and the latest files.
+    """
+    return REQUEST_PROFILER.stats()
+
+
+@app.post("/admin/profiling")
+async def profiling_toggle(payload: ProfilingSettings):
+    """
+    Start or stop profiling /chat and /chat/batch requests in this
+    process; settings left out keep their current values.
+    """
+    try:
+        REQUEST_PROFILER.configure(
+            enabled=payload.enabled,
+            sample_rate=payload.sample_rate,
+            mode=payload.mode,
+            interval=payload.sample_interval_seconds,
+            min_latency=payload.min_latency_seconds,
+            duration=payload.duration_seconds,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return REQUEST_PROFILER.stats()
+
+
+@app.get("/faq/tenants")
+async def faq_tenant_stats():
+    """
+    Loaded tenant FAQ indexes (least recently used first) with their
+    memory and load time, plus load / coalesced / eviction counters.
+    """
+    return FAQ_INDEXES.stats()
+
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Hit / miss / eviction counters for the intent, FAQ and analysis caches.
+    """
+    return cache_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus metrics: per-stage latency histograms, request latency,
+    intent / FAQ / order lookup counters, cache and executor stats.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/executor/stats")
+async def executor_stats():
+    """
+    Backend, in-flight requests and rejected / timed-out counts of the
+    chat pipeline executor.
+    """
+    return CHAT_EXECUTOR.stats()
+
+
+@app.get("/logs/stats")
+async def interaction_log_stats():
+    """
+    Buffered / written / dropped rows and flush timing of the interaction log.
+    """
+    return INTERACTION_LOG.stats()
+
+
+@app.get("/orders/refresh/stats")
+async def order_refresh_stats():
+    """
+    Rows applied, refresh lag and errors of the background order refresher.
+    """
+    return ORDER_REFRESHER.stats()
+
+
+@app.get("/orders/writes/stats")
+async def order_write_stats():
+    """
+    Writes, commits / fsyncs (group commit batch sizes), replayed records
+    and errors of the order write log.
+    """
+    return ORDER_LOG.stats()
+
+
+@app.post("/sessions")
+async def create_session():
+    """
+    Start a conversation whose context is kept on the server; pass the
+    returned session_id with every /chat message.
+    """
+    session_id, _ = SESSION_STORE.create()
+    return {"session_id": session_id}
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Forget a conversation (e.g. when the user clears the chat).
+    """
+    if not SESSION_STORE.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"deleted": session_id}
+
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """
+    Size, TTL and hit / expiry / eviction counters of the session store.
+    """
+    return SESSION_STORE.stats()
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(payload: ChatRequest):
+async def chat_endpoint(
+    payload: ChatRequest,
+    request: Request,
+    x_request_timeout: Optional[float] = Header(None),
+    x_request_start: Optional[str] = Header(None),
+):
     """
     Main chatbot endpoint.
 
-    - Takes user message (and optional last_intent)
+    - Takes user message and either a session_id (context kept on the
+      server) or an optional last_intent, plus an optional tenant whose
+      FAQ set answers fallbacks
     - Predicts intent
-    - Returns reply + next_intent for the client to store
+    - Returns reply + next_intent / session_id for the client to store
+    - Under overload, answers without the model (degraded: true) instead
+      of a 503; an X-Request-Timeout header (seconds) shortens the
+      deadline, after which queued work is dropped (504). Deadlines count
+      from X-Request-Start if the client or load balancer sets it
+    - While profiling is on (/admin/profiling), a sampled request or one
+      sending X-Profile is profiled
+    """
+    queued = _queued_seconds(x_request_start)
+    tenant = _tenant(payload.tenant)
+    session_id, state, context = _open_session(payload)
+
+    def degrade():
+        turn, source = degraded_turn(payload.message, *context, tenant)
+        REQUESTS_DEGRADED.labels("/chat", source).inc()
+        return turn
+
+    turn = await _run_pipeline(
+        "/chat", run_chat_turn, payload.message, *context, tenant,
+        timeout=_deadline(x_request_timeout, queued),
+        queued=queued,
+        degrade=degrade if CHAT_DEGRADE_ON_OVERLOAD else None,
+        profile=_profile_mode(request),
+    )
+    if session_id is not None:
+        SESSION_STORE.put(session_id, state.advance(turn))
+    INTERACTION_LOG.log(payload.message.strip(), turn.intent, turn.reply)
+    return _to_response(turn, session_id)
+
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(
+    payload: ChatBatchRequest,
+    request: Request,
+    x_request_timeout: Optional[float] = Header(None),
+    x_request_start: Optional[str] = Header(None),
+):
+    """
+    Batch version of /chat for bulk ingestion (email, other channels).
+
+    - Each item carries its own message and optional last_intent or
+      session_id (items are independent: several messages of the same
+      session in one batch all see its state from before the batch)
+    - Items that need the classifier are predicted together in one call
+    - Results are returned in the same order as the request
+    """
+    tenants = [_tenant(item.tenant) for item in payload.messages]
+    sessions = [_open_session(item) for item in payload.messages]
+    items = [
+        (item.message, *context, tenant)
+        for item, (_, _, context), tenant in zip(payload.messages, sessions, tenants)
+    ]
+    queued = _queued_seconds(x_request_start)
+    turns = await _run_pipeline(
+        "/chat/batch", run_chat_batch, items,
+        timeout=_deadline(x_request_timeout, queued),
+        queued=queued,
+        profile=_profile_mode(request),
+    )
+    for (session_id, state, _), turn in zip(sessions, turns):
+        if session_id is not None:
+            SESSION_STORE.put(session_id, state.advance(turn))
+    for item, turn in zip(payload.messages, turns):
+        INTERACTION_LOG.log(item.message.strip(), turn.intent, turn.reply, source="api_batch")
+    return ChatBatchResponse(results=[
+        _to_response(turn, session_id) for turn, (session_id, _, _) in zip(turns, sessions)
+    ])
+
+
+# -------------------------
+# WebSocket chat
+# -------------------------
+
+# Open connections now / accepted since startup
+WS_CONNECTIONS = {"open": 0, "total": 0}
+
+BAD_FRAME = 'Expected a JSON object like {"message": "...", "id": 1}'
+
+
+def _ws_error(msg_id, status: int, detail: str) -> dict:
+    return {"type": "error", "id": msg_id, "status": status, "detail": detail}
+
+
+async def _ws_turn(websocket: WebSocket, session_id: str, state, message: str, msg_id, tenant=None):
     """
-    user_text = payload.message.strip()
-    last_intent = payload.last_intent
+    One chat turn on a WebSocket: send the intent as soon as it is known,
+    then the reply. Returns the session state after the turn.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    user_text = message.strip()
+    timeout = CHAT_EXECUTOR.timeout
+    try:
+        intent, faq_match, model_version = await CHAT_EXECUTOR.run(
+            classify_turn, user_text, state.last_intent, tenant
+        )
+        await websocket.send_json({"type": "intent", "id": msg_id, "intent": intent})
+
+        # Both halves share one deadline, as a /chat request does
+        remaining = None if timeout is None else max(0.0, timeout - (time.perf_counter() - start))
+        turn = await CHAT_EXECUTOR.run(
+            finish_turn, intent, user_text, faq_match, state.last_order_id, tenant, model_version,
+            timeout=remaining,
+        )
+        outcome = "ok"
+    except Overloaded as exc:
+        outcome = "overloaded"
+        await websocket.send_json(_ws_error(msg_id, 503, str(exc)))
+        return state
+    except DeadlineExceeded as exc:
+        outcome = "timeout"
+        await websocket.send_json(_ws_error(msg_id, 504, str(exc)))
+        return state
+    finally:
+        REQUEST_SECONDS.labels("/ws/chat", outcome).observe_since(start)
 
-    # Simple multi-turn handling: if user sends only digits and last_intent was order-related
-    if user_text.isdigit() and last_intent in {"order_status", "cancel_order"}:
-        intent = last_intent
-    else:
-        intent = predict_intent(user_text)
+    await websocket.send_json({
+        "type": "reply",
+        "id": msg_id,
+        "intent": turn.intent,
+        "reply": turn.reply,
+        "next_intent": turn.next_intent,
+        "model_version": turn.model_version,
+    })
+    state = state.advance(turn)
+    SESSION_STORE.put(session_id, state)
+    INTERACTION_LOG.log(user_text, turn.intent, turn.reply, source="websocket")
+    return state
 
-    reply = handle_intent(intent, user_text)
 
-    # Decide what next_intent the client should remember
-    if intent in {"order_status", "cancel_order"}:
-        next_intent = intent
-    else:
-        next_intent = None
+@app.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: Optional[str] = None,
+    tenant: Optional[str] = None,
+):
+    """
+    Persistent chat channel: one conversation per connection.
 
-    return ChatResponse(intent=intent, reply=reply, next_intent=next_intent)
+    - Connect to /ws/chat (optionally ?session_id=... to resume and
+      ?tenant=... for a tenant's FAQ set); the first frame is
+      {"type": "session", "session_id": ...}, or a 404 error frame and a
+      close for an unknown tenant
+    - Send {"message": "...", "id": <any>} frames; they can be pipelined
+      without waiting for replies and are answered in order
+    - Each message gets an {"type": "intent"} frame as soon as it is
+      classified, then a {"type": "reply"} frame (same fields as /chat),
+      or an {"type": "error"} frame with an HTTP-style status
+    """
+    await websocket.accept()
+    try:
+        tenant = _tenant(tenant)
+    except HTTPException as exc:
+        await websocket.send_json(_ws_error(None, exc.status_code, exc.detail))
+        await websocket.close(code=1008)
+        return
+    state = SESSION_STORE.get(session_id) if session_id else None
+    if state is None:
+        session_id, state = SESSION_STORE.create()
+    WS_CONNECTIONS["open"] += 1
+    WS_CONNECTIONS["total"] += 1
+    try:
+        await websocket.send_json({"type": "session", "session_id": session_id})
+        while True:
+            data = await websocket.receive_text()
+            try:
+                frame = json.loads(data)
+                message, msg_id = frame["message"], frame.get("id")
+            except (ValueError, TypeError, KeyError, AttributeError):
+                await websocket.send_json(_ws_error(None, 400, BAD_FRAME))
+                continue
+            if not isinstance(message, str):
+                await websocket.send_json(_ws_error(msg_id, 400, BAD_FRAME))
+                continue
+            state = await _ws_turn(websocket, session_id, state, message, msg_id, tenant)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS["open"] -= 1
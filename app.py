@@ -1,40 +1,22 @@
-from pathlib import Path
+import time
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
-from chatbot.nlp import predict_intent
-from chatbot.handlers import handle_intent
-from chatbot.config import INTENT_RESPONSES
+from chatbot.handlers import start_order_refresher
+from chatbot.pipeline import run_chat_turn
+from chatbot.analytics import ANALYTICS, format_timestamp
+from chatbot.config import ANALYTICS_RECENT_SIZE, INTENT_RESPONSES, QUICK_QUESTIONS
+from chatbot.interaction_log import INTERACTION_LOG
+from chatbot.sessions import SESSION_STORE
 
 # -----------------------
-# Paths & logging helpers
+# Background services
 # -----------------------
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
-LOG_FILE = LOG_DIR / "interactions.csv"
-
-
-def log_interaction(user_text: str, intent: str, reply: str) -> None:
-    """
-    Append a single interaction (user message + intent + bot reply)
-    to logs/interactions.csv
-    """
-    now = datetime.now().isoformat(timespec="seconds")
-    df = pd.DataFrame(
-        [
-            {
-                "timestamp": now,
-                "intent": intent,
-                "user_text": user_text,
-                "bot_reply": reply,
-            }
-        ]
-    )
-    file_exists = LOG_FILE.exists()
-    df.to_csv(LOG_FILE, mode="a", index=False, header=not file_exists)
+# Keep order statuses fresh without restarting the app (no-op on reruns)
+start_order_refresher()
 
 
 # -----------------------
@@ -131,21 +113,23 @@ if "messages" not in st.session_state:
         }
     ]
 
-if "last_intent" not in st.session_state:
-    st.session_state.last_intent = None
+# Conversation context (last intent, last order ID) lives in the session
+# store; the browser session only keeps its ID
+session = SESSION_STORE.get(st.session_state.get("session_id", ""))
+if session is None:
+    st.session_state.session_id, session = SESSION_STORE.create()
+
+
+def clear_conversation() -> None:
+    st.session_state.pop("messages", None)
+    SESSION_STORE.delete(st.session_state.pop("session_id", ""))
 
 
 # ------------------- CHAT MODE -------------------
 
 if mode == "Chat":
     st.title("Customer Support Bot 🤖")
-    st.button(
-    "🧹 Clear conversation",
-    on_click=lambda: (
-        st.session_state.pop("messages", None),
-        st.session_state.pop("last_intent", None)
-    )
-    )
+    st.button("🧹 Clear conversation", on_click=clear_conversation)
     st.caption(
         "Ask me anything about your orders, refunds, shipping, or cancellations."
     )
@@ -155,21 +139,12 @@ if mode == "Chat":
 
     # Quick suggestion buttons
     st.markdown("**Quick questions (click to try):**")
-    col1, col2, col3, col4 = st.columns(4)
     preset_message = None
 
-    with col1:
-        if st.button("📦 Track my order"):
-            preset_message = "where is my order"
-    with col2:
-        if st.button("💰 Refund policy"):
-            preset_message = "what is your refund policy"
-    with col3:
-        if st.button("🚚 Shipping info"):
-            preset_message = "do you ship internationally"
-    with col4:
-        if st.button("🧑 Talk to human"):
-            preset_message = "i want to talk to a human"
+    for column, (label, message) in zip(st.columns(len(QUICK_QUESTIONS)), QUICK_QUESTIONS.items()):
+        with column:
+            if st.button(label):
+                preset_message = message
 
     st.markdown("<hr style='margin: 20px 0;'>", unsafe_allow_html=True)
 
@@ -215,25 +190,14 @@ if mode == "Chat":
         with st.chat_message("user", avatar="🧑"):
             st.markdown(message_to_process)
 
-        only_digits = message_to_process.strip().isdigit()
-        last_intent = st.session_state.get("last_intent")
-
-        # 2) Decide which intent to use (support multi-turn order ID flow)
-        if only_digits and last_intent in {"order_status", "cancel_order"}:
-            intent = last_intent
-        else:
-            intent = predict_intent(message_to_process)
+        # 2) Intent + reply, using the session for the multi-turn order flow
+        turn = run_chat_turn(message_to_process, session.last_intent, session.last_order_id)
+        intent, reply = turn.intent, turn.reply
 
-        # 3) Get bot reply
-        reply = handle_intent(intent, message_to_process)
+        # 3) Remember the context for the next message
+        SESSION_STORE.put(st.session_state.session_id, session.advance(turn))
 
-        # 4) Update simple memory for order/cancel flows
-        if intent in {"order_status", "cancel_order"}:
-            st.session_state.last_intent = intent
-        else:
-            st.session_state.last_intent = None
-
-        # 5) Show bot reply
+        # 4) Show bot reply
         st.session_state.messages.append(
             {
                 "role": "assistant",
@@ -245,8 +209,9 @@ if mode == "Chat":
         with st.chat_message("assistant", avatar="🤖"):
             st.markdown(reply)
 
-        # 6) Log interaction for analytics
-        log_interaction(message_to_process, intent, reply)
+        # 5) Log interaction for analytics
+        # (buffered; written to logs/interactions/ in the background)
+        INTERACTION_LOG.log(message_to_process, intent, reply, source="streamlit")
 
     # Close chat card wrapper
     st.markdown("</div>", unsafe_allow_html=True)
@@ -258,32 +223,64 @@ else:
     st.title("📊 Analytics Dashboard")
     st.caption("High-level overview of how users interact with the chatbot.")
 
-    if not LOG_FILE.exists():
+    # Range filter: answered from time buckets, no rescan of the log
+    RANGES = {
+        "All time": None,
+        "Last hour": 3600,
+        "Last 24 hours": 24 * 3600,
+        "Last 7 days": 7 * 24 * 3600,
+        "Last 30 days": 30 * 24 * 3600,
+    }
+    range_label = st.selectbox("Time range", list(RANGES))
+    window = RANGES[range_label]
+    start = time.time() - window if window else None
+
+    # Make this session's latest turns visible right away, then fold only
+    # the newly logged rows into the running aggregates
+    INTERACTION_LOG.flush()
+    ANALYTICS.refresh()
+    stats = ANALYTICS.store
+    summary = stats.summary(start)
+
+    if stats.total == 0:
         st.info("No interaction data yet. Use the Chat mode first.")
     else:
-        df = pd.read_csv(LOG_FILE)
 
         # ---- Metrics row ----
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Messages", len(df))
+            st.metric("Total Messages", summary["total"])
         with col2:
-            st.metric("Unique Intents", df["intent"].nunique())
+            st.metric("Unique Intents", summary["unique_intents"])
         with col3:
-            st.metric("Last Activity", df["timestamp"].max())
+            st.metric("Last Activity", summary["last_activity"] or "—")
 
         st.markdown("---")
 
         # ---- Messages per intent ----
         st.subheader("Messages by Intent")
-        intent_counts = df["intent"].value_counts().sort_values(ascending=False)
+        intent_counts = pd.Series(summary["intent_counts"], dtype="int64")
         st.bar_chart(intent_counts)
 
+        # ---- Messages over time ----
+        st.subheader("Messages over Time")
+        freq = "minute" if window is not None and window <= 24 * 3600 else "hour"
+        series = stats.series(start, freq=freq)
+        if series:
+            timeline = pd.Series(
+                [count for _, count in series],
+                index=pd.to_datetime([bucket for bucket, _ in series], unit="s"),
+                name="messages",
+            )
+            st.line_chart(timeline)
+
         # ---- Recent interactions ----
         st.subheader("Recent Interactions")
-        df_sorted = df.sort_values("timestamp", ascending=False)
-        st.dataframe(df_sorted.head(20), use_container_width=True)
+        recent = stats.recent_rows(ANALYTICS_RECENT_SIZE, start)
+        for row in recent:
+            row["timestamp"] = format_timestamp(row["timestamp"])
+        st.dataframe(pd.DataFrame(recent[:20]), use_container_width=True)
 
         # ---- Raw data expander ----
-        with st.expander("View full interaction log"):
-            st.dataframe(df, use_container_width=True)
+        with st.expander(f"View latest {len(recent)} interactions"):
+            st.dataframe(pd.DataFrame(recent), use_container_width=True)
@@ -0,0 +1,118 @@
+"""
+Dashboard render cost: the old approach (pd.read_csv of the whole log +
+value_counts / nunique / sort on every rerun) vs. the incremental
+aggregates in chatbot/analytics.py.
+
+Writes --rows synthetic interactions both as a CSV and as logger
+segments, then times:
+- old: full read + recompute (paid on every Streamlit rerun)
+- incremental: first build, rerun with nothing new, rerun after 100 new
+  rows, summary + series for a time range, restart from checkpoint
+
+Usage (from the repo root):
+    python -m benchmarks.analytics
+    python -m benchmarks.analytics --rows 3000000
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from chatbot.analytics import IncrementalAnalytics
+from chatbot.interaction_log import InteractionLogger
+
+INTENTS = ["order_status", "refund_policy", "shipping_info", "cancel_order",
+           "human_agent", "small_talk", "greeting", "fallback"]
+
+
+def timed(fn, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def make_rows(n: int, now: float) -> dict:
+    rng = random.Random(0)
+    timestamps = sorted(now - rng.random() * 90 * 86400 for _ in range(n))
+    return {
+        "timestamp": timestamps,
+        "intent": [rng.choice(INTENTS) for _ in range(n)],
+        "user_text": [f"message number {i}" for i in range(n)],
+        "bot_reply": ["Thanks for reaching out, here is what I found."] * n,
+        "source": ["api"] * n,
+    }
+
+
+def old_dashboard(csv_path: Path) -> None:
+    df = pd.read_csv(csv_path)
+    len(df)
+    df["intent"].nunique()
+    df["timestamp"].max()
+    df["intent"].value_counts().sort_values(ascending=False)
+    df.sort_values("timestamp", ascending=False).head(20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    now = time.time()
+    rows = make_rows(args.rows, now)
+    work = Path(tempfile.mkdtemp(prefix="analytics-bench-"))
+    try:
+        csv_path = work / "interactions.csv"
+        frame = pd.DataFrame(rows)
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s").dt.strftime("%Y-%m-%dT%H:%M:%S")
+        frame.drop(columns="source").to_csv(csv_path, index=False)
+
+        logger = InteractionLogger(work / "segments", flush_rows=100_000, buffer_size=args.rows + 1000)
+        for values in zip(*rows.values()):
+            ts, intent, user_text, reply, source = values
+            logger.log(user_text, intent, reply, source, timestamp=ts)
+        logger.flush()
+
+        def make():
+            return IncrementalAnalytics(work / "segments", work / "checkpoint.json",
+                                        legacy_csv=work / "none.csv")
+
+        old = timed(lambda: old_dashboard(csv_path))
+
+        analytics = make()
+        first = timed(analytics.refresh)
+        idle = timed(analytics.refresh, repeat=20)
+
+        def append_and_refresh():
+            for i in range(100):
+                logger.log("new message", "greeting", "Hi!", "api")
+            logger.flush()
+            analytics.refresh()
+        incremental = timed(append_and_refresh, repeat=10)
+
+        store = analytics.store
+        week = now - 7 * 86400
+        query = timed(lambda: (store.summary(week), store.series(week, freq="hour"),
+                               store.recent_rows(20, week)), repeat=50)
+        checkpoint = timed(analytics.save_checkpoint)
+        restart = timed(lambda: make().refresh())
+        logger.close()
+    finally:
+        shutil.rmtree(work)
+
+    print(f"rows: {args.rows:,}")
+    print(f"old: read_csv + recompute (every rerun)   {old * 1000:10.1f} ms")
+    print(f"incremental: first build (once)           {first * 1000:10.1f} ms")
+    print(f"incremental: rerun, nothing new           {idle * 1000:10.2f} ms")
+    print(f"incremental: rerun after 100 new rows     {incremental * 1000:10.2f} ms")
+    print(f"incremental: 7-day summary+series+recent  {query * 1000:10.2f} ms")
+    print(f"incremental: write checkpoint (<= 1/30s)  {checkpoint * 1000:10.1f} ms")
+    print(f"incremental: restart from checkpoint      {restart * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
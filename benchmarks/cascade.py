@@ -0,0 +1,134 @@
+"""
+Intent cascade: accuracy vs. cost of the first model alone, the cascade
+at several escalation thresholds, and always escalating.
+
+For every CV fold of data/intents.csv, both stages are trained on the
+other folds the way train_intent_model.py --cascade trains them, then
+every held-out message is classified one at a time through
+nlp.classify_vectors() (the same call the chat pipeline makes), with
+and without typos (--typo-rate: share of words with one character
+dropped, doubled or swapped).
+
+Reports accuracy ('fallback' counts as wrong), fallback rate, the share
+of messages answered by each stage and the per-message p50 / p99 latency.
+
+Usage (from the repo root):
+    python -m benchmarks.cascade
+    python -m benchmarks.cascade --thresholds 0.3 0.5 0.7 --typo-rate 0.3
+"""
+import argparse
+import random
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.model_selection import StratifiedKFold  # noqa: E402
+
+from benchmarks.event_loop import percentile  # noqa: E402
+from chatbot import metrics, nlp  # noqa: E402
+from train_intent_model import load_data, train_cascade_stage  # noqa: E402
+
+
+def add_typos(text: str, rate: float, rng: random.Random) -> str:
+    words = text.split()
+    for i, word in enumerate(words):
+        if len(word) > 3 and rng.random() < rate:
+            j = rng.randrange(len(word) - 1)
+            edit = rng.randrange(3)
+            if edit == 0:
+                word = word[:j] + word[j + 1:]
+            elif edit == 1:
+                word = word[:j] + word[j] + word[j:]
+            else:
+                word = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+            words[i] = word
+    return " ".join(words)
+
+
+def train_fold(X_train, y_train) -> nlp.ModelBundle:
+    # Same first stage as train_intent_model.train()
+    vectorizer = TfidfVectorizer(lowercase=True, ngram_range=(1, 2), stop_words="english")
+    clf = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(X_train), y_train)
+    stage_clf, stage_vectorizer = train_cascade_stage(X_train, y_train)
+    return nlp.ModelBundle(
+        version="bench", model=clf, vectorizer=vectorizer,
+        cascade=nlp.CascadeStage(stage_clf, stage_vectorizer),
+    )
+
+
+def run(folds: list, escalate_below: float | None, typo_rate: float, seed: int) -> dict:
+    """
+    escalate_below=None: first model only (no cascade stage).
+    """
+    rng = random.Random(seed)
+    before = dict(metrics.CASCADE_TOTAL.values())
+    correct = fallbacks = total = 0
+    latencies = []
+    for bundle, texts, labels in folds:
+        stage = bundle.cascade
+        if escalate_below is None:
+            bundle.cascade = None
+        else:
+            stage.escalate_below = escalate_below
+        for text, label in zip(texts, labels):
+            text = add_typos(text, typo_rate, rng) if typo_rate else text
+            start = time.perf_counter()
+            X_vec = bundle.vectorizer.transform([text])
+            intent, _ = nlp.classify_vectors(X_vec, 0.3, bundle, [text])[0]
+            latencies.append(time.perf_counter() - start)
+            correct += intent == label
+            fallbacks += intent == "fallback"
+            total += 1
+        bundle.cascade = stage
+
+    answered = {
+        labels[0]: count - before.get(labels, 0)
+        for labels, count in metrics.CASCADE_TOTAL.values().items()
+    }
+    return {
+        "accuracy": correct / total,
+        "fallback": fallbacks / total,
+        "stage1": answered.get("stage1", 0) / total,
+        "stage2": answered.get("stage2", 0) / total,
+        "p50_us": percentile(latencies, 0.5) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.7],
+                        help="escalation thresholds to try (stage 1 answers at >= this)")
+    parser.add_argument("--typo-rate", type=float, default=0.2)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    X, y = load_data()
+    X, y = X.astype(str).to_numpy(), y.astype(str).to_numpy()
+    splitter = StratifiedKFold(args.folds, shuffle=True, random_state=args.seed)
+    folds = [
+        (train_fold(X[train], y[train]), X[test], y[test])
+        for train, test in splitter.split(X, y)
+    ]
+    # Warm-up: first calls through sklearn / scipy are slower
+    run(folds[:1], 1.01, 0.0, args.seed)
+
+    configs = [("stage 1 only", None)]
+    configs += [(f"cascade <{t:g}", t) for t in args.thresholds]
+    configs += [("always stage 2", 1.01)]
+
+    print(f"\n{'messages':<9} {'mode':<15} {'accuracy':>8} {'fallback':>8} {'stage 1':>8} {'stage 2':>8} "
+          f"{'p50':>9} {'p99':>9}")
+    for name, typo_rate in (("clean", 0.0), ("typos", args.typo_rate)):
+        for mode, threshold in configs:
+            r = run(folds, threshold, typo_rate, args.seed)
+            print(f"{name:<9} {mode:<15} {r['accuracy']:>8.1%} {r['fallback']:>8.1%} {r['stage1']:>8.1%} "
+                  f"{r['stage2']:>8.1%} {r['p50_us']:>7.0f}us {r['p99_us']:>7.0f}us")
+
+
+if __name__ == "__main__":
+    main()
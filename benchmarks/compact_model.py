@@ -0,0 +1,122 @@
+"""
+Parity check and cold-start / RSS comparison: pickled sklearn model vs.
+the NumPy-only compact artifact (models/compact/).
+
+- parity: both paths must give the same intent and (to 1e-9) the same
+  probabilities on every training example, every FAQ question and a set
+  of odd inputs; exits non-zero otherwise
+- cold start: time and peak RSS of a fresh process that loads the model
+  and classifies one message, for each path
+
+Usage (from the repo root):
+    python -m benchmarks.compact_model
+    python -m benchmarks.compact_model --runs 10
+"""
+import argparse
+import json
+import pickle
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from chatbot.compact_model import CompactIntentModel
+
+MODEL_DIR = Path("models")
+
+EXTRA_TEXTS = [
+    "",
+    "   ",
+    "!!!",
+    "Where is my order 100123???",
+    "CANCEL ORDER NOW",
+    "ça va? ünïcödé text",
+    "hi hi hi hi hi",
+    "refund refund shipping",
+]
+
+# Each child process loads one model and classifies one message, then
+# reports wall time, peak RSS and whether sklearn got imported.
+COLD_START = {
+    "pickle": """
+import pickle
+with open("models/intent_classifier.pkl", "rb") as f:
+    model = pickle.load(f)
+with open("models/vectorizer.pkl", "rb") as f:
+    vectorizer = pickle.load(f)
+model.predict_proba(vectorizer.transform(["where is my order"]))
+""",
+    "compact": """
+from chatbot.compact_model import CompactIntentModel
+model = CompactIntentModel("models/compact")
+model.predict_proba(model.transform(["where is my order"]))
+""",
+}
+
+# Peak RSS comes from VmHWM: ru_maxrss would include the parent's peak,
+# which Linux carries over across fork + exec.
+CHILD_WRAPPER = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    hwm_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": hwm_kb / 1024,
+    "sklearn_imported": "sklearn" in sys.modules,
+}}))
+"""
+
+
+def check_parity() -> bool:
+    with open(MODEL_DIR / "intent_classifier.pkl", "rb") as f:
+        clf = pickle.load(f)
+    with open(MODEL_DIR / "vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    compact = CompactIntentModel(MODEL_DIR / "compact")
+
+    texts = pd.read_csv("data/intents.csv")["text"].astype(str).tolist()
+    texts += pd.read_csv("data/faq.csv")["question"].astype(str).tolist()
+    texts += EXTRA_TEXTS
+
+    expected = clf.predict_proba(vectorizer.transform(texts))
+    got = compact.predict_proba(compact.transform(texts))
+
+    max_diff = float(np.abs(expected - got).max())
+    same_argmax = bool((expected.argmax(axis=1) == got.argmax(axis=1)).all())
+    same_classes = list(clf.classes_) == list(compact.classes_)
+    ok = max_diff < 1e-9 and same_argmax and same_classes
+    print(f"parity: {len(texts)} texts, max |p_sklearn - p_compact| = {max_diff:.2e}, "
+          f"same intents: {same_argmax}, same classes: {same_classes} -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def cold_start(runs: int) -> None:
+    print(f"\ncold start ({runs} fresh processes each):")
+    print(f"{'format':>8} {'load+predict_s':>15} {'peak_rss_MB':>12} {'sklearn':>8}")
+    for name, body in COLD_START.items():
+        results = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD_WRAPPER.format(body=body)],
+                capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        seconds = statistics.median(r["seconds"] for r in results)
+        rss = statistics.median(r["max_rss_mb"] for r in results)
+        print(f"{name:>8} {seconds:>15.3f} {rss:>12.1f} {str(results[0]['sklearn_imported']):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    ok = check_parity()
+    cold_start(args.runs)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,155 @@
+"""
+Event-loop responsiveness of api.py under chat load, per execution
+backend (chatbot/executor.py).
+
+Starts the API under uvicorn in a subprocess for each backend, sends
+--requests /chat calls from --clients concurrent connections (unique
+messages, so every call misses the caches and runs the classifier + FAQ
+search; --batch N sends /chat/batch calls of N messages instead) and
+meanwhile polls /health from a separate thread. Reports chat
+throughput and /health latency for the "inline" (old behaviour),
+"thread" and "process" backends.
+
+Usage (from the repo root):
+    python -m benchmarks.event_loop
+    python -m benchmarks.event_loop --requests 2000 --backends thread process
+    python -m benchmarks.event_loop --requests 200 --batch 50
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+PORT = 8765
+PROBE_INTERVAL = 0.01
+
+SERVER = """
+import sys, warnings
+warnings.filterwarnings("ignore")
+import uvicorn
+import api
+from chatbot.executor import ChatExecutor
+backend, workers = sys.argv[1], int(sys.argv[2])
+api.CHAT_EXECUTOR = ChatExecutor(backend=backend, workers=workers, max_concurrency=256, timeout=None)
+uvicorn.run(api.app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+TEMPLATES = [
+    "is there any way to change the delivery address {i}",
+    "my package arrived broken what now {i}",
+    "can i get a refund on item {i}",
+    "do you ship to country number {i}",
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url + "/health", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+
+def probe(url: str, stop: threading.Event, out: list[float]) -> None:
+    # Latency is measured from when the probe *should* have been sent
+    with httpx.Client(base_url=url, timeout=30.0) as client:
+        due = time.perf_counter()
+        while not stop.is_set():
+            time.sleep(max(0.0, due - time.perf_counter()))
+            client.get("/health")
+            out.append((time.perf_counter() - due) * 1000)
+            due += PROBE_INTERVAL
+
+
+async def send_load(url: str, n_requests: int, n_clients: int, batch: int) -> list[int]:
+    queue = list(range(n_requests))
+    statuses = []
+
+    async def worker(client):
+        while queue:
+            i = queue.pop()
+            if batch > 1:
+                messages = [
+                    {"message": TEMPLATES[j % len(TEMPLATES)].format(i=f"{i}-{j}")}
+                    for j in range(batch)
+                ]
+                r = await client.post("/chat/batch", json={"messages": messages})
+            else:
+                message = TEMPLATES[i % len(TEMPLATES)].format(i=i)
+                r = await client.post("/chat", json={"message": message})
+            statuses.append(r.status_code)
+
+    limits = httpx.Limits(max_connections=n_clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        # Warm-up: process pool start-up, FAQ index load
+        await asyncio.gather(*[
+            client.post("/chat", json={"message": f"warm up {i}"}) for i in range(n_clients)
+        ])
+        await asyncio.gather(*[worker(client) for _ in range(n_clients)])
+    return statuses
+
+
+def run_backend(backend: str, args) -> dict:
+    url = f"http://127.0.0.1:{PORT}"
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(port=PORT), backend, str(args.workers)]
+    )
+    try:
+        wait_until_up(url)
+        health_ms = []
+        stop = threading.Event()
+        prober = threading.Thread(target=probe, args=(url, stop, health_ms))
+
+        prober.start()
+        start = time.perf_counter()
+        statuses = asyncio.run(send_load(url, args.requests, args.clients, args.batch))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        prober.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "backend": backend,
+        "rps": args.requests / elapsed,
+        "errors": sum(status != 200 for status in statuses),
+        "health_p50_ms": statistics.median(health_ms),
+        "health_p99_ms": percentile(health_ms, 0.99),
+        "health_max_ms": max(health_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1,
+                        help="send /chat/batch calls of this many messages instead of /chat")
+    parser.add_argument("--backends", nargs="+", default=["inline", "thread", "process"])
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'req/s':>8} {'errors':>6} "
+          f"{'health p50':>11} {'health p99':>11} {'health max':>11}")
+    for backend in args.backends:
+        r = run_backend(backend, args)
+        print(f"{r['backend']:<8} {r['rps']:>8.0f} {r['errors']:>6} "
+              f"{r['health_p50_ms']:>9.1f}ms {r['health_p99_ms']:>9.1f}ms {r['health_max_ms']:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
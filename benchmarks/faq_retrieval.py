@@ -0,0 +1,120 @@
+"""
+Benchmark: inverted-index FAQ retrieval vs. brute-force cosine similarity.
+
+Builds synthetic FAQ knowledge bases of increasing size from the words in
+data/faq.csv and data/intents.csv (plus a long tail of rare synthetic terms,
+so postings lists look like a real knowledge base), then times both search
+paths on the same queries.
+
+Usage (from the repo root):
+    python -m benchmarks.faq_retrieval
+    python -m benchmarks.faq_retrieval --sizes 1000 100000 1000000 --queries 200
+"""
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from chatbot.faq_index import InvertedIndex
+
+DATA_DIR = Path("data")
+
+
+def load_seed_words() -> list[str]:
+    faq = pd.read_csv(DATA_DIR / "faq.csv")
+    intents = pd.read_csv(DATA_DIR / "intents.csv")
+    text = " ".join(faq["question"].astype(str).tolist() + intents["text"].astype(str).tolist())
+    return sorted(set(re.findall(r"[a-z]{3,}", text.lower())))
+
+
+def synthetic_questions(n: int, seed_words: list[str], rng, tail_terms: int = 50000) -> list[str]:
+    """
+    Random 4-10 word questions. Words are drawn from a Zipf-like
+    distribution over the seed words followed by a tail of rare terms.
+    """
+    vocab = np.array(seed_words + [f"term{i}" for i in range(tail_terms)])
+    ranks = np.arange(1, len(vocab) + 1)
+    probs = 1.0 / ranks
+    probs /= probs.sum()
+
+    lengths = rng.integers(4, 11, size=n)
+    words = rng.choice(len(vocab), size=int(lengths.sum()), p=probs)
+    out, pos = [], 0
+    for length in lengths:
+        out.append(" ".join(vocab[words[pos:pos + length]]))
+        pos += length
+    return out
+
+
+def brute_force(query_vec, matrix, threshold: float):
+    # Same as the original semantic_faq_search: score every row, take argmax
+    sims = cosine_similarity(query_vec, matrix)[0]
+    best = sims.argmax()
+    if sims[best] < threshold:
+        return None
+    return int(best)
+
+
+def time_calls(fn, queries) -> np.ndarray:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1e6  # microseconds
+
+
+def run(sizes: list[int], n_queries: int, threshold: float, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    seed_words = load_seed_words()
+
+    print(f"{'n_faqs':>10} {'build_s':>8} {'brute p50':>10} {'brute p99':>10} "
+          f"{'index p50':>10} {'index p99':>10} {'speedup':>8} {'agree':>6}")
+
+    for n in sizes:
+        questions = synthetic_questions(n, seed_words, rng)
+        vectorizer = TfidfVectorizer(lowercase=True, ngram_range=(1, 2), stop_words="english")
+        matrix = vectorizer.fit_transform(questions)
+
+        start = time.perf_counter()
+        index = InvertedIndex.from_matrix(matrix)
+        build_s = time.perf_counter() - start
+
+        # Queries: half are perturbed FAQ questions (hits), half random text
+        picks = rng.integers(0, n, size=n_queries // 2)
+        query_texts = [questions[i] for i in picks]
+        query_texts += synthetic_questions(n_queries - len(query_texts), seed_words, rng)
+        query_vecs = [vectorizer.transform([q]) for q in query_texts]
+
+        def via_index(q):
+            hits = index.search(q, k=1, threshold=threshold)
+            return hits[0][0] if hits else None
+
+        agree = sum(
+            brute_force(q, matrix, threshold) == via_index(q) for q in query_vecs[:50]
+        ) / min(50, len(query_vecs))
+
+        brute_t = time_calls(lambda q: brute_force(q, matrix, threshold), query_vecs)
+        index_t = time_calls(via_index, query_vecs)
+
+        print(
+            f"{n:>10} {build_s:>8.2f} "
+            f"{np.percentile(brute_t, 50):>9.0f}us {np.percentile(brute_t, 99):>9.0f}us "
+            f"{np.percentile(index_t, 50):>9.0f}us {np.percentile(index_t, 99):>9.0f}us "
+            f"{np.median(brute_t) / np.median(index_t):>7.1f}x {agree:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.threshold, args.seed)
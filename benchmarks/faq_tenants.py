@@ -0,0 +1,181 @@
+"""
+Per-tenant FAQ indexes: load time and memory per tenant, cold loads and
+evictions of the memory-bounded LRU under skewed tenant traffic, and
+coalescing of concurrent first requests.
+
+--tenants synthetic tenants (faq.csv questions plus synthetic ones,
+--faqs per tenant, cycling through the listed sizes) are written to a
+temp dir and served through faq.semantic_faq_search() the way the chat
+pipeline does. Every tenant gets a prebuilt index except every fourth,
+which is fitted from its CSV on load.
+
+- load: per-tenant index size, source and load time
+- traffic: --queries queries over tenants picked with Zipf(--zipf)
+  popularity, for each --budget (share of the total index memory the
+  LRU may hold): share of queries that had to load their tenant's
+  index, loads, evictions and p50 / p99 per query
+- coalescing: --threads threads ask for the same cold tenant at once;
+  there should be one load and threads - 1 coalesced waits
+
+Usage (from the repo root):
+    python -m benchmarks.faq_tenants
+    python -m benchmarks.faq_tenants --tenants 50 --faqs 1000 10000 --budget 0.1 0.5 1.0
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+from benchmarks.event_loop import percentile  # noqa: E402
+from benchmarks.faq_retrieval import load_seed_words, synthetic_questions  # noqa: E402
+from chatbot import faq  # noqa: E402
+from chatbot.cache import LRUCache  # noqa: E402
+
+DATA_DIR = Path("data")
+
+
+def write_tenants(n: int, sizes: list[int], work_dir: Path, rng) -> list[str]:
+    """
+    Write n tenant CSVs (and prebuilt indexes for 3 in 4 of them) and
+    point chatbot.faq at them. Returns the tenant IDs.
+    """
+    faq.TENANT_DATA_DIR = work_dir / "faqs"
+    faq.TENANT_INDEX_DIR = work_dir / "faq_index" / "tenants"
+    faq.TENANT_DATA_DIR.mkdir(parents=True)
+
+    base = pd.read_csv(DATA_DIR / "faq.csv")
+    seed_words = load_seed_words()
+    tenants = []
+    for i in range(n):
+        tenant = f"shop-{i:03d}"
+        size = sizes[i % len(sizes)]
+        questions = base["question"].astype(str).tolist()
+        answers = base["answer"].astype(str).tolist()
+        n_extra = max(0, size - len(questions))
+        questions += synthetic_questions(n_extra, seed_words, rng)
+        answers += [f"{tenant} answer {j}" for j in range(n_extra)]
+        csv_path, index_dir = faq.tenant_paths(tenant)
+        pd.DataFrame({"question": questions, "answer": answers}).to_csv(csv_path, index=False)
+        if i % 4 != 3:
+            faq.build_faq_index(csv_path, index_dir)
+        tenants.append(tenant)
+    return tenants
+
+
+def measure_loads(tenants: list[str]) -> dict:
+    indexes = faq.TenantIndexes(max_bytes=1 << 62)
+    for tenant in tenants:
+        indexes.get(tenant)
+    return indexes.stats()["tenants"]
+
+
+def run_traffic(tenants: list[str], queries: list[str], picks, max_bytes: int) -> dict:
+    faq.FAQ_INDEXES = faq.TenantIndexes(max_bytes=max_bytes)
+    latencies = []
+    cold = 0
+    start = time.perf_counter()
+    for query, i in zip(queries, picks):
+        loads = faq.FAQ_INDEXES.loads
+        t0 = time.perf_counter()
+        faq.semantic_faq_search(query, tenant=tenants[i])
+        latencies.append(time.perf_counter() - t0)
+        cold += faq.FAQ_INDEXES.loads != loads
+    elapsed = time.perf_counter() - start
+    stats = faq.FAQ_INDEXES.stats()
+    return {
+        "per_s": len(queries) / elapsed,
+        "cold": cold / len(queries),
+        "loads": stats["loads"],
+        "evictions": stats["evictions"],
+        "resident": len(stats["tenants"]),
+        "bytes": stats["bytes"],
+        "p50_us": percentile(latencies, 0.5) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def run_coalescing(tenant: str, threads: int) -> dict:
+    faq.FAQ_INDEXES = faq.TenantIndexes()
+    barrier = threading.Barrier(threads)
+    waits = []
+
+    def worker():
+        barrier.wait()
+        t0 = time.perf_counter()
+        faq.knowledge_base(tenant)
+        waits.append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    stats = faq.FAQ_INDEXES.stats()
+    return {
+        "loads": stats["loads"],
+        "coalesced": stats["coalesced"],
+        "load_ms": stats["tenants"][tenant]["load_seconds"] * 1000,
+        "max_wait_ms": max(waits) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--faqs", type=int, nargs="+", default=[200, 2000],
+                        help="FAQ entries per tenant, cycled through")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--zipf", type=float, default=1.2, help="tenant popularity skew")
+    parser.add_argument("--budget", type=float, nargs="+", default=[0.1, 0.3, 1.0],
+                        help="LRU budget as a share of all tenants' index memory")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Every query reaches the index lookup
+    faq.FAQ_CACHE = LRUCache(maxsize=0)
+    rng = np.random.default_rng(args.seed)
+    work_dir = Path(tempfile.mkdtemp(prefix="faq-tenants-bench-"))
+    try:
+        tenants = write_tenants(args.tenants, args.faqs, work_dir, rng)
+
+        loads = measure_loads(tenants)
+        total_bytes = sum(s["bytes"] for s in loads.values())
+        print(f"{'tenant':<10} {'FAQs':>7} {'source':<9} {'memory':>9} {'load':>9}")
+        for tenant, s in loads.items():
+            print(f"{tenant:<10} {s['n_faqs']:>7} {s['source']:<9} {s['bytes'] / 2**20:>7.2f}MB "
+                  f"{s['load_seconds'] * 1000:>7.1f}ms")
+        print(f"{'total':<10} {'':>7} {'':<9} {total_bytes / 2**20:>7.2f}MB")
+
+        # Popular tenants first: tenant i gets weight 1 / (i + 1)^zipf
+        weights = 1.0 / np.arange(1, len(tenants) + 1) ** args.zipf
+        picks = rng.choice(len(tenants), size=args.queries, p=weights / weights.sum())
+        questions = pd.read_csv(DATA_DIR / "faq.csv")["question"].astype(str).tolist()
+        queries = [questions[j] for j in rng.integers(0, len(questions), args.queries)]
+
+        print(f"\n{'budget':>7} {'queries/s':>10} {'cold':>7} {'loads':>6} {'evicted':>8} "
+              f"{'resident':>9} {'memory':>9} {'p50':>9} {'p99':>9}")
+        for budget in args.budget:
+            r = run_traffic(tenants, queries, picks, int(total_bytes * budget))
+            print(f"{budget:>7.0%} {r['per_s']:>10.0f} {r['cold']:>7.1%} {r['loads']:>6} "
+                  f"{r['evictions']:>8} {r['resident']:>9} {r['bytes'] / 2**20:>7.2f}MB "
+                  f"{r['p50_us']:>7.1f}us {r['p99_us']:>7.0f}us")
+
+        largest = max(loads, key=lambda t: loads[t]["bytes"])
+        r = run_coalescing(largest, args.threads)
+        print(f"\n{args.threads} concurrent first requests for {largest}: {r['loads']} load(s), "
+              f"{r['coalesced']} coalesced, load {r['load_ms']:.1f}ms, slowest request {r['max_wait_ms']:.1f}ms")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
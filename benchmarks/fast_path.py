@@ -0,0 +1,160 @@
+"""
+Rule-based fast path: how much traffic skips the model, and what that
+saves per message.
+
+Traffic is replayed from interaction log segments (--log-dir) or is a
+synthetic mix: --trivial-share of trivial messages (greetings, thanks,
+goodbyes, bare order IDs, quick-question and intents.csv texts, with
+random case and punctuation), the rest unique messages. Every message
+goes through pipeline.analyze_message() with the fast path off, then on.
+The reply caches are disabled unless --with-caches, so every message the
+fast path misses runs the classifier.
+
+Reports messages/s, p50 / p99 per message, the share answered by the
+fast path with hits per rule and their p50, the share of messages whose
+intent differs from what the model alone says (mostly short messages
+the model sends to 'fallback', like "goodbye" or a bare order ID), and
+the exact-match table build time.
+
+Usage (from the repo root):
+    python -m benchmarks.fast_path
+    python -m benchmarks.fast_path --trivial-share 0.1 0.3 0.6 --with-caches
+    python -m benchmarks.fast_path --log-dir logs/interactions
+"""
+import argparse
+import csv
+import random
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from benchmarks.event_loop import TEMPLATES, percentile  # noqa: E402
+from chatbot import faq, metrics, nlp, pipeline  # noqa: E402
+from chatbot.cache import LRUCache  # noqa: E402
+from chatbot.config import FAST_PATH_DATA_PATH, QUICK_QUESTIONS  # noqa: E402
+
+TRIVIAL = [
+    "hi", "hello", "hey there", "good morning", "thanks", "thank you",
+    "thx", "bye", "goodbye", "ok bye", "see you later", "many thanks",
+]
+
+
+def trivial_message(rng: random.Random, labeled: list[str]) -> str:
+    kind = rng.random()
+    if kind < 0.15:
+        text = f"{rng.choice(['', '#', 'order '])}{rng.randint(10_000, 999_999)}"
+    elif kind < 0.3:
+        text = rng.choice(list(QUICK_QUESTIONS.values()))
+    elif kind < 0.5:
+        text = rng.choice(labeled)
+    else:
+        text = rng.choice(TRIVIAL)
+    if rng.random() < 0.5:
+        text = text.capitalize()
+    return text + rng.choice(["", "", "!", ".", "?", " :)"])
+
+
+def synthetic_traffic(n: int, trivial_share: float, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    with open(FAST_PATH_DATA_PATH, newline="", encoding="utf-8") as f:
+        labeled = [row["text"] for row in csv.DictReader(f)]
+    return [
+        trivial_message(rng, labeled) if rng.random() < trivial_share
+        else TEMPLATES[i % len(TEMPLATES)].format(i=i)
+        for i in range(n)
+    ]
+
+
+def logged_traffic(log_dir: str, n: int) -> list[str]:
+    from chatbot.interaction_log import read_interactions
+
+    texts = read_interactions(log_dir)["user_text"].astype(str).tolist()
+    return texts[:n]
+
+
+def hit_counts() -> dict:
+    return dict(metrics.FAST_PATH_HITS.values())
+
+
+def run(messages: list[str], enabled: bool, with_caches: bool) -> tuple[dict, list[str]]:
+    nlp.FAST_PATH.enabled = enabled
+    if with_caches:
+        pipeline.clear_caches()
+    hits_before, misses_before = hit_counts(), metrics.FAST_PATH_MISS.value
+
+    miss = metrics.FAST_PATH_MISS
+    latencies, hit_latencies, intents = [], [], []
+    start = time.perf_counter()
+    for message in messages:
+        misses = miss.value
+        t0 = time.perf_counter()
+        intents.append(pipeline.analyze_message(message).intent)
+        latency = time.perf_counter() - t0
+        latencies.append(latency)
+        if enabled and miss.value == misses:
+            hit_latencies.append(latency)
+    elapsed = time.perf_counter() - start
+
+    by_rule = {}
+    for (rule, intent), count in hit_counts().items():
+        by_rule[rule] = by_rule.get(rule, 0) + count - hits_before.get((rule, intent), 0)
+    hits = sum(by_rule.values())
+    checked = hits + metrics.FAST_PATH_MISS.value - misses_before
+    return {
+        "per_s": len(messages) / elapsed,
+        "p50_us": percentile(latencies, 0.5) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "hit_p50_us": percentile(hit_latencies, 0.5) * 1e6 if hit_latencies else None,
+        "bypass": hits / checked if checked else 0.0,
+        "by_rule": {rule: count for rule, count in by_rule.items() if count},
+    }, intents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--trivial-share", type=float, nargs="+", default=[0.1, 0.3, 0.6])
+    parser.add_argument("--log-dir", default=None, help="replay user messages from these log segments")
+    parser.add_argument("--with-caches", action="store_true",
+                        help="keep the analysis / FAQ reply caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.with_caches:
+        pipeline.ANALYSIS_CACHE = LRUCache(maxsize=0)
+        faq.FAQ_CACHE = LRUCache(maxsize=0)
+
+    bundle = nlp.active_model()
+    entries = nlp.FAST_PATH.build(bundle)
+    print(f"exact-match table: {entries} entries, built in {nlp.FAST_PATH.build_seconds * 1000:.1f}ms "
+          f"(model {bundle.version})")
+
+    if args.log_dir:
+        workloads = [("log replay", logged_traffic(args.log_dir, args.messages))]
+    else:
+        workloads = [
+            (f"{share:.0%} trivial", synthetic_traffic(args.messages, share, args.seed))
+            for share in args.trivial_share
+        ]
+
+    # Warm-up: first calls through sklearn / scipy are slower
+    run(workloads[0][1][:500], False, args.with_caches)
+
+    print(f"\n{'traffic':<12} {'fast path':<9} {'msg/s':>8} {'p50':>9} {'p99':>9} {'bypass':>7} "
+          f"{'hit p50':>9} {'differs':>8}  hits by rule")
+    for name, messages in workloads:
+        off, model_intents = run(messages, False, args.with_caches)
+        on, fast_intents = run(messages, True, args.with_caches)
+        differs = sum(a != b for a, b in zip(model_intents, fast_intents))
+        for label, r, diff in (("off", off, "-"), ("on", on, f"{differs / len(messages):.2%}")):
+            rules = ", ".join(f"{rule} {count}" for rule, count in sorted(r["by_rule"].items()))
+            hit = f"{r['hit_p50_us']:>7.1f}us" if r["hit_p50_us"] is not None else f"{'-':>9}"
+            print(f"{name:<12} {label:<9} {r['per_s']:>8.0f} {r['p50_us']:>7.1f}us {r['p99_us']:>7.1f}us "
+                  f"{r['bypass']:>7.1%} {hit} {diff:>8}  {rules}")
+
+    nlp.FAST_PATH.enabled = True
+
+
+if __name__ == "__main__":
+    main()
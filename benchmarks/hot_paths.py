@@ -0,0 +1,320 @@
+"""
+Micro-benchmark suite for the chat pipeline hot paths.
+
+For every scale factor, synthetic corpora and data stores are built from
+the shipped data/*.csv files, `scale` times larger (1x = the shipped
+sizes), and swapped into the running modules:
+- messages: intents.csv texts recombined into unique user messages
+- FAQ knowledge base: faq.csv questions + synthetic questions
+- order store: orders.csv-like rows with unique IDs (cancellations go to
+  a scratch order write log in the temp dir)
+
+Benchmarks (the reply caches are disabled unless --with-caches, so every
+call does the real work):
+- predict_intent, vectorizer_transform (one VECTORIZER.transform call)
+- faq_search_hit, faq_search_miss (semantic_faq_search)
+- get_order_info_hit, get_order_info_miss
+- extract_order_id
+- handle_intent[<intent>] end to end, for every intent
+
+Reports per-call p50 / p99 latency and the average peak bytes allocated
+per call (tracemalloc, measured in a separate pass), and saves everything
+to JSON. With --baseline, results are compared against an earlier JSON
+and regressions beyond --tolerance are flagged (exit code 1).
+
+Usage (from the repo root):
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --scales 1 10 100 1000 --output before.json
+    python -m benchmarks.hot_paths --output after.json --baseline before.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+from benchmarks.faq_retrieval import load_seed_words, synthetic_questions  # noqa: E402
+from chatbot import faq, handlers, nlp  # noqa: E402
+from chatbot.cache import LRUCache  # noqa: E402
+from chatbot.config import INTENT_RESPONSES  # noqa: E402
+from chatbot.order_wal import OrderWriteLog  # noqa: E402
+from chatbot.orders import CompactOrderStore, OverlayOrderStore  # noqa: E402
+
+DATA_DIR = Path("data")
+DEFAULT_OUTPUT = Path("benchmarks/results/hot_paths.json")
+
+STATUSES = ["Processing", "Shipped", "Delivered", "Cancelled"]
+PROVIDERS = ["DHL", "FedEx", "UPS", "Postal Service"]
+
+OFF_TOPIC = [
+    "what is the weather like on mars",
+    "recommend a good movie for tonight",
+    "how tall is the eiffel tower",
+    "tell me about quantum physics",
+    "which football team won yesterday",
+]
+
+
+# -------------------------
+# Synthetic data
+# -------------------------
+
+
+def synthetic_messages(n: int, rng) -> list[str]:
+    """
+    Unique user messages: an intents.csv example plus two random words
+    from the same vocabulary.
+    """
+    texts = pd.read_csv(DATA_DIR / "intents.csv")["text"].astype(str).tolist()
+    words = sorted({w for text in texts for w in text.lower().split()})
+    picks = rng.integers(0, len(texts), n)
+    extra = rng.integers(0, len(words), (n, 2))
+    return [f"{texts[p]} {words[a]} {words[b]}" for p, (a, b) in zip(picks, extra)]
+
+
+def synthetic_faq(scale: int, rng, work_dir: Path) -> faq.FaqKnowledgeBase:
+    """
+    FAQ knowledge base `scale` times the size of faq.csv, built into a
+    prebuilt artifact and loaded the way the server loads models/faq_index/.
+    """
+    base = pd.read_csv(DATA_DIR / "faq.csv")
+    questions = base["question"].astype(str).tolist()
+    answers = base["answer"].astype(str).tolist()
+
+    n_extra = len(questions) * (scale - 1)
+    if n_extra:
+        questions += synthetic_questions(n_extra, load_seed_words(), rng)
+        answers += [f"Synthetic answer {i}" for i in range(n_extra)]
+
+    csv_path = work_dir / f"faq_x{scale}.csv"
+    index_dir = work_dir / f"faq_index_x{scale}"
+    pd.DataFrame({"question": questions, "answer": answers}).to_csv(csv_path, index=False)
+    faq.build_faq_index(csv_path, index_dir)
+    return faq._load_artifact(csv_path, index_dir)
+
+
+def synthetic_orders(scale: int, rng) -> tuple[CompactOrderStore, np.ndarray, np.ndarray]:
+    """
+    Order store `scale` times the size of orders.csv, plus IDs known to
+    be in it (hits) and IDs known not to be (misses).
+    """
+    n = len(pd.read_csv(DATA_DIR / "orders.csv")) * scale
+    pool = rng.permutation(np.arange(100_000, 100_000 + n * 4))
+    ids, missing = pool[:n], pool[n:n + 1000]
+    etas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    frame = pd.DataFrame({
+        "order_id": ids,
+        "status": np.array(STATUSES)[rng.integers(0, len(STATUSES), n)],
+        "eta": etas.strftime("%Y-%m-%d"),
+        "total": [f"${c / 100:.2f}" for c in rng.integers(500, 50_000, n)],
+        "shipping_provider": np.array(PROVIDERS)[rng.integers(0, len(PROVIDERS), n)],
+    })
+    return CompactOrderStore.from_frame(frame), ids, missing
+
+
+# -------------------------
+# Measurement
+# -------------------------
+
+
+def measure(fn, inputs: list, calls: int, alloc_calls: int) -> dict:
+    """
+    Time `calls` calls of fn(x), cycling through inputs, then measure
+    peak allocations of `alloc_calls` more calls under tracemalloc.
+    """
+    for x in inputs[:20]:
+        fn(x)  # warm-up
+
+    timings = np.empty(calls)
+    n_inputs = len(inputs)
+    for i in range(calls):
+        x = inputs[i % n_inputs]
+        start = time.perf_counter_ns()
+        fn(x)
+        timings[i] = time.perf_counter_ns() - start
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(alloc_calls):
+            x = inputs[i % n_inputs]
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(x)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    timings /= 1000  # ns -> us
+    return {
+        "calls": calls,
+        "p50_us": float(np.percentile(timings, 50)),
+        "p99_us": float(np.percentile(timings, 99)),
+        "mean_us": float(timings.mean()),
+        "alloc_peak_bytes": float(np.mean(peaks)) if peaks else 0.0,
+    }
+
+
+def run_scale(scale: int, calls: int, alloc_calls: int, seed: int, work_dir: Path) -> list[dict]:
+    rng = np.random.default_rng(seed)
+
+    messages = synthetic_messages(len(pd.read_csv(DATA_DIR / "intents.csv")) * scale, rng)
+    kb = synthetic_faq(scale, rng, work_dir)
+    store, order_ids, missing_ids = synthetic_orders(scale, rng)
+
+    # Swap the synthetic data into the running modules; cancellations go
+    # to a scratch write log, not data/orders_wal.jsonl
+    faq.FAQ_INDEXES.put(faq.DEFAULT_TENANT, kb)
+    handlers.ORDER_STORE = OverlayOrderStore(store)
+    handlers.ORDER_LOG = OrderWriteLog(handlers.ORDER_STORE, work_dir / f"orders_wal-{scale}.jsonl")
+
+    hit_ids = [str(i) for i in rng.choice(order_ids, size=min(1000, len(order_ids)), replace=False)]
+    miss_ids = [str(i) for i in missing_ids]
+    faq_hits = [f"{q} please" for q in kb.questions[:15]]
+    faq_misses = [f"{q} {i}x" for i, q in enumerate(OFF_TOPIC * 20)]
+
+    order_texts = [f"where is my order {order_id}" for order_id in hit_ids]
+    intent_inputs = {
+        "order_status": order_texts,
+        "cancel_order": [f"please cancel order {order_id}" for order_id in hit_ids],
+        "fallback": faq_hits + faq_misses,
+    }
+    for intent in INTENT_RESPONSES:
+        intent_inputs.setdefault(intent, messages[:200])
+
+    benches = [
+        ("predict_intent", nlp.predict_intent, messages),
+        ("vectorizer_transform", lambda text: nlp.VECTORIZER.transform([text]), messages),
+        ("faq_search_hit", faq.semantic_faq_search, faq_hits),
+        ("faq_search_miss", faq.semantic_faq_search, faq_misses),
+        ("get_order_info_hit", handlers.get_order_info, hit_ids),
+        ("get_order_info_miss", handlers.get_order_info, miss_ids),
+        ("extract_order_id", handlers.extract_order_id, order_texts + messages[:1000]),
+    ]
+    for intent, inputs in sorted(intent_inputs.items()):
+        benches.append((
+            f"handle_intent[{intent}]",
+            lambda text, intent=intent: handlers.handle_intent(intent, text),
+            inputs,
+        ))
+
+    sizes = {"messages": len(messages), "faq_questions": len(kb.questions), "orders": len(store)}
+    results = []
+    try:
+        for name, fn, inputs in benches:
+            result = measure(fn, inputs, calls, alloc_calls)
+            result.update({"name": name, "scale": scale, **sizes})
+            results.append(result)
+            print(f"  {name:<32} p50 {result['p50_us']:>9.1f}us  p99 {result['p99_us']:>9.1f}us  "
+                  f"alloc {result['alloc_peak_bytes'] / 1024:>8.1f}KiB")
+    finally:
+        handlers.ORDER_LOG.stop()
+    return results
+
+
+# -------------------------
+# Baseline comparison
+# -------------------------
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float, min_delta_us: float) -> list[str]:
+    """
+    Lines describing every (benchmark, scale) whose p50 or p99 got worse
+    than the baseline by more than `tolerance` (relative) and
+    `min_delta_us` (absolute, to ignore timer noise on tiny numbers).
+    """
+    previous = {(r["name"], r["scale"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r["name"], r["scale"]))
+        if old is None:
+            continue
+        for metric in ("p50_us", "p99_us"):
+            delta = r[metric] - old[metric]
+            if delta > min_delta_us and r[metric] > old[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{r['name']} x{r['scale']} {metric}: "
+                    f"{old[metric]:.1f}us -> {r[metric]:.1f}us (+{delta / old[metric]:.0%})"
+                )
+    return regressions
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--calls", type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument("--alloc-calls", type=int, default=200, help="calls traced for allocations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-caches", action="store_true",
+                        help="keep the intent / FAQ reply caches enabled")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--min-delta-us", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if not args.with_caches:
+        nlp.INTENT_CACHE = LRUCache(maxsize=0)
+        faq.FAQ_CACHE = LRUCache(maxsize=0)
+
+    results = []
+    work_dir = Path(tempfile.mkdtemp(prefix="hot-paths-"))
+    try:
+        for scale in args.scales:
+            print(f"scale x{scale}")
+            results += run_scale(scale, args.calls, args.alloc_calls, args.seed, work_dir)
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "model_version": nlp.active_model_version(),
+            "caches": args.with_caches,
+            "calls": args.calls,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved results to {args.output}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_us)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs. {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions vs. {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
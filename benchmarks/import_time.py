@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark: how long importing the serving entry points takes
+in a fresh process, and which heavy modules they pull in.
+
+For each target the import runs in a new interpreter (so nothing is
+cached in sys.modules) and we report the median wall time, the slowest
+imports according to `python -X importtime`, and whether pandas /
+scikit-learn / scipy were loaded. Use --max-seconds to fail (exit 1)
+on a cold-start regression, e.g. in CI.
+
+Usage (from the repo root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 10 --max-seconds 1.0
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+TARGETS = ["api", "chatbot.bot"]
+HEAVY_MODULES = ["pandas", "sklearn", "scipy"]
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def time_import(target: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(target=target, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(target: str, top: int) -> list[tuple[int, str]]:
+    """
+    (cumulative microseconds, module) for the slowest top-level imports.
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only modules imported directly (not nested) by the target chain
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(runs: int, top: int, max_seconds: float | None) -> bool:
+    ok = True
+    for target in TARGETS:
+        # One warm-up run so one-off caches (.pyc, order snapshot) exist
+        time_import(target)
+        results = [time_import(target) for _ in range(runs)]
+        seconds = statistics.median(r["seconds"] for r in results)
+        heavy = results[-1]["heavy"]
+
+        status = ""
+        if max_seconds is not None and seconds > max_seconds:
+            status = f"  REGRESSION (> {max_seconds:.2f}s)"
+            ok = False
+        print(f"import {target}: {seconds:.3f}s median of {runs}, "
+              f"heavy modules: {', '.join(heavy) or 'none'}{status}")
+        for cumulative, name in slowest_imports(target, top):
+            print(f"    {cumulative / 1000:>8.1f} ms  {name}")
+        print()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.top, args.max_seconds) else 1)
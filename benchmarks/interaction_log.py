@@ -0,0 +1,101 @@
+"""
+Per-turn cost of interaction logging: the old app.py approach (one-row
+pandas DataFrame + to_csv(mode="a") per message) vs. the buffered
+InteractionLogger, for each segment format.
+
+Reports p50 / p99 latency of a single log call as seen by the request,
+plus rows written and flush time for the logger's background writes.
+
+Usage (from the repo root):
+    python -m benchmarks.interaction_log
+    python -m benchmarks.interaction_log --rows 200000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from chatbot.interaction_log import InteractionLogger, read_segment, resolve_format, segment_files
+
+REPLY = "Your order is Shipped via DHL and will arrive on 2025-12-09."
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return (
+        samples[len(samples) // 2] * 1e6,
+        samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e6,
+    )
+
+
+def bench_csv(out_dir: Path, rows: int) -> dict:
+    log_file = out_dir / "interactions.csv"
+    samples = []
+    for i in range(rows):
+        start = time.perf_counter()
+        df = pd.DataFrame([{
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "intent": "order_status",
+            "user_text": f"where is my order {i}",
+            "bot_reply": REPLY,
+        }])
+        df.to_csv(log_file, mode="a", index=False, header=not log_file.exists())
+        samples.append(time.perf_counter() - start)
+    p50, p99 = percentiles(samples)
+    return {"name": "pandas to_csv", "rows": rows, "p50_us": p50, "p99_us": p99,
+            "total_s": sum(samples), "written": rows}
+
+
+def bench_logger(out_dir: Path, rows: int, segment_format: str) -> dict:
+    logger = InteractionLogger(out_dir / segment_format, segment_format=segment_format)
+    samples = []
+    for i in range(rows):
+        start = time.perf_counter()
+        logger.log(f"where is my order {i}", "order_status", REPLY)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    logger.close()
+    drain = time.perf_counter() - start
+
+    written = sum(len(read_segment(path)["intent"]) for path in segment_files(out_dir / segment_format))
+    p50, p99 = percentiles(samples)
+    stats = logger.stats()
+    return {"name": f"logger ({segment_format})", "rows": rows, "p50_us": p50, "p99_us": p99,
+            "total_s": sum(samples), "written": written,
+            "flushes": stats["flushes"], "dropped": stats["rows_dropped"], "drain_s": drain}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--csv-rows", type=int, default=2_000,
+                        help="rows for the (slow) pandas baseline")
+    args = parser.parse_args()
+
+    formats = ["jsonl"]
+    if resolve_format("auto") == "arrow":
+        formats.append("arrow")
+
+    out_dir = Path(tempfile.mkdtemp(prefix="interaction-log-bench-"))
+    try:
+        results = [bench_csv(out_dir, args.csv_rows)]
+        results += [bench_logger(out_dir, args.rows, fmt) for fmt in formats]
+    finally:
+        shutil.rmtree(out_dir)
+
+    print(f"{'writer':<16} {'rows':>8} {'p50':>9} {'p99':>9} {'in-request':>11} {'written':>8}  notes")
+    for r in results:
+        notes = ""
+        if "flushes" in r:
+            notes = f"{r['flushes']} flushes, {r['dropped']} dropped, drain {r['drain_s'] * 1000:.0f}ms"
+        print(f"{r['name']:<16} {r['rows']:>8} {r['p50_us']:>7.1f}us {r['p99_us']:>7.1f}us "
+              f"{r['total_s']:>10.2f}s {r['written']:>8}  {notes}")
+
+
+if __name__ == "__main__":
+    main()
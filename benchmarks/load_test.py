@@ -0,0 +1,390 @@
+"""
+Load generator for the /chat endpoint: throughput, latency percentiles,
+error rates and intent mix under a given serving configuration.
+
+Traffic is either replayed from the interaction logs (--replay: the log
+segments in --log-dir plus the legacy logs/interactions.csv, oldest
+first, looping if the run outlasts them) or synthesized from
+data/intents.csv: intents are drawn with their share of the labeled
+rows and each message is a labeled text of that intent (order intents
+get a known order ID from data/orders.csv half the time).
+
+Arrivals:
+- closed loop (default): --concurrency clients, each sending its next
+  message as soon as the previous reply arrives
+- open loop (--rate R): Poisson arrivals at R requests/s whatever the
+  server does (with --replay --replay-timing: the logged gaps, divided
+  by --speedup); latency is counted from the scheduled send time, so a
+  server that falls behind shows it
+
+Runs against api.app in this process through httpx's ASGI transport (no
+network; the app's startup / shutdown run as under uvicorn), configured
+with --backend / --workers / --max-concurrency / --max-queue /
+--timeout / --degrade-after / --no-degrade, or against
+a running server with --url. In-process runs log interactions and write
+cancellations to a temp dir (a scratch order write log over the loaded
+orders), not logs/ or data/orders_wal.jsonl.
+
+Reports requests/s, p50 / p90 / p99 / max latency, errors by status,
+the share of replies answered in degraded mode (overload), and the share of each intent in the replies (and, for synthetic
+traffic, in the requests). --output saves the numbers as JSON, tagged
+with --label, to compare configurations.
+
+Usage (from the repo root):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 64 --duration 30 --backend inline
+    python -m benchmarks.load_test --rate 500 --duration 20 --output results/thread.json
+    python -m benchmarks.load_test --replay --replay-timing --speedup 10
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 32
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import tempfile
+import time
+import warnings
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+from benchmarks.event_loop import percentile  # noqa: E402
+from chatbot.config import INTERACTION_LOG_DIR  # noqa: E402
+
+DATA_DIR = Path("data")
+ORDER_INTENTS = {"order_status", "cancel_order"}
+
+
+# -------------------------
+# Traffic
+# -------------------------
+
+
+def synthetic_traffic(n: int, seed: int = 0) -> list[tuple[str, str, float]]:
+    """
+    (message, requested intent, arrival gap) triples following the intent
+    mix of data/intents.csv. Gaps are None (the arrival process decides).
+    """
+    rng = random.Random(seed)
+    labeled = pd.read_csv(DATA_DIR / "intents.csv").astype(str)
+    texts = labeled.groupby("intent")["text"].apply(list).to_dict()
+    intents = labeled["intent"].tolist()
+    order_ids = pd.read_csv(DATA_DIR / "orders.csv")["order_id"].astype(str).tolist()
+
+    traffic = []
+    for _ in range(n):
+        intent = rng.choice(intents)
+        text = rng.choice(texts[intent])
+        if intent in ORDER_INTENTS and rng.random() < 0.5:
+            text = f"{text} {rng.choice(order_ids)}"
+        traffic.append((text, intent, None))
+    return traffic
+
+
+def logged_traffic(log_dir: str) -> list[tuple[str, str, float]]:
+    """
+    (message, logged intent, seconds since the previous message) for every
+    logged interaction, oldest first.
+    """
+    from chatbot.interaction_log import read_interactions
+
+    logs = read_interactions(log_dir).sort_values("timestamp")
+    logs = logs[logs["user_text"].astype(str).str.strip() != ""]
+    if logs.empty:
+        raise SystemExit(f"No logged interactions in {log_dir} or logs/interactions.csv")
+    gaps = logs["timestamp"].diff().dt.total_seconds().fillna(0.0).clip(lower=0.0)
+    return list(zip(logs["user_text"].astype(str), logs["intent"].astype(str), gaps))
+
+
+def schedule(traffic: list, rate: float | None, replay_timing: bool, speedup: float, seed: int):
+    """
+    Open-loop send times (seconds from the start), one per message, cycling
+    through the traffic; None for closed loop.
+    """
+    if rate is None and not replay_timing:
+        return None
+    return _send_times(traffic, rate, replay_timing, speedup, random.Random(seed))
+
+
+def _send_times(traffic: list, rate: float | None, replay_timing: bool, speedup: float, rng):
+    t = 0.0
+    i = 0
+    while True:
+        if replay_timing:
+            t += traffic[i % len(traffic)][2] / speedup
+        else:
+            t += rng.expovariate(rate)
+        yield t
+        i += 1
+
+
+# -------------------------
+# Load
+# -------------------------
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.sent_intents = Counter()
+        self.reply_intents = Counter()
+        self.degraded = 0
+
+    def record(
+        self,
+        latency: float,
+        status: str,
+        sent_intent: str,
+        reply_intent: str | None,
+        degraded: bool = False,
+    ) -> None:
+        self.latencies.append(latency)
+        self.degraded += degraded
+        self.statuses[status] += 1
+        self.sent_intents[sent_intent] += 1
+        if reply_intent is not None:
+            self.reply_intents[reply_intent] += 1
+
+
+async def send(client: httpx.AsyncClient, message: str, due: float, results: Results, intent: str) -> None:
+    """
+    One /chat call; latency runs from `due` (its scheduled send time).
+    """
+    reply_intent = None
+    degraded = False
+    # Scheduled send time, so the server's deadlines count from it
+    sent = time.time() - (time.perf_counter() - due)
+    try:
+        r = await client.post(
+            "/chat", json={"message": message}, headers={"X-Request-Start": f"t={int(sent * 1e6)}"}
+        )
+        status = str(r.status_code)
+        if r.status_code == 200:
+            reply = r.json()
+            reply_intent = reply["intent"]
+            degraded = reply.get("degraded", False)
+    except httpx.HTTPError as exc:
+        status = type(exc).__name__
+    results.record(time.perf_counter() - due, status, intent, reply_intent, degraded)
+
+
+async def closed_loop(client, traffic: list, concurrency: int, duration: float, max_requests: int | None) -> Results:
+    results = Results()
+    next_message = iter(range(max_requests) if max_requests else itertools.count())
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        for i in next_message:
+            if time.perf_counter() >= deadline:
+                return
+            message, intent, _ = traffic[i % len(traffic)]
+            await send(client, message, time.perf_counter(), results, intent)
+            # In-process, a request that never waits (e.g. shed at once)
+            # completes without yielding: let the other clients run
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    return results
+
+
+async def open_loop(client, traffic: list, send_times, duration: float, max_requests: int | None) -> Results:
+    results = Results()
+    tasks = []
+    start = time.perf_counter()
+    for i, offset in enumerate(send_times):
+        if offset >= duration or (max_requests and i >= max_requests):
+            break
+        due = start + offset
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        message, intent, _ = traffic[i % len(traffic)]
+        tasks.append(asyncio.create_task(send(client, message, due, results, intent)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def run_load(args, traffic: list) -> tuple[Results, float]:
+    send_times = schedule(traffic, args.rate, args.replay_timing, args.speedup, args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100), max_keepalive_connections=None)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.client_timeout)
+        lifespan = None
+    else:
+        import api
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app), base_url="http://loadtest",
+            timeout=args.client_timeout,
+        )
+        lifespan = api.lifespan(api.app)
+
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            # Warm-up: FAQ index load, first calls through sklearn / scipy
+            for message, intent, _ in traffic[:args.warmup]:
+                await send(client, message, time.perf_counter(), Results(), intent)
+
+            start = time.perf_counter()
+            if send_times is None:
+                results = await closed_loop(client, traffic, args.concurrency, args.duration, args.requests)
+            else:
+                results = await open_loop(client, traffic, send_times, args.duration, args.requests)
+            elapsed = time.perf_counter() - start
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+    return results, elapsed
+
+
+def configure_app(args, log_dir: Path) -> dict:
+    """
+    Point api.py at the requested executor settings, a scratch
+    interaction log and a scratch order write log. Returns the settings
+    used.
+    """
+    import api
+    from chatbot import handlers
+    from chatbot.executor import ChatExecutor
+    from chatbot.interaction_log import InteractionLogger
+    from chatbot.order_wal import OrderWriteLog
+    from chatbot.orders import OverlayOrderStore
+
+    executor = api.CHAT_EXECUTOR
+    api.CHAT_EXECUTOR = ChatExecutor(
+        backend=args.backend or executor.backend,
+        workers=args.workers or executor.workers,
+        max_concurrency=args.max_concurrency or executor.max_concurrency,
+        timeout=executor.timeout if args.timeout is None else (args.timeout or None),
+        max_queue=executor.max_queue if args.max_queue is None else (args.max_queue or None),
+    )
+    api.INTERACTION_LOG = InteractionLogger(log_dir=log_dir)
+    # Cancellations must not touch the real orders: a fresh overlay over
+    # the loaded ones, logged next to the interactions
+    handlers.ORDER_STORE = OverlayOrderStore(handlers.ORDER_STORE.base)
+    handlers.ORDER_LOG = api.ORDER_LOG = OrderWriteLog(handlers.ORDER_STORE, log_dir / "orders_wal.jsonl")
+    if args.no_degrade:
+        api.CHAT_DEGRADE_ON_OVERLOAD = False
+    if args.degrade_after is not None:
+        api.CHAT_DEGRADE_QUEUE_SECONDS = args.degrade_after
+    return {
+        "backend": api.CHAT_EXECUTOR.backend,
+        "workers": api.CHAT_EXECUTOR.workers,
+        "max_concurrency": api.CHAT_EXECUTOR.max_concurrency,
+        "max_queue": api.CHAT_EXECUTOR.max_queue,
+        "timeout": api.CHAT_EXECUTOR.timeout,
+        "degrade": api.CHAT_DEGRADE_ON_OVERLOAD,
+        "degrade_after": api.CHAT_DEGRADE_QUEUE_SECONDS,
+    }
+
+
+# -------------------------
+# Report
+# -------------------------
+
+
+def summarize(results: Results, elapsed: float) -> dict:
+    n = len(results.latencies)
+    ok = results.statuses.get("200", 0)
+    replies = sum(results.reply_intents.values())
+    sent = sum(results.sent_intents.values())
+    return {
+        "requests": n,
+        "seconds": round(elapsed, 3),
+        "requests_per_s": n / elapsed if elapsed else 0.0,
+        "ok_per_s": ok / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            q: percentile(results.latencies, p) * 1000
+            for q, p in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        } if n else {},
+        "error_rate": (n - ok) / n if n else 0.0,
+        "degraded_rate": results.degraded / n if n else 0.0,
+        "statuses": dict(results.statuses),
+        "reply_intents": {k: v / replies for k, v in results.reply_intents.most_common()},
+        "sent_intents": {k: v / sent for k, v in results.sent_intents.most_common()},
+    }
+
+
+def print_report(summary: dict, replay: bool) -> None:
+    lat = summary["latency_ms"]
+    print(f"\nrequests  {summary['requests']} in {summary['seconds']:.1f}s: "
+          f"{summary['requests_per_s']:.0f} req/s ({summary['ok_per_s']:.0f} ok/s)")
+    if lat:
+        print(f"latency   p50 {lat['p50']:.1f}ms  p90 {lat['p90']:.1f}ms  "
+              f"p99 {lat['p99']:.1f}ms  max {lat['max']:.1f}ms")
+    statuses = ", ".join(f"{status} {count}" for status, count in sorted(summary["statuses"].items()))
+    print(f"errors    {summary['error_rate']:.2%}  ({statuses}), degraded {summary['degraded_rate']:.2%}")
+
+    sent_label = "logged" if replay else "sent"
+    print(f"\n{'intent':<15} {sent_label:>7} {'replied':>8}")
+    for intent in sorted(set(summary["sent_intents"]) | set(summary["reply_intents"])):
+        print(f"{intent:<15} {summary['sent_intents'].get(intent, 0):>7.1%} "
+              f"{summary['reply_intents'].get(intent, 0):>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--replay", action="store_true", help="replay logged messages instead of synthetic ones")
+    parser.add_argument("--log-dir", default=INTERACTION_LOG_DIR)
+    parser.add_argument("--replay-timing", action="store_true",
+                        help="open loop with the logged inter-arrival gaps (needs --replay)")
+    parser.add_argument("--speedup", type=float, default=1.0, help="divide logged gaps by this")
+    parser.add_argument("--rate", type=float, default=None, help="open loop: Poisson arrivals per second")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed loop: concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring")
+    parser.add_argument("--url", default=None, help="load a running server instead of api.app in-process")
+    parser.add_argument("--backend", choices=["thread", "process", "inline"], default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=None, help="admission queue bound (0 = none)")
+    parser.add_argument("--timeout", type=float, default=None, help="request deadline (0 = none)")
+    parser.add_argument("--degrade-after", type=float, default=None,
+                        help="answer in degraded mode once a request is this many seconds old")
+    parser.add_argument("--no-degrade", action="store_true", help="503 instead of degraded replies")
+    parser.add_argument("--client-timeout", type=float, default=60.0)
+    parser.add_argument("--label", default=None, help="name of this configuration in --output")
+    parser.add_argument("--output", default=None, help="save the summary as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.replay_timing and not args.replay:
+        parser.error("--replay-timing needs --replay")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+
+    traffic = logged_traffic(args.log_dir) if args.replay else synthetic_traffic(10_000, args.seed)
+    with tempfile.TemporaryDirectory(prefix="load-test-logs-") as log_dir:
+        config = {"url": args.url} if args.url else configure_app(args, Path(log_dir))
+        mode = "closed loop" if args.rate is None and not args.replay_timing else "open loop"
+        print(f"{mode}, {'replayed' if args.replay else 'synthetic'} traffic, "
+              + ", ".join(f"{k}={v}" for k, v in config.items()))
+        results, elapsed = asyncio.run(run_load(args, traffic))
+
+    summary = summarize(results, elapsed)
+    print_report(summary, args.replay)
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "label": args.label,
+            "mode": mode,
+            "traffic": "replay" if args.replay else "synthetic",
+            "concurrency": args.concurrency if mode == "closed loop" else None,
+            "rate": args.rate,
+            "config": config,
+            **summary,
+        }
+        out.write_text(json.dumps(payload, indent=2))
+        print(f"\nSaved to {out}")
+
+
+if __name__ == "__main__":
+    main()
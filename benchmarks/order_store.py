@@ -0,0 +1,141 @@
+"""
+Benchmark: order lookup latency and memory, DataFrame vs. order stores.
+
+Generates a synthetic orders CSV shaped like data/orders.csv and compares
+the original pandas DataFrame lookup (`order_id in df.index` + `.loc`)
+with the compact in-memory store and the SQLite store.
+
+Usage (from the repo root):
+    python -m benchmarks.order_store
+    python -m benchmarks.order_store --rows 100000 1000000 10000000
+"""
+import argparse
+import functools
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from chatbot.orders import CompactOrderStore, SqliteOrderStore, build_sqlite_store
+
+STATUSES = ["Processing", "Shipped", "Delivered", "Cancelled"]
+PROVIDERS = ["DHL", "FedEx", "UPS", "Postal Service"]
+
+
+def write_synthetic_orders(path: Path, n_rows: int, rng) -> np.ndarray:
+    """
+    Write n_rows fake orders to path; returns the (integer) order IDs.
+    """
+    ids = rng.choice(np.arange(100_000, 100_000 + n_rows * 4), size=n_rows, replace=False)
+    etas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")
+    df = pd.DataFrame({
+        "order_id": ids,
+        "status": np.array(STATUSES)[rng.integers(0, len(STATUSES), n_rows)],
+        "eta": etas.strftime("%Y-%m-%d"),
+        "total": [f"${c / 100:.2f}" for c in rng.integers(500, 50_000, n_rows)],
+        "shipping_provider": np.array(PROVIDERS)[rng.integers(0, len(PROVIDERS), n_rows)],
+    })
+    df.to_csv(path, index=False)
+    return ids
+
+
+def load_dataframe(path: Path) -> pd.DataFrame:
+    # The original chatbot/handlers.py loading code
+    df = pd.read_csv(path)
+    for col in ["order_id", "status", "eta", "total", "shipping_provider"]:
+        df[col] = df[col].astype(str)
+    return df.set_index("order_id")
+
+
+def dataframe_lookup(df: pd.DataFrame, order_id: str):
+    if order_id in df.index:
+        row = df.loc[order_id]
+        return {
+            "status": row["status"],
+            "eta": row["eta"],
+            "total": row["total"],
+            "shipping_provider": row["shipping_provider"],
+        }
+    return None
+
+
+def measure_load(loader):
+    """
+    Return (result, seconds, bytes still allocated) for loader().
+
+    Timing and memory come from separate runs because tracemalloc slows
+    the loader down considerably.
+    """
+    tracemalloc.start()
+    kept = loader()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    start = time.perf_counter()
+    result = loader()
+    elapsed = time.perf_counter() - start
+    return result, elapsed, current
+
+
+def time_lookups(lookup, keys) -> np.ndarray:
+    timings = np.empty(len(keys))
+    for i, key in enumerate(keys):
+        start = time.perf_counter()
+        lookup(key)
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6  # microseconds
+
+
+def run(row_counts: list[int], n_lookups: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    print(f"{'rows':>10} {'backend':>9} {'load_s':>8} {'mem_MB':>8} "
+          f"{'hit p50':>9} {'miss p50':>9} {'bulk/id':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in row_counts:
+            csv_path = Path(tmp) / f"orders_{n_rows}.csv"
+            db_path = Path(tmp) / f"orders_{n_rows}.sqlite"
+            ids = write_synthetic_orders(csv_path, n_rows, rng)
+
+            hits = [str(i) for i in rng.choice(ids, size=n_lookups)]
+            misses = [str(i) for i in rng.integers(10, 99_999, size=n_lookups)]
+
+            df, df_s, df_mem = measure_load(lambda: load_dataframe(csv_path))
+            compact, compact_s, compact_mem = measure_load(lambda: CompactOrderStore.from_csv(csv_path))
+            start = time.perf_counter()
+            build_sqlite_store(csv_path, db_path)
+            sqlite_s = time.perf_counter() - start
+            sqlite = SqliteOrderStore(db_path)
+
+            backends = [
+                ("dataframe", df_s, df_mem, functools.partial(dataframe_lookup, df), None),
+                ("compact", compact_s, compact_mem, compact.get_order, compact.get_orders),
+                ("sqlite", sqlite_s, 0, sqlite.get_order, sqlite.get_orders),
+            ]
+            for name, load_s, mem, lookup, bulk in backends:
+                hit_t = time_lookups(lookup, hits)
+                miss_t = time_lookups(lookup, misses)
+                if bulk is not None:
+                    start = time.perf_counter()
+                    bulk(hits)
+                    bulk_us = (time.perf_counter() - start) / len(hits) * 1e6
+                    bulk_col = f"{bulk_us:>7.2f}us"
+                else:
+                    bulk_col = f"{'-':>9}"
+                print(f"{n_rows:>10} {name:>9} {load_s:>8.2f} {mem / 1e6:>8.1f} "
+                      f"{np.median(hit_t):>7.1f}us {np.median(miss_t):>7.1f}us {bulk_col}")
+
+            del df, compact, sqlite
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.rows, args.lookups, args.seed)
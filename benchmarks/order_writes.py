@@ -0,0 +1,139 @@
+"""
+Benchmark: cancellations per second through the order write log.
+
+Builds a compact order store of --orders synthetic orders (all in
+"Processing") and has --threads writer threads cancel distinct orders
+through OrderWriteLog.write() for --duration seconds, the way
+handlers.cancel_order() does (status check + append + fsync + publish).
+
+Modes:
+- per-write: max_batch=1, one fsync per cancellation (no group commit)
+- group: everything pending when the committer wakes shares one fsync
+- group+delay: the committer waits --delay ms for more writers first
+- no-fsync: group commit without fsync (survives a process crash only)
+
+Reports cancellations/s, fsyncs/s, average batch size and p50 / p99
+latency per cancellation, then the time to replay the largest log into a
+fresh store (what startup costs).
+
+Usage (from the repo root):
+    python -m benchmarks.order_writes
+    python -m benchmarks.order_writes --threads 1 8 64 --duration 5 --delay 1
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.event_loop import percentile
+from benchmarks.order_store import write_synthetic_orders
+from chatbot.order_wal import OrderWriteLog
+from chatbot.orders import CompactOrderStore, OverlayOrderStore
+
+
+def load_processing_orders(work_dir: Path, n_orders: int, rng) -> tuple[CompactOrderStore, list[str]]:
+    csv_path = work_dir / "orders.csv"
+    ids = write_synthetic_orders(csv_path, n_orders, rng)
+    df = pd.read_csv(csv_path, dtype=str)
+    df["status"] = "Processing"
+    return CompactOrderStore.from_frame(df), [str(i) for i in ids]
+
+
+def run_mode(base, order_ids: list[str], path: Path, threads: int, duration: float, **log_args) -> dict:
+    store = OverlayOrderStore(base)
+    log = OrderWriteLog(store, path, **log_args)
+    log.start()
+    # Each thread cancels its own slice of orders, so every write is accepted
+    slices = [order_ids[i::threads] for i in range(threads)]
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+    stop = threading.Event()
+
+    def writer(i):
+        barrier.wait()
+        for order_id in slices[i]:
+            if stop.is_set():
+                break
+            t0 = time.perf_counter()
+            log.write(order_id, {"status": "Cancelled"}, expected={"status": "Processing"})
+            latencies[i].append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    stop.wait(duration)
+    stop.set()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    log.stop()
+
+    stats = log.stats()
+    all_latencies = [x for per_thread in latencies for x in per_thread]
+    return {
+        "per_s": stats["writes"] / elapsed,
+        "fsyncs_per_s": stats["fsyncs"] / elapsed,
+        "avg_batch": stats["avg_batch"],
+        "rejected": stats["rejected"],
+        "p50_ms": percentile(all_latencies, 0.5) * 1000,
+        "p99_ms": percentile(all_latencies, 0.99) * 1000,
+        "writes": stats["writes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per run")
+    parser.add_argument("--delay", type=float, default=1.0, help="group+delay commit delay (ms)")
+    parser.add_argument("--dir", type=Path, default=None,
+                        help="where to put the logs (default: a temp dir; fsync cost depends on the disk)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    work_dir = Path(tempfile.mkdtemp(prefix="order-writes-bench-", dir=args.dir))
+    modes = {
+        "per-write": {"max_batch": 1},
+        "group": {},
+        "group+delay": {"commit_delay": args.delay / 1000},
+        "no-fsync": {"fsync": False},
+    }
+    try:
+        base, order_ids = load_processing_orders(work_dir, args.orders, rng)
+        print(f"{args.orders:,} orders, logs in {work_dir}\n")
+        print(f"{'mode':<12} {'threads':>7} {'cancels/s':>10} {'fsyncs/s':>9} {'batch':>7} "
+              f"{'p50':>9} {'p99':>9}")
+        largest = (0, None)
+        for name, log_args in modes.items():
+            for threads in args.threads:
+                path = work_dir / f"{name}-{threads}.jsonl"
+                r = run_mode(base, order_ids, path, threads, args.duration, **log_args)
+                print(f"{name:<12} {threads:>7} {r['per_s']:>10.0f} {r['fsyncs_per_s']:>9.0f} "
+                      f"{r['avg_batch']:>7.1f} {r['p50_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms")
+                largest = max(largest, (r["writes"], path), key=lambda x: x[0])
+
+        writes, path = largest
+        if path is not None:
+            store = OverlayOrderStore(base)
+            log = OrderWriteLog(store, path)
+            t0 = time.perf_counter()
+            log.start()
+            elapsed = time.perf_counter() - t0
+            log.stop()
+            print(f"\nreplay: {writes:,} records ({path.stat().st_size / 2**20:.1f}MB) "
+                  f"into a fresh store in {elapsed * 1000:.0f}ms, {store.overlay_size:,} orders cancelled")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Per-worker memory and throughput scaling: serve.py (load once, fork
+workers) vs. `uvicorn api:app --workers N` (every worker imports and
+loads everything itself).
+
+For each worker count the server is started, every worker is warmed up
+(so lazily loaded data such as the FAQ index is resident), /chat load is
+sent from --clients connections and then, per worker process:
+- USS: memory only that worker uses (Private_Clean + Private_Dirty)
+- PSS: USS plus its share of pages shared with the parent / siblings
+are read from /proc/<pid>/smaps_rollup (Linux only).
+
+Usage (from the repo root):
+    python -m benchmarks.prefork
+    python -m benchmarks.prefork --workers 1 2 4 8 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.event_loop import send_load, wait_until_up
+
+PORT = 8766
+
+
+def child_pids(pid: int) -> list[int]:
+    pids = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        for child in (task / "children").read_text().split():
+            pids.append(int(child))
+            pids.extend(child_pids(int(child)))
+    return pids
+
+
+def worker_pids(server_pid: int) -> list[int]:
+    workers = []
+    for pid in child_pids(server_pid):
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+        if b"resource_tracker" not in cmdline:
+            workers.append(pid)
+    return workers
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    return {
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+        "pss": fields["Pss"],
+        "rss": fields["Rss"],
+    }
+
+
+def start_server(mode: str, workers: int) -> subprocess.Popen:
+    if mode == "prefork":
+        cmd = [sys.executable, "serve.py", "--port", str(PORT),
+               "--workers", str(workers), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "api:app", "--port", str(PORT),
+               "--workers", str(workers), "--log-level", "warning"]
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    return subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+
+
+def run(mode: str, workers: int, args) -> dict:
+    url = f"http://127.0.0.1:{PORT}"
+    server = start_server(mode, workers)
+    try:
+        wait_until_up(url)
+        # Every worker must be up (uvicorn starts them one by one) and warm
+        # (`uvicorn --workers 1` serves from the main process itself)
+        expected = workers if mode == "prefork" or workers > 1 else 0
+        deadline = time.time() + 60
+        while len(worker_pids(server.pid)) < expected and time.time() < deadline:
+            time.sleep(0.2)
+        asyncio.run(send_load(url, 20 * workers, args.clients, 1))
+
+        start = time.perf_counter()
+        statuses = asyncio.run(send_load(url, args.requests, args.clients, 1))
+        elapsed = time.perf_counter() - start
+
+        pids = worker_pids(server.pid)
+        per_worker = [memory_kb(pid) for pid in pids]
+        parent = memory_kb(server.pid) if pids else {"pss": 0}
+        if not pids:
+            per_worker = [memory_kb(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    n = len(per_worker)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "rps": args.requests / elapsed,
+        "errors": sum(status != 200 for status in statuses),
+        "uss_mb": sum(m["uss"] for m in per_worker) / n / 1024,
+        "pss_mb": sum(m["pss"] for m in per_worker) / n / 1024,
+        "rss_mb": sum(m["rss"] for m in per_worker) / n / 1024,
+        "total_pss_mb": (parent["pss"] + sum(m["pss"] for m in per_worker)) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--modes", nargs="+", default=["uvicorn", "prefork"])
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'mode':<8} {'workers':>7} {'req/s':>8} {'errors':>6} "
+          f"{'USS/worker':>11} {'PSS/worker':>11} {'RSS/worker':>11} {'total PSS':>10}")
+    for workers in args.workers:
+        for mode in args.modes:
+            r = run(mode, workers, args)
+            print(f"{r['mode']:<8} {r['workers']:>7} {r['rps']:>8.0f} {r['errors']:>6} "
+                  f"{r['uss_mb']:>9.1f}MB {r['pss_mb']:>9.1f}MB {r['rss_mb']:>9.1f}MB "
+                  f"{r['total_pss_mb']:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Session store cost at hundreds of thousands of concurrent conversations.
+
+For each store (in-memory with 1 and SESSION_SHARDS shards, SQLite):
+- memory per session (tracemalloc, in-memory stores only)
+- p50 / p99 of one chat turn's store work: get() + put()
+- turns per second with --threads threads hammering random sessions
+- expiry: time for a put() that drops a whole shard's worth of
+  expired sessions, and for a full sweep()
+
+Usage (from the repo root):
+    python -m benchmarks.sessions
+    python -m benchmarks.sessions --sessions 500000 --threads 8
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from chatbot.config import SESSION_SHARDS
+from chatbot.sessions import MemorySessionStore, SessionState, SqliteSessionStore, new_session_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Turn:
+    next_intent = "order_status"
+    order_id = "123456"
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return (
+        samples[len(samples) // 2] * 1e6,
+        samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e6,
+    )
+
+
+def fill(store, ids: list[str]) -> None:
+    state = SessionState(created_at=time.time())
+    for session_id in ids:
+        store.put(session_id, state)
+
+
+def turn(store, session_id: str) -> None:
+    state = store.get(session_id) or SessionState()
+    store.put(session_id, state.advance(Turn))
+
+
+def bench_latency(store, ids: list[str], turns: int) -> tuple[float, float]:
+    picks = random.choices(ids, k=turns)
+    samples = []
+    for session_id in picks:
+        start = time.perf_counter()
+        turn(store, session_id)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_threads(store, ids: list[str], threads: int, seconds: float) -> float:
+    done = [0] * threads
+    stop = threading.Event()
+
+    def worker(i: int) -> None:
+        rng = random.Random(i)
+        n = 0
+        while not stop.is_set():
+            for _ in range(100):
+                turn(store, rng.choice(ids))
+            n += 100
+        done[i] = n
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+def bench_memory(n: int, shards: int) -> tuple[MemorySessionStore, list[str], float]:
+    ids = [new_session_id() for _ in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = MemorySessionStore(max_sessions=n, shards=shards)
+    # Realistic records: order intent + an order ID string of their own
+    for i, session_id in enumerate(ids):
+        store.put(session_id, SessionState("order_status", str(100000 + i), 3, time.time()))
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / n
+    tracemalloc.stop()
+    return store, ids, per_session
+
+
+def bench_expiry(n: int, shards: int) -> tuple[float, float]:
+    clock = FakeClock()
+    store = MemorySessionStore(max_sessions=n, ttl=60, shards=shards, clock=clock)
+    fill(store, [new_session_id() for _ in range(n)])
+    clock.now += 120
+    start = time.perf_counter()
+    store.put(new_session_id(), SessionState())
+    one_shard = time.perf_counter() - start
+    start = time.perf_counter()
+    store.sweep()
+    return one_shard, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--turns", type=int, default=50_000, help="timed turns per store")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of the threaded run")
+    parser.add_argument("--sqlite-sessions", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions, {args.threads} threads")
+    print(f"{'store':<22} {'bytes/session':>14} {'turn p50':>10} {'turn p99':>10} {'turns/s':>10}")
+    for shards in (1, SESSION_SHARDS):
+        store, ids, per_session = bench_memory(args.sessions, shards)
+        p50, p99 = bench_latency(store, ids, args.turns)
+        rate = bench_threads(store, ids, args.threads, args.seconds)
+        print(f"{f'memory, {shards} shards':<22} {per_session:>14.0f} {p50:>8.1f}us {p99:>8.1f}us {rate:>10.0f}")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="sessions-bench-"))
+    try:
+        store = SqliteSessionStore(work_dir / "sessions.sqlite", max_sessions=args.sqlite_sessions * 2)
+        ids = [new_session_id() for _ in range(args.sqlite_sessions)]
+        fill(store, ids)
+        p50, p99 = bench_latency(store, ids, min(args.turns, 10_000))
+        rate = bench_threads(store, ids, args.threads, args.seconds)
+        print(f"{f'sqlite ({args.sqlite_sessions})':<22} {'-':>14} {p50:>8.1f}us {p99:>8.1f}us {rate:>10.0f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+    one_shard, sweep = bench_expiry(args.sessions, SESSION_SHARDS)
+    print(f"\nexpiring all {args.sessions} sessions ({SESSION_SHARDS} shards): "
+          f"first put() {one_shard * 1000:.1f}ms (one shard), sweep() {sweep * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Training time and peak memory of train_intent_model.py: the default
+in-memory mode (TfidfVectorizer + LogisticRegression) vs. --streaming
+(chunked CSV, hashed features, SGD, parallel CV), on synthetic labeled
+CSVs of growing size.
+
+Rows are intents.csv examples plus a few random words and a random
+token (like the order IDs and typos in real logs), so the vocabulary
+keeps growing with the data, as it does with logged messages.
+
+Each run is a separate process; numbers are the script's own report
+(wall time, peak RSS of the main process and of the largest CV worker).
+
+Usage (from the repo root):
+    python -m benchmarks.training
+    python -m benchmarks.training --rows 10000 100000 1000000 --streaming-args --epochs 2
+"""
+import argparse
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path("data")
+REPORT = re.compile(r"Training time: ([\d.]+)s, peak memory: (\d+)MB(?: \(largest CV worker: (\d+)MB\))?")
+
+
+def synthetic_dataset(n: int, path: Path, seed: int = 0) -> None:
+    base = pd.read_csv(DATA_DIR / "intents.csv")
+    texts = base["text"].astype(str).tolist()
+    words = sorted({w for text in texts for w in text.lower().split()})
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(texts), n)
+    extra = rng.integers(0, len(words), (n, 2))
+    tokens = rng.integers(0, 10 * n, n)
+    pd.DataFrame({
+        "text": [f"{texts[p]} {words[a]} {words[b]} x{t}" for p, (a, b), t in zip(picks, extra, tokens)],
+        "intent": base["intent"].to_numpy()[picks],
+    }).to_csv(path, index=False)
+
+
+def run(data_path: Path, model_dir: Path, extra: list[str]) -> dict:
+    out = subprocess.run(
+        [sys.executable, "train_intent_model.py", "--data", str(data_path), "--model-dir", str(model_dir)] + extra,
+        capture_output=True, text=True,
+    )
+    match = REPORT.search(out.stdout)
+    if out.returncode != 0 or match is None:
+        return {"error": (out.stderr or out.stdout).strip().splitlines()[-1]}
+    accuracy = re.findall(r"CV accuracy ([\d.]+)", out.stdout)
+    return {
+        "seconds": float(match.group(1)),
+        "peak_mb": int(match.group(2)),
+        "worker_mb": int(match.group(3)) if match.group(3) else None,
+        "cv_accuracy": max(map(float, accuracy)) if accuracy else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--streaming-args", nargs=argparse.REMAINDER, default=[],
+                        help="extra flags for --streaming runs (e.g. --epochs 2 --jobs 4)")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="training-bench-"))
+    try:
+        print(f"{'rows':>9} {'mode':<10} {'time':>8} {'peak RSS':>9} {'CV worker':>10} {'CV acc':>7}")
+        for n in args.rows:
+            data_path = work_dir / f"intents_{n}.csv"
+            synthetic_dataset(n, data_path)
+            for mode, extra in (("in-memory", []), ("streaming", ["--streaming"] + args.streaming_args)):
+                r = run(data_path, work_dir / f"model_{mode}_{n}", extra)
+                if "error" in r:
+                    print(f"{n:>9} {mode:<10} failed: {r['error']}")
+                    continue
+                worker = f"{r['worker_mb']}MB" if r["worker_mb"] is not None else "-"
+                acc = f"{r['cv_accuracy']:.3f}" if r["cv_accuracy"] is not None else "-"
+                print(f"{n:>9} {mode:<10} {r['seconds']:>7.1f}s {r['peak_mb']:>7}MB {worker:>10} {acc:>7}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Chat throughput of one API worker per transport: a new HTTP connection
+per turn (what the web widget did), HTTP keep-alive, and /ws/chat with
+one persistent WebSocket per conversation.
+
+Starts api.py under uvicorn (one worker, thread executor) in a
+subprocess, then for every --connections count runs that many
+concurrent conversations of --turns messages each (unique messages, so
+every turn runs the classifier). WebSocket conversations send all their
+messages up front (pipelined) and read the replies as they come.
+
+Reports turns/s, per-turn latency (sent -> reply; for pipelined turns it
+includes waiting behind earlier turns of the same conversation), time
+to the intent frame, open connections seen by the server and its RSS.
+
+Usage (from the repo root):
+    python -m benchmarks.websocket
+    python -m benchmarks.websocket --connections 10 100 1000 --turns 20
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.event_loop import TEMPLATES, percentile, wait_until_up
+
+PORT = 8766
+URL = f"http://127.0.0.1:{PORT}"
+WS_URL = f"ws://127.0.0.1:{PORT}/ws/chat"
+
+SERVER = """
+import warnings
+warnings.filterwarnings("ignore")
+import uvicorn
+import api
+from chatbot.executor import ChatExecutor
+api.CHAT_EXECUTOR = ChatExecutor(backend="thread", max_concurrency=256, timeout=None)
+uvicorn.run(api.app, host="127.0.0.1", port={port}, log_level="warning", backlog=4096)
+"""
+
+
+def message(conversation: int, turn: int) -> str:
+    return TEMPLATES[turn % len(TEMPLATES)].format(i=f"{conversation}-{turn}")
+
+
+def server_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_connections() -> int:
+    async with httpx.AsyncClient(base_url=URL) as client:
+        text = (await client.get("/metrics")).text
+    for line in text.splitlines():
+        if line.startswith("chatbot_websocket_connections "):
+            return int(float(line.split()[1]))
+    return 0
+
+
+# -------------------------
+# Transports
+# -------------------------
+
+
+class HttpConnection:
+    """
+    Minimal HTTP/1.1 client on a raw socket, so client overhead is as
+    small for HTTP as it is for the WebSocket client.
+    """
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", PORT)
+        return self
+
+    async def post_chat(self, text: str, keepalive: bool = True) -> int:
+        body = json.dumps({"message": text}).encode()
+        self.writer.write(
+            b"POST /chat HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+            + (b"" if keepalive else b"Connection: close\r\n")
+            + b"Content-Length: %d\r\n\r\n" % len(body) + body
+        )
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await self.reader.readexactly(length)
+        return status
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def http_conversation(conversation: int, turns: int, latencies: list, keepalive: bool, errors: list):
+    conn = await HttpConnection().open() if keepalive else None
+    for turn in range(turns):
+        start = time.perf_counter()
+        if not keepalive:
+            # Connect, send one turn, close: no connection reuse
+            conn = await HttpConnection().open()
+        status = await conn.post_chat(message(conversation, turn), keepalive)
+        if not keepalive:
+            await conn.close()
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+    if keepalive:
+        await conn.close()
+
+
+async def ws_conversation(conversation: int, turns: int, latencies: list, intent_latencies: list,
+                          errors: list, ready: asyncio.Barrier, opened: asyncio.Event):
+    async with connect(WS_URL, open_timeout=120, ping_interval=None) as ws:
+        json.loads(await ws.recv())  # session frame
+        await ready.wait()
+        await opened.wait()
+
+        sent = {}
+        for turn in range(turns):
+            sent[turn] = time.perf_counter()
+            await ws.send(json.dumps({"message": message(conversation, turn), "id": turn}))
+
+        replies = 0
+        while replies < turns:
+            frame = json.loads(await ws.recv())
+            elapsed = time.perf_counter() - sent[frame["id"]]
+            if frame["type"] == "intent":
+                intent_latencies.append(elapsed)
+            else:
+                latencies.append(elapsed)
+                replies += 1
+                if frame["type"] == "error":
+                    errors.append(frame["status"])
+
+
+async def run_mode(mode: str, n: int, turns: int) -> dict:
+    latencies, intent_latencies, errors = [], [], []
+    seen_open = None
+
+    if mode == "websocket":
+        ready = asyncio.Barrier(n + 1)
+        opened = asyncio.Event()
+        tasks = [
+            asyncio.create_task(ws_conversation(i, turns, latencies, intent_latencies, errors, ready, opened))
+            for i in range(n)
+        ]
+        await ready.wait()  # every connection is open
+        seen_open = await open_connections()
+        start = time.perf_counter()
+        opened.set()
+        await asyncio.gather(*tasks)
+    else:
+        keepalive = mode == "http keep-alive"
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            http_conversation(i, turns, latencies, keepalive, errors) for i in range(n)
+        ])
+
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "connections": n,
+        "turns_per_s": n * turns / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "intent_p50_ms": percentile(intent_latencies, 0.5) * 1000 if intent_latencies else None,
+        "errors": len(errors),
+        "seen_open": seen_open,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--connections", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--turns", type=int, default=20, help="messages per conversation")
+    parser.add_argument("--modes", nargs="+", default=["http new conn", "http keep-alive", "websocket"])
+    args = parser.parse_args()
+
+    server = subprocess.Popen([sys.executable, "-c", SERVER.format(port=PORT)])
+    try:
+        wait_until_up(URL)
+        # Warm-up: thread pool start-up, FAQ index load
+        asyncio.run(run_mode("http keep-alive", 4, 5))
+
+        print(f"{'mode':<16} {'conns':>6} {'turns/s':>8} {'p50':>9} {'p99':>9} "
+              f"{'intent p50':>11} {'errors':>6} {'open':>6} {'RSS':>8}")
+        for n in args.connections:
+            for mode in args.modes:
+                r = asyncio.run(run_mode(mode, n, args.turns))
+                intent = f"{r['intent_p50_ms']:>9.1f}ms" if r["intent_p50_ms"] is not None else f"{'-':>11}"
+                seen = r["seen_open"] if r["seen_open"] is not None else "-"
+                print(f"{r['mode']:<16} {r['connections']:>6} {r['turns_per_s']:>8.0f} "
+                      f"{r['p50_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {intent} {r['errors']:>6} "
+                      f"{seen:>6} {server_rss_mb(server.pid):>6.0f}MB")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import argparse
+from pathlib import Path
+
+from chatbot.faq import build_faq_index, tenant_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the prebuilt FAQ vectorizer + inverted index.")
+    parser.add_argument("--tenant", default=None,
+                        help="build data/faqs/<tenant>.csv instead of the default data/faq.csv")
+    args = parser.parse_args()
+
+    data_path, index_dir = tenant_paths(args.tenant)
+    print("DATA_PATH:", data_path)
+    out_dir = build_faq_index(data_path, index_dir)
+    print(f"\nSaved FAQ vectorizer + inverted index to '{Path(out_dir).as_posix()}/'")
+
+
+if __name__ == "__main__":
+    main()
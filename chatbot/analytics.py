@@ -0,0 +1,345 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+
+from .config import (
+    ANALYTICS_CHECKPOINT_PATH,
+    ANALYTICS_CHECKPOINT_SECONDS,
+    ANALYTICS_MINUTE_RETENTION_HOURS,
+    ANALYTICS_RECENT_SIZE,
+    INTERACTION_LOG_DIR,
+)
+from .interaction_log import LEGACY_CSV, LOG_COLUMNS, read_segment_from, segment_files
+
+MINUTE = 60
+HOUR = 3600
+
+CHECKPOINT_VERSION = 1
+
+
+def _floor(ts: float, size: int) -> int:
+    return int(ts // size) * size
+
+
+def format_timestamp(ts: float) -> str:
+    """
+    UNIX time -> local ISO timestamp, as shown on the dashboard.
+    """
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+# -------------------------
+# Aggregates
+# -------------------------
+
+
+class AnalyticsStore:
+    """
+    Running aggregates over logged interactions:
+
+    - total and per-intent counters
+    - per-hour buckets (kept for the whole history) and per-minute
+      buckets (kept for the last `minute_retention_hours`), each a
+      Counter of intents
+    - the `recent_size` most recent interactions
+
+    Range queries combine whole hours with minute buckets at the edges,
+    so they touch at most (#hours in range + 120) buckets, never rows.
+    A bucket counts towards [start, end) if its start is in the range:
+    ranges resolve to the minute, or to the hour for data older than the
+    minute retention.
+    """
+
+    def __init__(
+        self,
+        recent_size: int = ANALYTICS_RECENT_SIZE,
+        minute_retention_hours: float = ANALYTICS_MINUTE_RETENTION_HOURS,
+    ):
+        self.minute_retention = minute_retention_hours * HOUR
+        self.total = 0
+        self.intent_counts = Counter()
+        self.hours = {}
+        self.minutes = {}
+        self.recent = deque(maxlen=recent_size)
+        self.first_ts = None
+        self.last_ts = None
+        # Minute buckets before this (hour-aligned) time have been dropped
+        self._minute_floor = 0
+
+    def add(self, columns: dict) -> int:
+        """
+        Fold a batch of rows (LOG_COLUMNS name -> list) into the aggregates.
+        """
+        timestamps = columns["timestamp"]
+        intents = columns["intent"]
+        if not timestamps:
+            return 0
+
+        # Count (bucket, intent) pairs first, then touch each bucket once
+        hour_keys = [int(ts // HOUR) * HOUR for ts in timestamps]
+        for (hour, intent), n in Counter(zip(hour_keys, intents)).items():
+            bucket = self.hours.get(hour)
+            if bucket is None:
+                bucket = self.hours[hour] = Counter()
+            bucket[intent] += n
+
+        floor = self._minute_floor
+        minute_keys = [int(ts // MINUTE) * MINUTE for ts in timestamps]
+        for (minute, intent), n in Counter(zip(minute_keys, intents)).items():
+            if minute < floor:
+                continue
+            bucket = self.minutes.get(minute)
+            if bucket is None:
+                bucket = self.minutes[minute] = Counter()
+            bucket[intent] += n
+
+        self.intent_counts.update(intents)
+        self.total += len(timestamps)
+        # Only the tail of a large batch can end up in the recent buffer
+        keep = -self.recent.maxlen if self.recent.maxlen else 0
+        self.recent.extend(zip(*(columns[name][keep:] for name in LOG_COLUMNS)))
+
+        low, high = min(timestamps), max(timestamps)
+        self.first_ts = low if self.first_ts is None else min(self.first_ts, low)
+        self.last_ts = high if self.last_ts is None else max(self.last_ts, high)
+        self._prune_minutes()
+        return len(timestamps)
+
+    def _prune_minutes(self) -> None:
+        floor = _floor(self.last_ts - self.minute_retention, HOUR)
+        if floor <= self._minute_floor:
+            return
+        self._minute_floor = floor
+        for minute in [m for m in self.minutes if m < floor]:
+            del self.minutes[minute]
+
+    def _bounds(self, start: float | None, end: float | None) -> tuple[float, float]:
+        if start is None:
+            start = _floor(self.first_ts, HOUR)
+        if end is None:
+            end = self.last_ts + 1
+        return start, end
+
+    def counts(self, start: float | None = None, end: float | None = None) -> Counter:
+        """
+        Per-intent counts for [start, end) (UNIX seconds; None = open).
+        """
+        if start is None and end is None:
+            return Counter(self.intent_counts)
+        result = Counter()
+        if self.total == 0:
+            return result
+
+        start, end = self._bounds(start, end)
+        first = max(_floor(start, HOUR), _floor(self.first_ts, HOUR))
+        last = min(end, self.last_ts + 1)
+        for hour in range(first, int(last) + 1, HOUR):
+            bucket = self.hours.get(hour)
+            if bucket is None or hour >= end:
+                continue
+            if hour >= start and hour + HOUR <= end:
+                result.update(bucket)
+            elif hour >= self._minute_floor:
+                # Partial hour at an edge of the range: use its minutes
+                for minute in range(hour, hour + HOUR, MINUTE):
+                    if start <= minute < end and minute in self.minutes:
+                        result.update(self.minutes[minute])
+            elif hour >= start:
+                result.update(bucket)
+        return result
+
+    def series(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        freq: str = "hour",
+    ) -> list[tuple[int, int]]:
+        """
+        (bucket start, messages) per minute or hour in [start, end),
+        including empty buckets.
+        """
+        if self.total == 0:
+            return []
+        size = MINUTE if freq == "minute" else HOUR
+        buckets = self.minutes if freq == "minute" else self.hours
+        start, end = self._bounds(start, end)
+
+        first = max(_floor(start, size), _floor(self.first_ts, size))
+        if freq == "minute":
+            first = max(first, self._minute_floor)
+        if start > first:
+            first += size
+        last = min(end, self.last_ts + 1)
+
+        out = []
+        for bucket_start in range(int(first), int(last), size):
+            bucket = buckets.get(bucket_start)
+            out.append((bucket_start, sum(bucket.values()) if bucket else 0))
+        return out
+
+    def recent_rows(
+        self,
+        limit: int = 20,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[dict]:
+        """
+        Newest-first interactions from the recent buffer, within [start, end).
+        """
+        rows = sorted(self.recent, key=lambda row: row[0], reverse=True)
+        if start is not None:
+            rows = [row for row in rows if row[0] >= start]
+        if end is not None:
+            rows = [row for row in rows if row[0] < end]
+        return [dict(zip(LOG_COLUMNS, row)) for row in rows[:limit]]
+
+    def summary(self, start: float | None = None, end: float | None = None) -> dict:
+        counts = self.counts(start, end)
+        last = self.last_ts
+        if last is not None and end is not None and last >= end:
+            # Newest row inside the range, from the recent buffer if possible
+            inside = self.recent_rows(1, start, end)
+            last = inside[0]["timestamp"] if inside else None
+        return {
+            "total": sum(counts.values()),
+            "unique_intents": len(counts),
+            "last_activity": format_timestamp(last) if last is not None else None,
+            "intent_counts": dict(counts.most_common()),
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "total": self.total,
+            "intent_counts": dict(self.intent_counts),
+            "hours": {str(k): dict(v) for k, v in self.hours.items()},
+            "minutes": {str(k): dict(v) for k, v in self.minutes.items()},
+            "recent": list(self.recent),
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "minute_floor": self._minute_floor,
+        }
+
+    def load_state(self, state: dict) -> None:
+        self.total = state["total"]
+        self.intent_counts = Counter(state["intent_counts"])
+        self.hours = {int(k): Counter(v) for k, v in state["hours"].items()}
+        self.minutes = {int(k): Counter(v) for k, v in state["minutes"].items()}
+        self.recent.clear()
+        self.recent.extend(tuple(row) for row in state["recent"])
+        self.first_ts = state["first_ts"]
+        self.last_ts = state["last_ts"]
+        self._minute_floor = state["minute_floor"]
+
+
+# -------------------------
+# Log tailing + checkpoint
+# -------------------------
+
+
+def _read_legacy_csv(path: Path) -> dict:
+    columns = {name: [] for name in LOG_COLUMNS}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            columns["timestamp"].append(datetime.fromisoformat(row["timestamp"]).timestamp())
+            columns["intent"].append(row["intent"])
+            columns["user_text"].append(row["user_text"])
+            columns["bot_reply"].append(row["bot_reply"])
+            columns["source"].append("streamlit")
+    return columns
+
+
+class IncrementalAnalytics:
+    """
+    Keeps an AnalyticsStore up to date with the interaction log.
+
+    refresh() reads only the bytes appended to each segment since the
+    last call (per-segment offsets), so its cost is proportional to the
+    new rows, not to the history. Offsets and aggregates are saved to a
+    JSON checkpoint (at most every `checkpoint_seconds`), so a restart
+    resumes from there instead of rescanning the log.
+    """
+
+    def __init__(
+        self,
+        log_dir: str | Path = INTERACTION_LOG_DIR,
+        checkpoint_path: str | Path = ANALYTICS_CHECKPOINT_PATH,
+        checkpoint_seconds: float = ANALYTICS_CHECKPOINT_SECONDS,
+        legacy_csv: Path = LEGACY_CSV,
+    ):
+        self.log_dir = Path(log_dir)
+        self.checkpoint_path = Path(checkpoint_path)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.legacy_csv = legacy_csv
+
+        self.store = AnalyticsStore()
+        self._offsets = {}
+        self._legacy_done = False
+        self._lock = threading.Lock()
+        self._last_checkpoint = 0.0
+        self._dirty = False
+        self._load_checkpoint()
+
+    def _load_checkpoint(self) -> None:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != CHECKPOINT_VERSION:
+            return
+        self.store.load_state(state["store"])
+        self._offsets = state["offsets"]
+        self._legacy_done = state["legacy_done"]
+
+    def save_checkpoint(self) -> None:
+        with self._lock:
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "offsets": dict(self._offsets),
+                "legacy_done": self._legacy_done,
+                "store": self.store.to_state(),
+            }
+            self._dirty = False
+            self._last_checkpoint = time.monotonic()
+
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def refresh(self) -> int:
+        """
+        Fold newly logged rows into the aggregates; returns how many.
+        """
+        added = 0
+        with self._lock:
+            if not self._legacy_done:
+                if self.legacy_csv.exists():
+                    added += self.store.add(_read_legacy_csv(self.legacy_csv))
+                self._legacy_done = True
+
+            offsets = {}
+            for path in segment_files(self.log_dir):
+                offset = self._offsets.get(path.name, 0)
+                columns, offset = read_segment_from(path, offset)
+                added += self.store.add(columns)
+                offsets[path.name] = offset
+            # Segments deleted from disk drop out of the checkpoint
+            self._offsets = offsets
+
+            if added:
+                self._dirty = True
+            due = time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+
+        if self._dirty and due:
+            self.save_checkpoint()
+        return added
+
+
+ANALYTICS = IncrementalAnalytics()
@@ -1,5 +1,5 @@
-from .nlp import predict_intent
 from .handlers import handle_intent
+from .pipeline import analyze_message
 from .config import INTENT_RESPONSES
 
 
@@ -13,8 +13,8 @@ def run_chatbot():
             print("Bot:", INTENT_RESPONSES["goodbye"])
             break
 
-        intent = predict_intent(user_input)
-        response = handle_intent(intent, user_input)
+        analysis = analyze_message(user_input)
+        response = handle_intent(analysis.intent, user_input, analysis.faq_match)
         print("Bot:", response)
 
 
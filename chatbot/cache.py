@@ -0,0 +1,115 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .config import ORDER_ID_PATTERN
+
+_NON_WORD = re.compile(r"[^\w]+")
+_ORDER_ID = re.compile(ORDER_ID_PATTERN)
+
+# Returned by LRUCache.get() on a miss (cached values may legitimately be None)
+MISSING = object()
+
+
+def normalize_message(text: str) -> str:
+    """
+    Cache key for a user message: lowercase, punctuation -> spaces,
+    whitespace collapsed.
+
+    The TF-IDF analyzers lowercase and split on non-word characters
+    anyway, so messages with the same key get the same features.
+    """
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def message_cache_key(text: str) -> str | None:
+    """
+    Normalized cache key for a message, or None if it should not be cached.
+
+    Messages mentioning an order ID are never cached: they are almost
+    always unique, so they would only push the common messages out.
+    """
+    if _ORDER_ID.search(text):
+        return None
+    return normalize_message(text)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+
+    Keeps hit / miss / eviction counters so callers can see whether the
+    cache is pulling its weight.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        """
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,266 @@
+"""
+sklearn-free TF-IDF features and intent model.
+
+`export_compact_model()` writes a fitted TfidfVectorizer + LogisticRegression
+as plain files:
+
+    <dir>/manifest.json   classes, analyzer settings, stop words, proba mode
+    <dir>/vocab.txt       one n-gram per line, line number = feature index
+    <dir>/idf.npy         (n_features,) float64
+    <dir>/coef.npy        (n_classes or 1, n_features) float64
+    <dir>/intercept.npy   (n_classes or 1,) float64
+
+`CompactIntentModel` loads them with NumPy only. The weight arrays are
+memory-mapped read-only, so every worker process on a machine shares
+one copy through the OS page cache.
+
+`export_tfidf()` / `CompactTfidf` are the vectorizer half on its own
+(used for the FAQ index as well).
+"""
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+# -------------------------
+# TF-IDF vectorizer
+# -------------------------
+
+
+def export_tfidf(vectorizer, out_dir: Path) -> dict:
+    """
+    Write vocab.txt and idf.npy for a fitted TfidfVectorizer into out_dir.
+    Returns the manifest sections ("analyzer", "tfidf") describing it.
+    """
+    params = vectorizer.get_params()
+    if params["analyzer"] != "word" or params["tokenizer"] or params["preprocessor"]:
+        raise ValueError("Only word analyzers with the default tokenizer can be exported")
+    if params["strip_accents"]:
+        raise ValueError("strip_accents is not supported by the compact format")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, j in vectorizer.vocabulary_.items():
+        terms[j] = term
+    with open(out_dir / "vocab.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(terms))
+
+    idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(terms))
+    np.save(out_dir / "idf.npy", np.asarray(idf, dtype=np.float64))
+
+    stop_words = vectorizer.get_stop_words()
+    return {
+        "analyzer": {
+            "lowercase": params["lowercase"],
+            "token_pattern": params["token_pattern"],
+            "ngram_range": list(params["ngram_range"]),
+            "stop_words": sorted(stop_words) if stop_words else [],
+            # Kept as given so FAQ / intent analyzers can be compared
+            "stop_words_param": params["stop_words"] if isinstance(params["stop_words"], str) else None,
+        },
+        "tfidf": {
+            "binary": params["binary"],
+            "sublinear_tf": params["sublinear_tf"],
+            "norm": params["norm"],
+        },
+    }
+
+
+class CompactTfidf:
+    """
+    NumPy-only equivalent of a fitted TfidfVectorizer (word analyzer).
+
+    Rows are returned as (column indices, values) pairs instead of a
+    scipy sparse matrix.
+    """
+
+    def __init__(self, model_dir: Path, manifest: dict, mmap: bool = True):
+        model_dir = Path(model_dir)
+
+        analyzer = manifest["analyzer"]
+        self._lowercase = analyzer["lowercase"]
+        self._token_re = re.compile(analyzer["token_pattern"])
+        self._ngram_range = tuple(analyzer["ngram_range"])
+        self._stop_words = frozenset(analyzer["stop_words"])
+        # Same keys as features.ANALYZER_PARAMS, so it can be compared
+        # with a fitted vectorizer's settings
+        self.analyzer_config = {
+            "analyzer": "word",
+            "lowercase": self._lowercase,
+            "ngram_range": self._ngram_range,
+            "stop_words": analyzer["stop_words_param"] or sorted(self._stop_words) or None,
+            "token_pattern": analyzer["token_pattern"],
+            "tokenizer": None,
+            "preprocessor": None,
+            "strip_accents": None,
+            "encoding": "utf-8",
+            "decode_error": "strict",
+        }
+
+        tfidf = manifest["tfidf"]
+        self._binary = tfidf["binary"]
+        self._sublinear_tf = tfidf["sublinear_tf"]
+        self._norm = tfidf["norm"]
+
+        with open(model_dir / "vocab.txt", encoding="utf-8") as f:
+            terms = f.read().split("\n")
+        self.vocabulary_ = {term: j for j, term in enumerate(terms)}
+        self._idf = np.load(model_dir / "idf.npy", mmap_mode="r" if mmap else None)
+
+    @property
+    def idf_(self):
+        return self._idf
+
+    # ---- text -> n-grams (same steps as sklearn's word analyzer) ----
+
+    def analyze(self, text: str) -> list[str]:
+        if self._lowercase:
+            text = text.lower()
+        tokens = [t for t in self._token_re.findall(text) if t not in self._stop_words]
+
+        min_n, max_n = self._ngram_range
+        if max_n == 1:
+            return tokens
+        ngrams = list(tokens) if min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(min_n, 2), min(max_n, n_tokens) + 1):
+            for i in range(n_tokens - n + 1):
+                ngrams.append(" ".join(tokens[i:i + n]))
+        return ngrams
+
+    # ---- n-grams -> sparse TF-IDF row ----
+
+    def featurize(self, ngrams: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (column indices, values) of the normalized TF-IDF row.
+        """
+        counts = Counter()
+        for gram in ngrams:
+            j = self.vocabulary_.get(gram)
+            if j is not None:
+                counts[j] += 1
+
+        cols = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+        data = np.fromiter((counts[j] for j in cols), dtype=np.float64, count=len(cols))
+        if self._binary:
+            data[:] = 1.0
+        if self._sublinear_tf:
+            data = np.log(data) + 1.0
+        data *= self._idf[cols]
+
+        if self._norm == "l2":
+            norm = np.sqrt((data * data).sum())
+        elif self._norm == "l1":
+            norm = np.abs(data).sum()
+        else:
+            norm = 0.0
+        if norm > 0:
+            data /= norm
+        return cols, data
+
+    def transform(self, texts: list[str]) -> list[tuple[np.ndarray, np.ndarray]]:
+        return [self.featurize(self.analyze(text)) for text in texts]
+
+
+# -------------------------
+# Intent model
+# -------------------------
+
+
+def _proba_mode(clf) -> str:
+    # Mirrors how LogisticRegression.predict_proba picks its link function
+    if len(clf.classes_) <= 2:
+        return "binary"
+    multi_class = getattr(clf, "multi_class", "auto")
+    if multi_class == "ovr" or (
+        multi_class in ("auto", "warn", "deprecated") and getattr(clf, "solver", None) == "liblinear"
+    ):
+        return "ovr"
+    return "softmax"
+
+
+def export_compact_model(clf, vectorizer, out_dir: Path) -> Path:
+    """
+    Write a fitted (LogisticRegression, TfidfVectorizer) pair in the
+    compact format. Returns out_dir.
+    """
+    out_dir = Path(out_dir)
+    sections = export_tfidf(vectorizer, out_dir)
+
+    np.save(out_dir / "coef.npy", np.asarray(clf.coef_, dtype=np.float64))
+    np.save(out_dir / "intercept.npy", np.asarray(clf.intercept_, dtype=np.float64))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "classes": [str(c) for c in clf.classes_],
+        "proba": _proba_mode(clf),
+        **sections,
+    }
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return out_dir
+
+
+class CompactIntentModel:
+    """
+    TF-IDF + linear classifier inference from an exported artifact.
+    Produces the same probabilities as the sklearn objects it was
+    exported from.
+    """
+
+    def __init__(self, model_dir: Path, mmap: bool = True):
+        model_dir = Path(model_dir)
+        with open(model_dir / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format in {model_dir}")
+
+        self.classes_ = np.array(manifest["classes"])
+        self._proba = manifest["proba"]
+        self.tfidf = CompactTfidf(model_dir, manifest, mmap=mmap)
+        self.analyzer_config = self.tfidf.analyzer_config
+        self.vocabulary_ = self.tfidf.vocabulary_
+
+        mmap_mode = "r" if mmap else None
+        self._coef = np.load(model_dir / "coef.npy", mmap_mode=mmap_mode)
+        self._intercept = np.load(model_dir / "intercept.npy", mmap_mode=mmap_mode)
+
+    def analyze(self, text: str) -> list[str]:
+        return self.tfidf.analyze(text)
+
+    def featurize(self, ngrams: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        return self.tfidf.featurize(ngrams)
+
+    def transform(self, texts: list[str]) -> list[tuple[np.ndarray, np.ndarray]]:
+        return self.tfidf.transform(texts)
+
+    # ---- rows -> probabilities ----
+
+    def decision_function(self, rows: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        scores = np.empty((len(rows), self._coef.shape[0]), dtype=np.float64)
+        for i, (cols, data) in enumerate(rows):
+            scores[i] = self._coef[:, cols] @ data
+        scores += self._intercept
+        return scores
+
+    def predict_proba(self, rows: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        scores = self.decision_function(rows)
+        if self._proba == "binary":
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if self._proba == "ovr":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, rows) -> np.ndarray:
+        return self.classes_[self.predict_proba(rows).argmax(axis=1)]
@@ -21,3 +21,249 @@ INTENT_RESPONSES = {
         "shipping, cancellation, or talking to a human."
     ),
 }
+
+# Order IDs are 5+ digit numbers
+ORDER_ID_PATTERN = r"\b\d{5,}\b"
+
+# -------------------------
+# Order store
+# -------------------------
+
+# "compact" keeps orders in RAM as interned columns; "sqlite" reads them
+# from an indexed file on disk (built from ORDERS_PATH on first use)
+ORDER_STORE_BACKEND = "compact"
+ORDERS_DB_PATH = "data/orders.sqlite"
+
+# Order changes are picked up from rows appended to orders.csv or to this
+# delta file (same columns; only order_id is required), or by a full
+# reload when orders.csv is rewritten. Checked every N seconds.
+ORDERS_DELTA_PATH = "data/orders_delta.csv"
+ORDER_REFRESH_INTERVAL_SECONDS = 5.0
+
+# Status changes made by the bot (cancellations) are appended to this
+# write-ahead log and fsynced before they show up in lookups; the log is
+# replayed on startup and after every full reload of orders.csv.
+ORDERS_WAL_PATH = "data/orders_wal.jsonl"
+# False skips the fsync (changes survive a crash of the process but not
+# of the machine)
+ORDERS_WAL_FSYNC = True
+# Group commit: the log writer waits this long after the first pending
+# change so more writers can share its fsync (0: changes that arrive
+# during an fsync are still batched into the next one)
+ORDERS_WAL_COMMIT_DELAY_SECONDS = 0.0
+ORDERS_WAL_MAX_BATCH = 1000
+# A cancellation the log hasn't started committing within this many
+# seconds is withdrawn (never written) and answered from the order's
+# current status instead of holding the request
+ORDERS_WAL_WRITE_TIMEOUT_SECONDS = 2.0
+
+# -------------------------
+# Reply caches
+# -------------------------
+
+# Max entries per cache (intent, FAQ, full analysis) and entry lifetime in seconds
+CACHE_MAX_SIZE = 10_000
+CACHE_TTL_SECONDS = 3600
+
+# Streamlit quick-question buttons: label -> message sent when clicked
+QUICK_QUESTIONS = {
+    "📦 Track my order": "where is my order",
+    "💰 Refund policy": "what is your refund policy",
+    "🚚 Shipping info": "do you ship internationally",
+    "🧑 Talk to human": "i want to talk to a human",
+}
+
+# Messages analyzed at startup so the most common traffic is a cache hit
+# from the first request (Streamlit quick-question presets + small talk)
+CACHE_WARMUP_MESSAGES = [
+    *QUICK_QUESTIONS.values(),
+    "hi",
+    "hello",
+    "thanks",
+    "thank you",
+    "bye",
+]
+
+# -------------------------
+# Intent model
+# -------------------------
+
+# "compact": NumPy-only artifact in <model dir>/compact/, written by
+#            train_intent_model.py; weights are memory-mapped, so worker
+#            processes share them and never import scikit-learn. Model
+#            versions without the artifact fall back to the pickles.
+# "pickle": always unpickle the sklearn model + vectorizer
+INTENT_MODEL_FORMAT = "compact"
+
+# Predictions less confident than this are answered as "fallback"
+# (default of predict_intent() / analyze_message(); degraded replies use
+# it too, so both paths classify a message the same way)
+INTENT_FALLBACK_THRESHOLD = 0.3
+
+# -------------------------
+# FAQ index
+# -------------------------
+
+# Prebuilt FAQ vectorizer + inverted index (python build_faq_index.py).
+# Loaded on the first fallback turn; if missing or older than
+# data/faq.csv, the index is fitted from the CSV instead.
+FAQ_INDEX_DIR = "models/faq_index"
+
+# Per-tenant FAQ sets (storefronts / locales). The default tenant uses
+# data/faq.csv + FAQ_INDEX_DIR; tenant "<id>" uses <FAQ_TENANT_DATA_DIR>/<id>.csv
+# and its prebuilt index in <FAQ_INDEX_DIR>/tenants/<id>/
+# (python build_faq_index.py --tenant <id>). Indexes are loaded on a
+# tenant's first fallback turn and the least recently used ones are
+# dropped once the loaded ones hold more than FAQ_INDEX_MAX_BYTES.
+DEFAULT_TENANT = "default"
+FAQ_TENANT_DATA_DIR = "data/faqs"
+FAQ_INDEX_MAX_BYTES = 512 * 1024 * 1024
+
+# -------------------------
+# Model registry
+# -------------------------
+
+# How often each server checks models/registry/manifest.json for a new
+# active version (set through another worker or train_intent_model.py)
+MODEL_WATCH_INTERVAL_SECONDS = 10.0
+
+# Two-stage cascade for model versions trained with --cascade (they have a
+# <model dir>/cascade/ stage: word + character n-grams, more accurate but
+# ~2-3x slower, always served from the pickles). Stage 1 answers when its
+# confidence is >= CASCADE_ESCALATION_THRESHOLD; other messages are
+# re-scored by stage 2, whose answer is used if it clears the caller's
+# fallback threshold (0.3 by default). Versions without the stage, or
+# INTENT_CASCADE_ENABLED = False, use the first model alone.
+INTENT_CASCADE_ENABLED = True
+CASCADE_ESCALATION_THRESHOLD = 0.4
+
+# -------------------------
+# API execution
+# -------------------------
+
+# Where api.py runs the (CPU-bound) chat pipeline:
+# "thread":  thread pool in the server process (models shared)
+# "process": process pool, each worker preloads models + indexes
+# "inline":  on the event loop itself (no offloading)
+CHAT_EXECUTOR_BACKEND = "thread"
+CHAT_EXECUTOR_WORKERS = 4
+# Requests allowed into the pipeline at once; others wait for a slot
+CHAT_MAX_CONCURRENCY = 32
+# Requests allowed to wait for a slot; more are shed at once (None: no limit)
+CHAT_MAX_QUEUE = 64
+# Per-request deadline (queueing + processing); None disables it. Clients
+# can ask for a shorter one with an X-Request-Timeout header (seconds).
+# Work whose deadline passes before a worker picks it up is dropped.
+CHAT_REQUEST_TIMEOUT_SECONDS = 5.0
+
+# When /chat can't get into the pipeline (queue full, no slot before the
+# deadline, or the request was sent more than CHAT_DEGRADE_QUEUE_SECONDS
+# ago according to its X-Request-Start header) answer without the model
+# instead of a 503: fast-path rules and the multi-turn order flow still
+# work, anything else gets CHAT_DEGRADED_REPLY.
+CHAT_DEGRADE_ON_OVERLOAD = True
+CHAT_DEGRADE_QUEUE_SECONDS = 0.5
+CHAT_DEGRADED_REPLY = (
+    "We’re getting a lot of messages right now, so I can only answer simple questions. "
+    "Please try again in a moment, or ask about: order status, refund, shipping, "
+    "cancellation, or talking to a human."
+)
+
+# -------------------------
+# Pre-fork server (serve.py)
+# -------------------------
+
+SERVE_HOST = "0.0.0.0"
+SERVE_PORT = 8000
+# Worker processes forked after models are loaded; None = one per core
+SERVE_WORKERS = None
+
+# -------------------------
+# Interaction log
+# -------------------------
+
+# Segment files of logged chat turns (app.py + api.py)
+INTERACTION_LOG_DIR = "logs/interactions"
+# "arrow": Arrow IPC stream segments (needs pyarrow)
+# "jsonl": one JSON line of columns per batch (no extra dependency)
+# "auto":  arrow if pyarrow is installed, else jsonl
+INTERACTION_LOG_FORMAT = "auto"
+# In-memory ring buffer; when full the oldest unwritten row is dropped
+INTERACTION_LOG_BUFFER_SIZE = 100_000
+# Flush when this many rows are waiting, or at least this often
+INTERACTION_LOG_FLUSH_ROWS = 1000
+INTERACTION_LOG_FLUSH_SECONDS = 1.0
+# Start a new segment file after this many rows
+INTERACTION_LOG_SEGMENT_ROWS = 1_000_000
+
+# -------------------------
+# Analytics dashboard
+# -------------------------
+
+# Aggregates + per-segment read offsets, so restarts don't rescan the log
+ANALYTICS_CHECKPOINT_PATH = "logs/analytics_checkpoint.json"
+ANALYTICS_CHECKPOINT_SECONDS = 30.0
+# Interactions kept for the "Recent Interactions" table
+ANALYTICS_RECENT_SIZE = 1000
+# Per-minute buckets are kept this long; older ranges resolve to hours
+ANALYTICS_MINUTE_RETENTION_HOURS = 48
+
+# -------------------------
+# Conversation sessions
+# -------------------------
+
+# Server-side multi-turn state for /chat requests that carry a session_id
+# "memory": sharded in-process LRU (one store per process)
+# "sqlite": SESSION_DB_PATH, shared by every worker on the machine
+SESSION_STORE_BACKEND = "memory"
+SESSION_DB_PATH = "data/sessions.sqlite"
+# Sessions expire this long after their last turn
+SESSION_TTL_SECONDS = 30 * 60
+# Least recently active sessions are dropped beyond this many
+SESSION_MAX_SESSIONS = 500_000
+# Independently locked partitions of the in-memory store
+SESSION_SHARDS = 64
+
+# -------------------------
+# Rule-based fast path
+# -------------------------
+
+# Trivial messages (greetings, "bye", a bare order ID, exact
+# training / quick-question texts) get their intent from precompiled
+# rules instead of the classifier. Can also be toggled at runtime via
+# /admin/fast-path.
+FAST_PATH_ENABLED = True
+# Exact-match table source: labeled rows, one entry per normalized text
+FAST_PATH_DATA_PATH = "data/intents.csv"
+# A row is only used if the active model already predicts its label with
+# at least this probability (the default fallback threshold), so the
+# table never changes a reply, it only skips computing it
+FAST_PATH_MIN_CONFIDENCE = INTENT_FALLBACK_THRESHOLD
+# Cap on exact-match entries (distinct normalized texts)
+FAST_PATH_MAX_EXACT = 100_000
+
+# -------------------------
+# Request profiling
+# -------------------------
+
+# Off until started with POST /admin/profiling. While on, this share of
+# /chat and /chat/batch requests, plus every request that sends the
+# PROFILE_HEADER header, is profiled; one file per request is written to
+# PROFILE_DIR, named after the endpoint, intent and latency.
+PROFILE_ENABLED = False
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_HEADER = "X-Profile"
+# "cprofile": deterministic, every Python call, written as .pstats (the
+# profiled request runs ~2x slower). "sample": the request's stack is
+# sampled every PROFILE_SAMPLE_INTERVAL_SECONDS, written as .collapsed
+# (flamegraph.pl / speedscope); wall time, so waits on locks and I/O
+# show up, but requests shorter than a few ms get few samples.
+# A request can pick one with "X-Profile: sample" / "X-Profile: cprofile".
+PROFILE_MODE = "cprofile"
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.001
+# Only keep profiles of requests at least this slow (e.g. 0.2 with a high
+# sample rate catches p99 outliers without writing every request)
+PROFILE_MIN_LATENCY_SECONDS = 0.0
+PROFILE_DIR = "logs/profiles"
+# Oldest profiles are deleted beyond this many files
+PROFILE_MAX_FILES = 500
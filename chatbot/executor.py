@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Overloaded(RuntimeError):
+    """
+    No execution slot became free before the request's deadline.
+    """
+
+
+class QueueFull(Overloaded):
+    """
+    Every slot is busy and the admission queue is full: shed at once.
+    """
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The work did not finish before the request's deadline.
+    """
+
+
+class Expired(DeadlineExceeded):
+    """
+    The deadline passed before the work started: it was dropped unrun.
+    """
+
+
+def _run_unless_expired(expires_at: float, fn, *args):
+    # Runs on the worker: skip work whose caller has already given up.
+    # time.monotonic() is system-wide, so this holds in process workers too
+    if time.monotonic() >= expires_at:
+        raise Expired("Deadline passed while queued")
+    return fn(*args)
+
+
+def preload_worker() -> None:
+    """
+    Process-pool initializer: load models, FAQ index and order data once
+    per worker, and keep them fresh, before the first request arrives.
+    """
+    from . import faq, handlers, nlp, pipeline
+
+    faq.knowledge_base()
+    pipeline.warm_caches()
+    handlers.start_order_refresher()
+    nlp.MODEL_WATCHER.start()
+
+
+class ChatExecutor:
+    """
+    Runs blocking chat-pipeline calls away from the asyncio event loop.
+
+    - backend "thread": a thread pool in this process (models shared;
+      NumPy / sklearn release the GIL for part of the work)
+    - backend "process": a process pool; every worker preloads models
+      and indexes once (see preload_worker)
+    - backend "inline": run on the event loop (old behaviour, for tests
+      and debugging)
+
+    At most `max_concurrency` calls are admitted at once and at most
+    `max_queue` more wait for a slot (None: no limit); beyond that calls
+    are shed at once with QueueFull. A call that can't be admitted or
+    finished within `timeout` seconds raises Overloaded /
+    DeadlineExceeded instead of piling up, and one whose deadline passes
+    before a worker picks it up is dropped without running (Expired).
+    """
+
+    def __init__(
+        self,
+        backend: str = "thread",
+        workers: int | None = None,
+        max_concurrency: int = 32,
+        timeout: float | None = 5.0,
+        max_queue: int | None = None,
+    ):
+        if backend not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown chat executor backend: {backend!r}")
+        self.backend = backend
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._pool = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.shed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.timed_out = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pool is not None or self.backend == "inline":
+                return
+            if self.backend == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=preload_worker
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="chat-worker"
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    async def run(self, fn, *args, timeout: float | None = None):
+        """
+        Run fn(*args) on the configured backend and return its result.
+        `timeout` overrides the default deadline for this call.
+        """
+        deadline = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Counted before acquiring: requests that arrive together all see the
+        # semaphore free until the first of them has acquired it
+        if self.max_queue is not None and self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.shed += 1
+            raise QueueFull("Too many requests waiting for an execution slot")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), deadline)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded("No free execution slot before the deadline")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            elapsed = loop.time() - start
+            remaining = None if deadline is None else deadline - elapsed
+            if remaining is not None and remaining <= 0:
+                self.expired += 1
+                raise Expired("Deadline passed while waiting for a slot")
+            if self.backend == "inline":
+                result = fn(*args)
+            else:
+                self.start()
+                if remaining is None:
+                    future = loop.run_in_executor(self._pool, fn, *args)
+                else:
+                    future = loop.run_in_executor(
+                        self._pool, _run_unless_expired, time.monotonic() + remaining, fn, *args
+                    )
+                try:
+                    result = await asyncio.wait_for(future, remaining)
+                except asyncio.TimeoutError:
+                    # A running thread can't be interrupted: its result is
+                    # dropped. Work that hasn't started yet is cancelled.
+                    self.timed_out += 1
+                    raise DeadlineExceeded("Chat pipeline did not finish before the deadline")
+                except Expired:
+                    self.expired += 1
+                    raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "shed": self.shed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "timed_out": self.timed_out,
+        }
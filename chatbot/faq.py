@@ -1,48 +1,486 @@
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
 from pathlib import Path
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from . import metrics
+from .cache import LRUCache, message_cache_key
+from .compact_model import CompactTfidf, export_tfidf
+from .config import (
+    CACHE_MAX_SIZE,
+    CACHE_TTL_SECONDS,
+    DEFAULT_TENANT,
+    FAQ_INDEX_DIR,
+    FAQ_INDEX_MAX_BYTES,
+    FAQ_TENANT_DATA_DIR,
+)
+from .faq_index import InvertedIndex
 
 DATA_PATH = Path("data/faq.csv")
+INDEX_DIR = Path(FAQ_INDEX_DIR)
+TENANT_DATA_DIR = Path(FAQ_TENANT_DATA_DIR)
+TENANT_INDEX_DIR = INDEX_DIR / "tenants"
 
-# Load FAQ data once
-_df = pd.read_csv(DATA_PATH)
+FORMAT_VERSION = 1
 
-# Drop any rows where question or answer is missing
-_df = _df.dropna(subset=["question", "answer"])
+# (tenant, normalized query, threshold) -> answer or None
+FAQ_CACHE = LRUCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
 
-# Make sure both columns are strings
-_df["question"] = _df["question"].astype(str)
-_df["answer"] = _df["answer"].astype(str)
 
-FAQ_QUESTIONS = _df["question"].tolist()
-FAQ_ANSWERS = _df["answer"].tolist()
+@dataclass(frozen=True)
+class FaqMatch:
+    """
+    Result of an FAQ search. `answer` is None (and score 0.0) when
+    nothing scored above the threshold.
+    """
+    answer: str | None
+    score: float
+    question: str | None = None
 
-# Build a TF-IDF vectorizer for FAQ questions
-_FAQ_VECTORIZER = TfidfVectorizer(
-    lowercase=True,
-    ngram_range=(1, 2),
-    stop_words="english"
-)
-FAQ_MATRIX = _FAQ_VECTORIZER.fit_transform(FAQ_QUESTIONS)
+
+# -------------------------
+# Loading the FAQ index
+# -------------------------
 
 
-def semantic_faq_search(query: str, threshold: float = 0.25) -> str | None:
+@dataclass
+class FaqKnowledgeBase:
     """
-    Return the best matching FAQ answer for the given query
-    using cosine similarity. If similarity is below threshold,
-    return None.
+    Everything needed to answer FAQ queries: the questions / answers, the
+    vectorizer used for queries and the inverted index over the questions.
+
+    `vectorizer` is a CompactTfidf when loaded from the prebuilt artifact,
+    or a fitted sklearn TfidfVectorizer when built from the CSV. `nbytes`
+    and `load_seconds` are filled in by load_tenant().
     """
-    if not query or not query.strip():
+    questions: list[str]
+    answers: list[str]
+    vectorizer: object
+    index: InvertedIndex
+    source: str
+    nbytes: int = 0
+    load_seconds: float = 0.0
+
+    def featurize(self, ngrams: list[str]):
+        if isinstance(self.vectorizer, CompactTfidf):
+            return self.vectorizer.featurize(ngrams)
+        from .features import tfidf_row
+        return tfidf_row(self.vectorizer, ngrams)
+
+    def vectorize(self, text: str):
+        if isinstance(self.vectorizer, CompactTfidf):
+            return self.vectorizer.transform([text])[0]
+        return self.vectorizer.transform([text])
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_faq_csv(csv_path: Path) -> tuple[list[str], list[str]]:
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+
+    # Drop any rows where question or answer is missing
+    df = df.dropna(subset=["question", "answer"])
+
+    # Make sure both columns are strings
+    return df["question"].astype(str).tolist(), df["answer"].astype(str).tolist()
+
+
+def _fit_faq(questions: list[str]):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # Build a TF-IDF vectorizer for FAQ questions
+    vectorizer = TfidfVectorizer(
+        lowercase=True,
+        ngram_range=(1, 2),
+        stop_words="english"
+    )
+    matrix = vectorizer.fit_transform(questions)
+    return vectorizer, InvertedIndex.from_matrix(matrix)
+
+
+def build_faq_index(csv_path: Path = DATA_PATH, out_dir: Path = INDEX_DIR) -> Path:
+    """
+    Fit the FAQ vectorizer and index once and save them, so serving
+    processes can load them without pandas / scikit-learn.
+    """
+    out_dir = Path(out_dir)
+    questions, answers = _read_faq_csv(csv_path)
+    vectorizer, index = _fit_faq(questions)
+
+    sections = export_tfidf(vectorizer, out_dir)
+    index.save(out_dir)
+    with open(out_dir / "faq.json", "w", encoding="utf-8") as f:
+        json.dump({"questions": questions, "answers": answers}, f, ensure_ascii=False)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "source_sha256": _file_digest(csv_path),
+        "n_docs": len(questions),
+        **sections,
+    }
+    # Written last: a directory without a manifest is never loaded
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return out_dir
+
+
+def _load_artifact(csv_path: Path, index_dir: Path) -> FaqKnowledgeBase | None:
+    """
+    Load the prebuilt index, or None if it's missing or built from a
+    different version of the CSV.
+    """
+    manifest_path = index_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    if csv_path.exists() and manifest["source_sha256"] != _file_digest(csv_path):
         return None
 
-    query_vec = _FAQ_VECTORIZER.transform([query])
-    sims = cosine_similarity(query_vec, FAQ_MATRIX)[0]
+    with open(index_dir / "faq.json", encoding="utf-8") as f:
+        faq = json.load(f)
+    return FaqKnowledgeBase(
+        questions=faq["questions"],
+        answers=faq["answers"],
+        vectorizer=CompactTfidf(index_dir, manifest),
+        index=InvertedIndex.load(index_dir, manifest["n_docs"]),
+        source="artifact",
+    )
+
+
+def _load_knowledge_base(csv_path: Path = DATA_PATH, index_dir: Path = INDEX_DIR) -> FaqKnowledgeBase:
+    kb = _load_artifact(csv_path, index_dir)
+    if kb is not None:
+        return kb
+
+    # No (fresh) artifact: fit from the CSV in this process
+    questions, answers = _read_faq_csv(csv_path)
+    vectorizer, index = _fit_faq(questions)
+    return FaqKnowledgeBase(questions, answers, vectorizer, index, source="csv")
+
+
+def _kb_nbytes(kb: FaqKnowledgeBase) -> int:
+    """
+    Approximate memory of a knowledge base: postings, vocabulary + IDF
+    and the question / answer strings.
+    """
+    vocabulary = kb.vectorizer.vocabulary_
+    total = kb.index.nbytes + kb.vectorizer.idf_.nbytes
+    # Keys plus one int object per value
+    total += sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) for term in vocabulary)
+    total += 28 * len(vocabulary)
+    for texts in (kb.questions, kb.answers):
+        total += sys.getsizeof(texts) + sum(sys.getsizeof(text) for text in texts)
+    return total
+
+
+# -------------------------
+# Tenants
+# -------------------------
+
+# Tenant IDs become file names: no path separators or dots
+_TENANT_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+def tenant_paths(tenant: str | None) -> tuple[Path, Path]:
+    """
+    (FAQ CSV, prebuilt index directory) of a tenant; None is the default
+    tenant (data/faq.csv, FAQ_INDEX_DIR).
+    """
+    if tenant is None or tenant == DEFAULT_TENANT:
+        return DATA_PATH, INDEX_DIR
+    if not _TENANT_ID.fullmatch(tenant):
+        raise UnknownTenant(f"Invalid tenant ID {tenant!r}")
+    return TENANT_DATA_DIR / f"{tenant}.csv", TENANT_INDEX_DIR / tenant
+
+
+def tenant_exists(tenant: str | None) -> bool:
+    """
+    True if the tenant has an FAQ CSV or a prebuilt index.
+    """
+    try:
+        csv_path, index_dir = tenant_paths(tenant)
+    except UnknownTenant:
+        return False
+    return csv_path.exists() or (index_dir / "manifest.json").exists()
+
+
+def load_tenant(tenant: str | None) -> FaqKnowledgeBase:
+    """
+    Load a tenant's prebuilt index (or fit it from its CSV), measuring
+    its load time and size.
+    """
+    csv_path, index_dir = tenant_paths(tenant)
+    if tenant not in (None, DEFAULT_TENANT) and not tenant_exists(tenant):
+        raise UnknownTenant(f"No FAQ data for tenant {tenant!r}")
+    start = time.perf_counter()
+    kb = _load_knowledge_base(csv_path, index_dir)
+    kb.load_seconds = time.perf_counter() - start
+    kb.nbytes = _kb_nbytes(kb)
+    return kb
 
-    best_idx = sims.argmax()
-    best_score = sims[best_idx]
 
-    if best_score < threshold:
+class TenantIndexes:
+    """
+    Knowledge bases by tenant, loaded on first use and kept in an LRU
+    bounded by their estimated size: after a load, the least recently
+    used tenants are dropped until the total is within `max_bytes` (the
+    new one always stays, even if it alone is bigger).
+
+    Concurrent first requests for a tenant share one load: the first
+    caller loads, the others wait for its result. Requests still holding
+    an evicted knowledge base finish with it.
+    """
+
+    def __init__(self, max_bytes: int = FAQ_INDEX_MAX_BYTES, loader=load_tenant):
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._loaded = OrderedDict()  # tenant -> FaqKnowledgeBase, least recent first
+        self._loading = {}  # tenant -> Future of the load in progress
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.load_errors = 0
+
+    def get(self, tenant: str = DEFAULT_TENANT) -> FaqKnowledgeBase:
+        with self._lock:
+            kb = self._loaded.get(tenant)
+            if kb is not None:
+                self._loaded.move_to_end(tenant)
+                self.hits += 1
+                return kb
+            future = self._loading.get(tenant)
+            loading = future is None
+            if loading:
+                future = self._loading[tenant] = Future()
+            else:
+                self.coalesced += 1
+        if not loading:
+            return future.result()
+
+        try:
+            kb = self._loader(tenant)
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[tenant]
+                self.load_errors += 1
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._loading[tenant]
+            self.loads += 1
+            self._insert(tenant, kb)
+        future.set_result(kb)
+        return kb
+
+    def put(self, tenant: str, kb: FaqKnowledgeBase) -> None:
+        """
+        Use an already built knowledge base for `tenant` (replacing any).
+        """
+        with self._lock:
+            self._insert(tenant, kb)
+
+    def _insert(self, tenant: str, kb: FaqKnowledgeBase) -> None:
+        old = self._loaded.pop(tenant, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._loaded[tenant] = kb
+        self.nbytes += kb.nbytes
+        while self.nbytes > self.max_bytes and len(self._loaded) > 1:
+            _, evicted = self._loaded.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loaded.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        """
+        Counters, total size and, per loaded tenant (least recently used
+        first), index size, load time, source and number of FAQs.
+        """
+        with self._lock:
+            loaded = list(self._loaded.items())
+            stats = {
+                "max_bytes": self.max_bytes,
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "load_errors": self.load_errors,
+                "loading": list(self._loading),
+            }
+        stats["tenants"] = {
+            tenant: {
+                "bytes": kb.nbytes,
+                "load_seconds": round(kb.load_seconds, 4),
+                "source": kb.source,
+                "n_faqs": len(kb.questions),
+            }
+            for tenant, kb in loaded
+        }
+        return stats
+
+
+FAQ_INDEXES = TenantIndexes()
+
+
+def knowledge_base(tenant: str | None = None) -> FaqKnowledgeBase:
+    """
+    A tenant's FAQ data and index (default tenant if None), loaded on
+    first use (i.e. on its first fallback turn) rather than at import time.
+    """
+    return FAQ_INDEXES.get(tenant or DEFAULT_TENANT)
+
+
+def __getattr__(name: str):
+    # Old module-level names, now resolved lazily
+    if name == "FAQ_QUESTIONS":
+        return knowledge_base().questions
+    if name == "FAQ_ANSWERS":
+        return knowledge_base().answers
+    if name == "FAQ_INDEX":
+        return knowledge_base().index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# -------------------------
+# Search
+# -------------------------
+
+
+# Each function takes the tenant's knowledge base as `kb` if the caller
+# already holds it: fetch it once per query and pass it to every step, so
+# an eviction (and reload) mid-query can't mix two instances.
+
+
+def faq_vectorizer(tenant: str | None = None, kb: FaqKnowledgeBase | None = None):
+    """
+    The fitted vectorizer used for a tenant's FAQ questions (read-only).
+    """
+    return (kb or knowledge_base(tenant)).vectorizer
+
+
+def featurize_ngrams(ngrams: list[str], tenant: str | None = None, kb: FaqKnowledgeBase | None = None):
+    """
+    Build an FAQ query vector from already-analyzed n-grams.
+    """
+    kb = kb or knowledge_base(tenant)
+    start = time.perf_counter()
+    query_vec = kb.featurize(ngrams)
+    metrics.FAQ_FEATURIZE.observe_since(start)
+    return query_vec
+
+
+def vectorize_query(query: str, tenant: str | None = None, kb: FaqKnowledgeBase | None = None):
+    """
+    Build an FAQ query vector from raw text.
+    """
+    kb = kb or knowledge_base(tenant)
+    start = time.perf_counter()
+    query_vec = kb.vectorize(query)
+    metrics.FAQ_FEATURIZE.observe_since(start)
+    return query_vec
+
+
+def search_vector_top_k(
+    query_vec,
+    k: int = 5,
+    threshold: float = 0.25,
+    tenant: str | None = None,
+    kb: FaqKnowledgeBase | None = None,
+) -> list[FaqMatch]:
+    """
+    Return up to k FAQ matches scoring at least `threshold`, best first.
+    """
+    kb = kb or knowledge_base(tenant)
+    start = time.perf_counter()
+    hits = kb.index.search(query_vec, k=k, threshold=threshold)
+    metrics.FAQ_SEARCH.observe_since(start)
+    return [
+        FaqMatch(answer=kb.answers[idx], score=score, question=kb.questions[idx])
+        for idx, score in hits
+    ]
+
+
+def search_vector(
+    query_vec,
+    threshold: float = 0.25,
+    tenant: str | None = None,
+    kb: FaqKnowledgeBase | None = None,
+) -> FaqMatch:
+    """
+    Find the best FAQ answer for an already-vectorized query.
+    """
+    matches = search_vector_top_k(query_vec, k=1, threshold=threshold, tenant=tenant, kb=kb)
+    if not matches:
+        metrics.FAQ_MISS.inc()
+        return FaqMatch(answer=None, score=0.0)
+    metrics.FAQ_HIT.inc()
+    return matches[0]
+
+
+def semantic_faq_search_top_k(
+    query: str,
+    k: int = 5,
+    threshold: float = 0.25,
+    tenant: str | None = None,
+) -> list[FaqMatch]:
+    """
+    Return the k best matching FAQ entries for the given query,
+    with their similarity scores.
+    """
+    if not query or not query.strip():
+        return []
+
+    kb = knowledge_base(tenant)
+    return search_vector_top_k(vectorize_query(query, kb=kb), k=k, threshold=threshold, kb=kb)
+
+
+def semantic_faq_search(query: str, threshold: float = 0.25, tenant: str | None = None) -> str | None:
+    """
+    Return the best matching FAQ answer for the given query in a tenant's
+    FAQ set (default tenant if None) using cosine similarity. If
+    similarity is below threshold, return None.
+    """
+    if not query or not query.strip():
         return None
 
-    return FAQ_ANSWERS[best_idx]
+    key = message_cache_key(query)
+    if key is None:
+        return _semantic_faq_search_uncached(query, threshold, tenant)
+    return FAQ_CACHE.get_or_compute(
+        (tenant or DEFAULT_TENANT, key, threshold),
+        lambda: _semantic_faq_search_uncached(query, threshold, tenant),
+    )
+
+
+def _semantic_faq_search_uncached(query: str, threshold: float, tenant: str | None) -> str | None:
+    kb = knowledge_base(tenant)
+    return search_vector(vectorize_query(query, kb=kb), threshold, kb=kb).answer
@@ -0,0 +1,146 @@
+from pathlib import Path
+
+import numpy as np
+
+
+class InvertedIndex:
+    """
+    Sparse term -> postings index over L2-normalized TF-IDF rows.
+
+    A query only touches the postings of its own non-zero terms, so the
+    cost depends on how common the query terms are rather than on how
+    many FAQ entries exist. Scores are dot products, which equal cosine
+    similarity because both sides are L2-normalized.
+    """
+
+    def __init__(self, indptr, doc_ids, weights, n_docs: int):
+        # Postings for term t live in [indptr[t], indptr[t + 1]), sorted by doc id
+        self._indptr = indptr
+        self._doc_ids = doc_ids
+        self._weights = weights
+        self.n_docs = n_docs
+        self.n_terms = len(indptr) - 1
+
+        # Largest weight per term -> upper bound on what a term can add
+        self._max_weight = np.zeros(self.n_terms, dtype=np.float64)
+        non_empty = np.diff(self._indptr) > 0
+        if non_empty.any():
+            starts = self._indptr[:-1][non_empty]
+            self._max_weight[non_empty] = np.maximum.reduceat(self._weights, starts)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by the postings (memory-mapped ones at their file size).
+        """
+        return sum(a.nbytes for a in (self._indptr, self._doc_ids, self._weights, self._max_weight))
+
+    @classmethod
+    def from_matrix(cls, matrix) -> "InvertedIndex":
+        """
+        Build from a (n_docs x n_terms) sparse TF-IDF matrix.
+        """
+        from scipy.sparse import csc_matrix
+
+        csc = csc_matrix(matrix)
+        csc.sort_indices()
+        return cls(csc.indptr, csc.indices, csc.data, csc.shape[0])
+
+    def save(self, out_dir: Path) -> None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        np.save(out_dir / "postings_indptr.npy", self._indptr)
+        np.save(out_dir / "postings_doc_ids.npy", self._doc_ids)
+        np.save(out_dir / "postings_weights.npy", self._weights)
+
+    @classmethod
+    def load(cls, model_dir: Path, n_docs: int, mmap: bool = True) -> "InvertedIndex":
+        """
+        Load postings written by save(), memory-mapped by default.
+        """
+        model_dir = Path(model_dir)
+        mmap_mode = "r" if mmap else None
+        return cls(
+            np.load(model_dir / "postings_indptr.npy", mmap_mode=mmap_mode),
+            np.load(model_dir / "postings_doc_ids.npy", mmap_mode=mmap_mode),
+            np.load(model_dir / "postings_weights.npy", mmap_mode=mmap_mode),
+            n_docs,
+        )
+
+    def _postings(self, term: int):
+        start, end = self._indptr[term], self._indptr[term + 1]
+        return self._doc_ids[start:end], self._weights[start:end]
+
+    def _add_term_scores(self, scores, candidates, term: int, q_weight: float) -> None:
+        """
+        Add one term's contribution to the scores of the given (sorted)
+        candidate documents, looking each one up in the term's postings.
+        """
+        ids, weights = self._postings(term)
+        if len(ids) == 0:
+            return
+        pos = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+        hit = ids[pos] == candidates
+        scores[hit] += weights[pos[hit]] * q_weight
+
+    def search(self, query_vec, k: int = 1, threshold: float = 0.0) -> list[tuple[int, float]]:
+        """
+        Return up to k (doc_id, score) pairs with score >= threshold,
+        best first (ties broken by lower doc_id, like argmax).
+
+        query_vec is a 1-row scipy sparse matrix or a (term indices,
+        weights) pair as produced by CompactTfidf.featurize().
+        """
+        if isinstance(query_vec, tuple):
+            terms, q_weights = query_vec
+        else:
+            query = query_vec.tocsr()
+            terms, q_weights = query.indices, query.data
+        norm = np.sqrt((q_weights * q_weights).sum())
+        if k <= 0 or norm == 0:
+            return []
+        q_weights = q_weights / norm
+
+        bounds = q_weights * self._max_weight[terms]
+        useful = bounds > 0
+        terms, q_weights, bounds = terms[useful], q_weights[useful], bounds[useful]
+
+        # Early exit: even a document containing every query term at its
+        # maximum weight could not reach the threshold
+        if len(terms) == 0 or bounds.sum() < threshold:
+            return []
+
+        # MaxScore-style pruning: terms whose combined upper bound stays
+        # below the threshold ("optional") cannot make a document qualify on
+        # their own, so candidates come only from the remaining terms.
+        order = np.argsort(bounds)
+        n_optional = 0
+        if threshold > 0:
+            n_optional = int(np.searchsorted(np.cumsum(bounds[order]), threshold, side="left"))
+        optional, essential = order[:n_optional], order[n_optional:]
+
+        ids_parts, score_parts = [], []
+        for t in essential:
+            ids, weights = self._postings(terms[t])
+            ids_parts.append(ids)
+            score_parts.append(weights * q_weights[t])
+        candidates, inverse = np.unique(np.concatenate(ids_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts), minlength=len(candidates))
+
+        # Fill in the optional terms only for the candidate documents
+        for t in optional:
+            self._add_term_scores(scores, candidates, terms[t], q_weights[t])
+
+        keep = scores >= threshold
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) == 0:
+            return []
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            # Include anything tied with the k-th score so ties sort by doc_id
+            top = np.flatnonzero(scores >= scores[top].min())
+            candidates, scores = candidates[top], scores[top]
+
+        ranked = np.lexsort((candidates, -scores))[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in ranked]
@@ -0,0 +1,206 @@
+import csv
+import re
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+from .cache import normalize_message
+from .config import (
+    FAST_PATH_DATA_PATH,
+    FAST_PATH_ENABLED,
+    FAST_PATH_MAX_EXACT,
+    FAST_PATH_MIN_CONFIDENCE,
+    ORDER_ID_PATTERN,
+    QUICK_QUESTIONS,
+)
+
+# Whole-message keyword rules: rule name -> (intent, pattern). Patterns
+# must match the entire normalized message (lowercase, punctuation
+# stripped), so "hi!" is a greeting but "hi, where is my order?" still
+# goes to the model. Checked after the exact-match table, so labeled
+# rows take precedence. A rule must never contradict a confident
+# prediction: thanks alone is left to the model, which answers "thank
+# you" as small talk, not as the end of the conversation.
+KEYWORD_RULES = {
+    "greeting": (
+        "greeting",
+        r"(?:hi|hello|hey|hiya|howdy|good (?:morning|afternoon|evening))(?: there| support| team)?",
+    ),
+    "goodbye": (
+        "goodbye",
+        r"(?:ok |okay |thanks |thank you )?"
+        r"(?:bye(?: bye| for now)?|goodbye|good night|see (?:you|ya)(?: soon| later| next time)?|talk to you later)",
+    ),
+    # A bare order ID ("12345", "#12345", "order 12345"): the user wants its status
+    "order_id": (
+        "order_status",
+        r"(?:order )?(?:no |number |id )?" + ORDER_ID_PATTERN,
+    ),
+}
+
+# One compiled alternation for all rules; match.lastgroup names the rule
+_KEYWORDS = re.compile("|".join(
+    f"(?P<{name}>{pattern})" for name, (_, pattern) in KEYWORD_RULES.items()
+))
+
+# Labels seen with different intents for the same normalized text
+_AMBIGUOUS = object()
+
+# Texts scored per classifier call while building the exact-match table
+_BUILD_BATCH = 10_000
+
+
+def read_labeled_texts(path: str | Path, max_texts: int | None = None) -> dict:
+    """
+    Normalized text -> intent for the labeled rows of an intents.csv-style
+    file (text,intent). Texts labeled with more than one intent are left
+    out. Stops taking new texts after `max_texts` distinct ones.
+    """
+    path = Path(path)
+    labels = {}
+    if not path.exists():
+        return labels
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            text = normalize_message(row.get("text") or "")
+            intent = row.get("intent")
+            if not text or not intent:
+                continue
+            seen = labels.get(text)
+            if seen is None:
+                if max_texts is None or len(labels) < max_texts:
+                    labels[text] = intent
+            elif seen != intent:
+                labels[text] = _AMBIGUOUS
+    return {text: intent for text, intent in labels.items() if intent is not _AMBIGUOUS}
+
+
+class FastPath:
+    """
+    Precompiled rules that classify trivial messages without the model:
+
+    - an exact-match table (normalized text -> intent, confidence) built
+      from the labeled rows in FAST_PATH_DATA_PATH that the active model
+      already gets right with confidence >= min_confidence, plus the
+      quick-question button texts
+    - the whole-message KEYWORD_RULES (greetings, goodbyes, a bare
+      order ID)
+
+    The table depends on the model, so it is rebuilt for every model
+    version (see build()). `predict(texts, bundle)` returns
+    (intent, confidence) pairs from the classifier with no fallback
+    threshold; it is only called while building.
+
+    Every lookup counts a hit per rule and intent, or a miss, in
+    metrics.FAST_PATH_HITS / FAST_PATH_MISSES.
+    """
+
+    def __init__(
+        self,
+        predict,
+        enabled: bool = FAST_PATH_ENABLED,
+        data_path: str | Path = FAST_PATH_DATA_PATH,
+        min_confidence: float = FAST_PATH_MIN_CONFIDENCE,
+        max_exact: int = FAST_PATH_MAX_EXACT,
+    ):
+        self.enabled = enabled
+        self.data_path = Path(data_path)
+        self.min_confidence = min_confidence
+        self.max_exact = max_exact
+        self._predict = predict
+        # (model version, {normalized text: (intent, confidence, hit counter)}),
+        # replaced as one object so lookups never see half a rebuild
+        self._table = (None, {})
+        self._lock = threading.Lock()
+        self.build_seconds = 0.0
+        self._keyword_hits = {
+            name: metrics.FAST_PATH_HITS.labels(name, intent)
+            for name, (intent, _) in KEYWORD_RULES.items()
+        }
+
+    def build(self, bundle) -> int:
+        """
+        Build the exact-match table for `bundle` (a nlp.ModelBundle) unless
+        it is already built for that version. Returns the number of entries.
+        """
+        with self._lock:
+            version, exact = self._table
+            if version == bundle.version:
+                return len(exact)
+
+            start = time.perf_counter()
+            labels = read_labeled_texts(self.data_path, self.max_exact)
+            for message in QUICK_QUESTIONS.values():
+                # Unlabeled: whatever the model answers, if it is confident
+                labels.setdefault(normalize_message(message), None)
+
+            texts = list(labels)
+            exact = {}
+            hit_counters = {}
+            for i in range(0, len(texts), _BUILD_BATCH):
+                chunk = texts[i:i + _BUILD_BATCH]
+                for text, (intent, confidence) in zip(chunk, self._predict(chunk, bundle)):
+                    if confidence < self.min_confidence or labels[text] not in (intent, None):
+                        continue
+                    counter = hit_counters.get(intent)
+                    if counter is None:
+                        counter = hit_counters[intent] = metrics.FAST_PATH_HITS.labels("exact", intent)
+                    exact[text] = (intent, confidence, counter)
+
+            self._table = (bundle.version, exact)
+            self.build_seconds = time.perf_counter() - start
+            return len(exact)
+
+    def match(self, user_text: str, bundle, threshold: float = 0.0) -> tuple[str, float] | None:
+        """
+        (intent, confidence) if a rule classifies the message, else None
+        (disabled, or no rule matched: use the model).
+
+        Exact-table entries below `threshold` are skipped, so the fast path
+        never answers where the model would have said 'fallback'.
+        """
+        if not self.enabled:
+            return None
+        version, exact = self._table
+        if version != bundle.version:
+            self.build(bundle)
+            version, exact = self._table
+
+        text = normalize_message(user_text)
+        entry = exact.get(text)
+        if entry is not None and entry[1] >= threshold:
+            entry[2].inc()
+            return entry[0], entry[1]
+
+        found = _KEYWORDS.fullmatch(text)
+        if found is not None:
+            rule = found.lastgroup
+            self._keyword_hits[rule].inc()
+            return KEYWORD_RULES[rule][0], 1.0
+
+        metrics.FAST_PATH_MISS.inc()
+        return None
+
+    def stats(self) -> dict:
+        """
+        Switch state, table size and hit / miss counts since start-up.
+        """
+        version, exact = self._table
+        hits = {}
+        for (rule, intent), count in metrics.FAST_PATH_HITS.values().items():
+            if count:
+                hits.setdefault(rule, {})[intent] = count
+        total_hits = sum(sum(by_intent.values()) for by_intent in hits.values())
+        misses = metrics.FAST_PATH_MISS.value
+        checked = total_hits + misses
+        return {
+            "enabled": self.enabled,
+            "model_version": version,
+            "exact_entries": len(exact),
+            "keyword_rules": list(KEYWORD_RULES),
+            "build_seconds": round(self.build_seconds, 4),
+            "hits": hits,
+            "misses": misses,
+            "bypass_fraction": total_hits / checked if checked else 0.0,
+        }
@@ -0,0 +1,183 @@
+from collections import Counter
+
+import numpy as np
+
+# Vectorizer parameters that decide how raw text becomes tokens / n-grams.
+# Two vectorizers that agree on all of these produce identical n-grams,
+# so a message only needs to be analyzed once for both of them.
+ANALYZER_PARAMS = (
+    "analyzer",
+    "lowercase",
+    "ngram_range",
+    "stop_words",
+    "token_pattern",
+    "tokenizer",
+    "preprocessor",
+    "strip_accents",
+    "encoding",
+    "decode_error",
+)
+
+
+def analyzer_params(vectorizer) -> dict:
+    """
+    The ANALYZER_PARAMS settings of a sklearn vectorizer, or of anything
+    exposing an `analyzer_config` dict (e.g. CompactIntentModel).
+    """
+    config = getattr(vectorizer, "analyzer_config", None)
+    if config is None:
+        config = vectorizer.get_params()
+    params = {p: config.get(p) for p in ANALYZER_PARAMS}
+    if params["ngram_range"] is not None:
+        params["ngram_range"] = tuple(params["ngram_range"])
+    return params
+
+
+def same_analyzer(vec_a, vec_b) -> bool:
+    """
+    Return True if both vectorizers turn text into the same n-grams.
+    """
+    return analyzer_params(vec_a) == analyzer_params(vec_b)
+
+
+def tfidf_row(vectorizer, ngrams: list[str]):
+    """
+    Build the 1 x n_features TF-IDF row for already-analyzed n-grams.
+
+    Produces the same vector as vectorizer.transform([text]) when
+    ngrams == vectorizer.build_analyzer()(text), but skips re-tokenizing.
+    """
+    from scipy.sparse import csr_matrix
+
+    vocabulary = vectorizer.vocabulary_
+    n_features = len(vocabulary)
+
+    counts = Counter()
+    for gram in ngrams:
+        j = vocabulary.get(gram)
+        if j is not None:
+            counts[j] += 1
+
+    cols = np.fromiter(sorted(counts), dtype=np.int32, count=len(counts))
+    data = np.fromiter((counts[j] for j in cols), dtype=np.float64, count=len(cols))
+
+    if vectorizer.binary:
+        data[:] = 1.0
+    if vectorizer.sublinear_tf:
+        data = np.log(data) + 1.0
+    if vectorizer.use_idf:
+        data *= vectorizer.idf_[cols]
+
+    if vectorizer.norm == "l2":
+        norm = np.sqrt((data * data).sum())
+    elif vectorizer.norm == "l1":
+        norm = np.abs(data).sum()
+    else:
+        norm = 0.0
+    if norm > 0:
+        data /= norm
+
+    return csr_matrix(
+        (data, cols, np.array([0, len(cols)], dtype=np.int32)),
+        shape=(1, n_features),
+    )
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF without a vocabulary: n-grams are hashed into `n_features`
+    columns (sklearn's HashingVectorizer) and weighted with an IDF built
+    from document counts accumulated by partial_fit(), so memory stays
+    the same however many distinct n-grams the training data has.
+
+    Written by `train_intent_model.py --streaming`; nlp.py uses it like a
+    fitted TfidfVectorizer (transform, build_analyzer, get_params). Uses
+    sklearn's default smooth IDF.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        ngram_range: tuple = (1, 2),
+        stop_words="english",
+        lowercase: bool = True,
+        sublinear_tf: bool = False,
+        norm: str | None = "l2",
+    ):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.hasher = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=ngram_range,
+            stop_words=stop_words,
+            lowercase=lowercase,
+            alternate_sign=False,
+            norm=None,
+        )
+        self.n_features = n_features
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.n_docs = 0
+        self.doc_counts = np.zeros(n_features, dtype=np.int64)
+        self.idf_ = None
+
+    def get_params(self, deep: bool = True) -> dict:
+        return self.hasher.get_params(deep)
+
+    def build_analyzer(self):
+        return self.hasher.build_analyzer()
+
+    def partial_fit(self, texts) -> "HashingTfidfVectorizer":
+        """
+        Add a chunk of documents to the document counts.
+        """
+        X = self.hasher.transform(texts)
+        # Column indices are unique within a row: one count per document
+        self.doc_counts += np.bincount(X.indices, minlength=self.n_features)
+        self.n_docs += X.shape[0]
+        self.idf_ = None
+        return self
+
+    def set_counts(self, n_docs: int, doc_counts: np.ndarray) -> "HashingTfidfVectorizer":
+        """
+        Use document counts gathered elsewhere (e.g. all but one CV fold).
+        """
+        self.n_docs = int(n_docs)
+        self.doc_counts = np.asarray(doc_counts, dtype=np.int64)
+        self.idf_ = None
+        return self
+
+    def finalize(self) -> "HashingTfidfVectorizer":
+        """
+        Compute the IDF and drop the counts (makes the pickle half the size).
+        """
+        self._idf()
+        self.doc_counts = None
+        return self
+
+    def _idf(self) -> np.ndarray:
+        if self.idf_ is None:
+            self.idf_ = np.log((1 + self.n_docs) / (1 + self.doc_counts)) + 1.0
+        return self.idf_
+
+    def _weight(self, X):
+        from sklearn.preprocessing import normalize
+
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1.0
+        X.data *= self._idf()[X.indices]
+        return normalize(X, norm=self.norm, copy=False) if self.norm else X
+
+    def transform(self, texts):
+        return self._weight(self.hasher.transform(texts))
+
+    def transform_ngrams(self, ngrams: list[str]):
+        """
+        1 x n_features row for n-grams from build_analyzer(), same as
+        transform([text]) without re-tokenizing.
+        """
+        from sklearn.feature_extraction import FeatureHasher
+
+        hasher = FeatureHasher(n_features=self.n_features, input_type="string", alternate_sign=False)
+        return self._weight(hasher.transform([ngrams]))
@@ -1,18 +1,30 @@
 import re
+import time
 from pathlib import Path
 
-import pandas as pd
-
-from .config import INTENT_RESPONSES
-from .faq import semantic_faq_search
+from . import metrics
+from .config import (
+    INTENT_RESPONSES,
+    ORDER_ID_PATTERN,
+    ORDER_REFRESH_INTERVAL_SECONDS,
+    ORDER_STORE_BACKEND,
+    ORDERS_DB_PATH,
+    ORDERS_DELTA_PATH,
+    ORDERS_WAL_COMMIT_DELAY_SECONDS,
+    ORDERS_WAL_FSYNC,
+    ORDERS_WAL_MAX_BATCH,
+    ORDERS_WAL_PATH,
+    ORDERS_WAL_WRITE_TIMEOUT_SECONDS,
+)
+from .faq import FaqMatch, semantic_faq_search
+from .order_refresh import OrderRefresher
+from .order_wal import CommitUncertain, OrderWriteLog
+from .orders import OverlayOrderStore, load_order_store
 
 # -------------------------
 # Order ID detection
 # -------------------------
 
-# Simple pattern: order IDs are 5+ digit numbers
-ORDER_ID_PATTERN = r"\b\d{5,}\b"
-
 
 def extract_order_id(text: str):
     """
@@ -30,23 +42,48 @@ def extract_order_id(text: str):
 
 ORDERS_PATH = Path("data/orders.csv")
 
-if ORDERS_PATH.exists():
-    _orders_df = pd.read_csv(ORDERS_PATH)
+ORDER_STORE = OverlayOrderStore(
+    load_order_store(ORDER_STORE_BACKEND, ORDERS_PATH, Path(ORDERS_DB_PATH))
+)
+
+# Durable status changes made by the bot (see cancel_order)
+ORDER_LOG = OrderWriteLog(
+    ORDER_STORE,
+    Path(ORDERS_WAL_PATH),
+    fsync=ORDERS_WAL_FSYNC,
+    commit_delay=ORDERS_WAL_COMMIT_DELAY_SECONDS,
+    max_batch=ORDERS_WAL_MAX_BATCH,
+)
+# Earlier changes are visible from the first lookup, whether or not the
+# caller starts the refresher (the CLI bot doesn't)
+ORDER_LOG.replay()
+
+# Keeps ORDER_STORE in sync with the CSV / delta file once started
+ORDER_REFRESHER = OrderRefresher(
+    ORDER_STORE,
+    csv_path=ORDERS_PATH,
+    delta_path=Path(ORDERS_DELTA_PATH),
+    reload=lambda: load_order_store(
+        ORDER_STORE_BACKEND, ORDERS_PATH, Path(ORDERS_DB_PATH), rebuild=True
+    ),
+    interval=ORDER_REFRESH_INTERVAL_SECONDS,
+    replace_base=ORDER_LOG.replace_base,
+    after_refresh=ORDER_LOG.sync,
+)
+
+
+def start_order_refresher() -> None:
+    """
+    Replay the order write log, then start picking up order changes in
+    the background (safe to call twice).
+    """
+    ORDER_LOG.start()
+    ORDER_REFRESHER.start()
 
-    # Normalize to strings to avoid type issues
-    _orders_df["order_id"] = _orders_df["order_id"].astype(str)
-    _orders_df["status"] = _orders_df["status"].astype(str)
-    _orders_df["eta"] = _orders_df["eta"].astype(str)
-    _orders_df["total"] = _orders_df["total"].astype(str)
-    _orders_df["shipping_provider"] = _orders_df["shipping_provider"].astype(str)
 
-    # Index by order_id for fast lookup
-    _orders_df = _orders_df.set_index("order_id")
-else:
-    # If the file is missing, use an empty DataFrame to avoid crashes
-    _orders_df = pd.DataFrame(
-        columns=["status", "eta", "total", "shipping_provider"]
-    )
+def stop_order_refresher() -> None:
+    ORDER_REFRESHER.stop()
+    ORDER_LOG.stop()
 
 
 def get_order_info(order_id: str):
@@ -62,15 +99,56 @@ def get_order_info(order_id: str):
     }
     or None if not found.
     """
-    if order_id in _orders_df.index:
-        row = _orders_df.loc[order_id]
-        return {
-            "status": row["status"],
-            "eta": row["eta"],
-            "total": row["total"],
-            "shipping_provider": row["shipping_provider"],
-        }
-    return None
+    start = time.perf_counter()
+    info = ORDER_STORE.get_order(order_id)
+    metrics.ORDER_LOOKUP.observe_since(start)
+    (metrics.ORDER_FOUND if info is not None else metrics.ORDER_NOT_FOUND).inc()
+    return info
+
+
+def get_orders(order_ids: list[str]) -> list[dict | None]:
+    """
+    Bulk version of get_order_info(): one result (or None) per order ID,
+    in the same order.
+    """
+    start = time.perf_counter()
+    infos = ORDER_STORE.get_orders(order_ids)
+    metrics.ORDER_LOOKUP.observe_since(start)
+    found = sum(info is not None for info in infos)
+    metrics.ORDER_FOUND.inc(found)
+    metrics.ORDER_NOT_FOUND.inc(len(infos) - found)
+    return infos
+
+
+def cancel_order(order_id: str, status: str) -> str | None:
+    """
+    Mark an order as cancelled if its status is still `status`, through
+    the order write log. Returns:
+
+    - "cancelled": committed, lookups already see it
+    - "pending": in the log, but the commit failed after the append; it
+      is applied with the log's next read
+    - None: nothing was written (the order changed in the meantime, the
+      log couldn't start committing it within
+      ORDERS_WAL_WRITE_TIMEOUT_SECONDS, or the write failed)
+    """
+    try:
+        updated = ORDER_LOG.write(
+            order_id,
+            {"status": "Cancelled"},
+            expected={"status": status},
+            timeout=ORDERS_WAL_WRITE_TIMEOUT_SECONDS,
+        )
+    except CommitUncertain:
+        return "pending"
+    except TimeoutError:
+        # Withdrawn before the committer got to it: never written
+        return None
+    except Exception:
+        # Failed before the append (counted in ORDER_LOG.stats()); the
+        # caller re-checks the order instead of failing the turn
+        return None
+    return "cancelled" if updated is not None else None
 
 
 # -------------------------
@@ -78,14 +156,42 @@ def get_order_info(order_id: str):
 # -------------------------
 
 
-def handle_intent(intent: str, user_text: str) -> str:
+def handle_intent(
+    intent: str,
+    user_text: str,
+    faq_match: FaqMatch | None = None,
+    remembered_order_id: str | None = None,
+    tenant: str | None = None,
+) -> str:
     """
     Given an intent and the original user text, decide what to reply.
+
+    For 'fallback', pass the FaqMatch from analyze_message() to reuse its
+    FAQ search; if faq_match is None the search is run here, in the
+    tenant's FAQ set.
+
+    remembered_order_id is the order the user mentioned earlier in the
+    conversation (from their session), used when user_text has none.
     """
+    start = time.perf_counter()
+    reply = _reply_for(intent, user_text, faq_match, remembered_order_id, tenant)
+    # Every front end replies through here: one count per chat turn
+    metrics.REPLY.observe_since(start)
+    metrics.INTENTS_TOTAL.labels(intent).inc()
+    return reply
+
+
+def _reply_for(
+    intent: str,
+    user_text: str,
+    faq_match: FaqMatch | None,
+    remembered_order_id: str | None = None,
+    tenant: str | None = None,
+) -> str:
 
     # -------- Order status flow --------
     if intent == "order_status":
-        order_id = extract_order_id(user_text)
+        order_id = extract_order_id(user_text) or remembered_order_id
 
         if order_id:
             info = get_order_info(order_id)
@@ -110,6 +216,13 @@ def handle_intent(intent: str, user_text: str) -> str:
     if intent == "cancel_order":
         order_id = extract_order_id(user_text)
 
+        if not order_id and remembered_order_id:
+            # Never cancel on an implicit ID: have the user confirm it
+            return (
+                f"Do you want to cancel order **{remembered_order_id}**? "
+                "Reply with the order ID to confirm."
+            )
+
         if order_id:
             info = get_order_info(order_id)
             if not info:
@@ -121,11 +234,23 @@ def handle_intent(intent: str, user_text: str) -> str:
             status = info["status"]
 
             if status.lower() == "processing":
-                return (
-                    f"Order **{order_id}** is currently in *Processing* and has been marked for cancellation. ✅\n"
-                    "You’ll receive a confirmation email shortly, and any payment will be refunded according to our refund policy."
-                )
-            elif status.lower() == "shipped":
+                outcome = cancel_order(order_id, status)
+                if outcome == "cancelled":
+                    return (
+                        f"Order **{order_id}** was in *Processing* and has been marked for cancellation. ✅\n"
+                        "You’ll receive a confirmation email shortly, and any payment will be refunded according to our refund policy."
+                    )
+                if outcome == "pending":
+                    return (
+                        f"We’ve received your request to cancel order **{order_id}** and it’s being processed. ⏳\n"
+                        "You’ll receive a confirmation email once it’s done."
+                    )
+                # Changed since we looked it up (e.g. just shipped), or the
+                # write log couldn't take the change
+                info = get_order_info(order_id)
+                status = info["status"] if info else ""
+
+            if status.lower() == "shipped":
                 return (
                     f"Order **{order_id}** has already been *Shipped* 📦\n"
                     "We can no longer cancel it at this stage. You may refuse delivery or request a return once it arrives."
@@ -152,7 +277,10 @@ def handle_intent(intent: str, user_text: str) -> str:
 
     # -------- Fallback: semantic FAQ search --------
     if intent == "fallback":
-        faq_answer = semantic_faq_search(user_text)
+        if faq_match is not None:
+            faq_answer = faq_match.answer
+        else:
+            faq_answer = semantic_faq_search(user_text, tenant=tenant)
         if faq_answer:
             return faq_answer
         return INTENT_RESPONSES["fallback"]
@@ -0,0 +1,395 @@
+import atexit
+import importlib.util
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .config import (
+    INTERACTION_LOG_BUFFER_SIZE,
+    INTERACTION_LOG_DIR,
+    INTERACTION_LOG_FLUSH_ROWS,
+    INTERACTION_LOG_FLUSH_SECONDS,
+    INTERACTION_LOG_FORMAT,
+    INTERACTION_LOG_SEGMENT_ROWS,
+)
+
+# Columns of every segment; timestamp is UNIX time in seconds (float)
+LOG_COLUMNS = ("timestamp", "intent", "user_text", "bot_reply", "source")
+
+SEGMENT_PREFIX = "interactions-"
+SEGMENT_SUFFIXES = {"arrow": ".arrow", "jsonl": ".jsonl"}
+
+# Pre-segment log written by older versions of app.py
+LEGACY_CSV = Path("logs/interactions.csv")
+
+
+def _have_pyarrow() -> bool:
+    # find_spec() instead of importing: keeps pyarrow off the startup path
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_format(segment_format: str) -> str:
+    """
+    "auto" -> "arrow" when pyarrow is installed, else "jsonl".
+    """
+    if segment_format == "auto":
+        return "arrow" if _have_pyarrow() else "jsonl"
+    if segment_format not in SEGMENT_SUFFIXES:
+        raise ValueError(f"Unknown interaction log format: {segment_format!r}")
+    return segment_format
+
+
+# -------------------------
+# Segment files
+# -------------------------
+
+
+class _ArrowSegment:
+    """
+    Arrow IPC stream: one record batch per flush. A reader sees every
+    batch written so far, even while the segment is still open.
+    """
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.schema = self.arrow_schema()
+        self._sink = pa.OSFile(str(path), "wb")
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    @staticmethod
+    def arrow_schema():
+        import pyarrow as pa
+
+        return pa.schema(
+            [("timestamp", pa.float64())]
+            + [(name, pa.string()) for name in LOG_COLUMNS[1:]]
+        )
+
+    def write(self, columns: dict) -> None:
+        batch = self._pa.record_batch(
+            [columns[name] for name in LOG_COLUMNS], schema=self.schema
+        )
+        self._writer.write_batch(batch)
+        self._sink.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+class _JsonSegment:
+    """
+    Dependency-free fallback: one JSON object of column lists per line
+    (one line per flush).
+    """
+
+    def __init__(self, path: Path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, columns: dict) -> None:
+        self._file.write(json.dumps(columns, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def segment_files(log_dir: str | Path = INTERACTION_LOG_DIR) -> list[Path]:
+    """
+    All segments in log_dir, oldest first (names start with the UTC time
+    the segment was opened).
+    """
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return []
+    return sorted(
+        path for path in log_dir.iterdir()
+        if path.name.startswith(SEGMENT_PREFIX) and path.suffix in (".arrow", ".jsonl")
+    )
+
+
+def read_segment(path: str | Path) -> dict:
+    """
+    Columns (name -> list) of every complete batch in a segment. A batch
+    still being written at the end of an open segment is skipped.
+    """
+    columns, _ = read_segment_from(path, 0)
+    return columns
+
+
+def read_segment_from(path: str | Path, offset: int) -> tuple[dict, int]:
+    """
+    Columns of the complete batches stored after byte `offset`, plus the
+    offset to continue from next time (used to tail open segments).
+    """
+    path = Path(path)
+    columns = {name: [] for name in LOG_COLUMNS}
+
+    if path.suffix == ".arrow":
+        import pyarrow as pa
+
+        schema = _ArrowSegment.arrow_schema()
+        with pa.OSFile(str(path), "rb") as source:
+            source.seek(offset)
+            while True:
+                try:
+                    message = pa.ipc.read_message(source)
+                except (EOFError, OSError, pa.ArrowInvalid):
+                    # End of stream, or a batch that is still being written
+                    break
+                if message.type == "record batch":
+                    batch = pa.ipc.read_record_batch(message, schema)
+                    for name in LOG_COLUMNS:
+                        columns[name].extend(batch.column(name).to_pylist())
+                offset = source.tell()
+    else:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                batch = json.loads(line)
+                for name in LOG_COLUMNS:
+                    columns[name].extend(batch[name])
+                offset += len(line)
+
+    return columns, offset
+
+
+def read_interactions(log_dir: str | Path = INTERACTION_LOG_DIR, legacy_csv: Path = LEGACY_CSV):
+    """
+    Every logged interaction as a pandas DataFrame (timestamp as
+    datetime), including the legacy logs/interactions.csv if present.
+    """
+    import pandas as pd
+
+    frames = []
+    if legacy_csv.exists():
+        legacy = pd.read_csv(legacy_csv)
+        legacy["timestamp"] = pd.to_datetime(legacy["timestamp"])
+        legacy["source"] = "streamlit"
+        frames.append(legacy)
+
+    for path in segment_files(log_dir):
+        frame = pd.DataFrame(read_segment(path), columns=list(LOG_COLUMNS))
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s", utc=True)
+        frame["timestamp"] = frame["timestamp"].dt.tz_convert(None)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=list(LOG_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+
+# -------------------------
+# Logger
+# -------------------------
+
+
+class InteractionLogger:
+    """
+    Buffered, batched interaction logger shared by app.py and api.py.
+
+    - log() only appends a tuple to an in-memory ring buffer (when the
+      buffer is full the oldest unflushed row is dropped and counted)
+    - a background thread writes the buffer out in batches once
+      `flush_rows` rows are waiting or every `flush_interval` seconds
+    - batches go to append-only segment files in log_dir, rotated after
+      `segment_rows` rows; names carry open time + pid, so several
+      processes (Streamlit, API workers) can log to the same directory
+    - close() (also registered with atexit) drains the buffer and
+      closes the current segment
+
+    The flusher starts on first use and again after a fork, so a logger
+    created before serve.py forks its workers works in each of them (as
+    long as the parent itself hasn't logged anything).
+    """
+
+    def __init__(
+        self,
+        log_dir: str | Path = INTERACTION_LOG_DIR,
+        segment_format: str = INTERACTION_LOG_FORMAT,
+        buffer_size: int = INTERACTION_LOG_BUFFER_SIZE,
+        flush_rows: int = INTERACTION_LOG_FLUSH_ROWS,
+        flush_interval: float = INTERACTION_LOG_FLUSH_SECONDS,
+        segment_rows: int = INTERACTION_LOG_SEGMENT_ROWS,
+    ):
+        self.log_dir = Path(log_dir)
+        self.segment_format = resolve_format(segment_format)
+        self.buffer_size = buffer_size
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+
+        self._buffer = deque(maxlen=buffer_size)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self._segment = None
+        self._segment_path = None
+        self._segment_count = 0
+        self._segment_rows_written = 0
+
+        self.rows_logged = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.errors = 0
+        self.last_error = None
+
+    def log(
+        self,
+        user_text: str,
+        intent: str,
+        reply: str,
+        source: str = "api",
+        timestamp: float | None = None,
+    ) -> None:
+        """
+        Queue one interaction. Never blocks on I/O.
+        """
+        if self._pid != os.getpid():
+            self._start()
+
+        buffer = self._buffer
+        if len(buffer) == self.buffer_size:
+            self.rows_dropped += 1
+        buffer.append((
+            time.time() if timestamp is None else timestamp,
+            intent,
+            user_text,
+            reply,
+            source,
+        ))
+        self.rows_logged += 1
+
+        if len(buffer) >= self.flush_rows:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Forked child: buffered rows and the open segment belong
+                # to the parent, which writes them itself. The write lock
+                # may have been held by the parent's flusher at fork time.
+                self._buffer.clear()
+                self._write_lock = threading.Lock()
+                self._segment = None
+                self._segment_path = None
+                self._segment_rows_written = 0
+            self._stop.clear()
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name="interaction-log-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far; returns the number of rows.
+        """
+        with self._write_lock:
+            rows = []
+            buffer = self._buffer
+            while buffer:
+                try:
+                    rows.append(buffer.popleft())
+                except IndexError:
+                    break
+            if not rows:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                # Split at segment boundaries
+                offset = 0
+                while offset < len(rows):
+                    if self._segment is None or self._segment_rows_written >= self.segment_rows:
+                        self._open_segment()
+                    room = self.segment_rows - self._segment_rows_written
+                    chunk = rows[offset:offset + room]
+                    self._segment.write(
+                        {name: list(values) for name, values in zip(LOG_COLUMNS, zip(*chunk))}
+                    )
+                    self._segment_rows_written += len(chunk)
+                    offset += len(chunk)
+            except Exception as exc:  # keep serving even if the disk is unhappy
+                self.errors += 1
+                self.last_error = repr(exc)
+                self.rows_dropped += len(rows) - offset
+                self._segment = None
+                return offset
+
+            self.rows_written += len(rows)
+            self.flushes += 1
+            self.last_flush_seconds = time.perf_counter() - start
+            return len(rows)
+
+    def _open_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._segment_count += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        name = f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}-{self._segment_count:04d}"
+        self._segment_path = self.log_dir / (name + SEGMENT_SUFFIXES[self.segment_format])
+        if self.segment_format == "arrow":
+            self._segment = _ArrowSegment(self._segment_path)
+        else:
+            self._segment = _JsonSegment(self._segment_path)
+        self._segment_rows_written = 0
+
+    def close(self) -> None:
+        """
+        Stop the flusher, write what's left and close the segment.
+        """
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+        self._pid = None
+
+    def stats(self) -> dict:
+        return {
+            "format": self.segment_format,
+            "buffered": len(self._buffer),
+            "rows_logged": self.rows_logged,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+            "last_flush_seconds": self.last_flush_seconds,
+            "segment": self._segment_path.name if self._segment_path else None,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+INTERACTION_LOG = InteractionLogger()
+atexit.register(INTERACTION_LOG.close)
@@ -0,0 +1,266 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (seconds) for latency histograms: 10us .. 2.5s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_perf_counter = time.perf_counter
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------------
+# Metric types
+# -------------------------
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum", "_lock")
+
+    def __init__(self, upper: tuple):
+        self._upper = upper
+        self.counts = [0] * (len(upper) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._upper, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def observe_since(self, start: float) -> None:
+        """
+        Record the time elapsed since `start` (a time.perf_counter() value).
+        """
+        value = _perf_counter() - start
+        i = bisect_left(self._upper, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        The child for one combination of label values. Hot paths should
+        look children up once and keep them, not call this per event.
+        """
+        child = self._children.get(values)
+        if child is None:
+            values = tuple(str(v) for v in values)
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, *values, amount: float = 1) -> None:
+        self.labels(*values).inc(amount)
+
+    def values(self) -> dict:
+        return {labels: child.value for labels, child in list(self._children.items())}
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(child.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, *values) -> None:
+        self.labels(*values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        bounds = self.buckets + (float("inf"),)
+        for labels, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Gauge / counter whose values are read from `fn` at scrape time,
+    e.g. cache or executor stats that are already tracked elsewhere.
+    `fn` returns {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, fn, kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._fn = fn
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, value in sorted(self._fn().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering the same name (module reload) replaces it
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Pipeline metrics
+# -------------------------
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_stage_seconds",
+    "Time spent in each chat pipeline stage.",
+    ("stage",),
+))
+INTENTS_TOTAL = REGISTRY.register(Counter(
+    "chatbot_intents_total",
+    "Chat turns handled, by intent ('fallback' = classifier was unsure).",
+    ("intent",),
+))
+FAQ_SEARCHES_TOTAL = REGISTRY.register(Counter(
+    "chatbot_faq_searches_total",
+    "FAQ similarity searches, by result (hit = an answer above the threshold).",
+    ("result",),
+))
+ORDER_LOOKUPS_TOTAL = REGISTRY.register(Counter(
+    "chatbot_order_lookups_total",
+    "Order lookups, by result (found / not_found).",
+    ("result",),
+))
+CASCADE_TOTAL = REGISTRY.register(Counter(
+    "chatbot_cascade_total",
+    "Classified messages, by the cascade stage whose answer was used ('fallback' = neither was sure).",
+    ("stage",),
+))
+FAST_PATH_HITS = REGISTRY.register(Counter(
+    "chatbot_fast_path_hits_total",
+    "Messages classified by a fast-path rule instead of the model, by rule and intent.",
+    ("rule", "intent"),
+))
+FAST_PATH_MISSES = REGISTRY.register(Counter(
+    "chatbot_fast_path_misses_total",
+    "Messages no fast-path rule matched (classified by the model).",
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_request_seconds",
+    "API request latency, by endpoint and outcome.",
+    ("endpoint", "outcome"),
+))
+REQUESTS_SHED = REGISTRY.register(Counter(
+    "chatbot_requests_shed_total",
+    "Requests not run by the pipeline, by endpoint and reason "
+    "(queue_full, no_slot before the deadline, expired while queued).",
+    ("endpoint", "reason"),
+))
+REQUESTS_DEGRADED = REGISTRY.register(Counter(
+    "chatbot_requests_degraded_total",
+    "Shed requests answered without the model, by endpoint and source (fast_path / canned).",
+    ("endpoint", "source"),
+))
+
+# Children looked up once, so the hot paths only pay for observe()/inc()
+FEATURIZE = STAGE_SECONDS.labels("featurize")
+CLASSIFY = STAGE_SECONDS.labels("classify")
+FAQ_FEATURIZE = STAGE_SECONDS.labels("faq_featurize")
+FAQ_SEARCH = STAGE_SECONDS.labels("faq_search")
+ORDER_LOOKUP = STAGE_SECONDS.labels("order_lookup")
+REPLY = STAGE_SECONDS.labels("reply")
+# Second cascade stage: featurize + classify of the escalated messages
+CASCADE = STAGE_SECONDS.labels("cascade")
+FAQ_HIT = FAQ_SEARCHES_TOTAL.labels("hit")
+FAQ_MISS = FAQ_SEARCHES_TOTAL.labels("miss")
+ORDER_FOUND = ORDER_LOOKUPS_TOTAL.labels("found")
+ORDER_NOT_FOUND = ORDER_LOOKUPS_TOTAL.labels("not_found")
+FAST_PATH_MISS = FAST_PATH_MISSES.labels()
+CASCADE_STAGE1 = CASCADE_TOTAL.labels("stage1")
+CASCADE_STAGE2 = CASCADE_TOTAL.labels("stage2")
+CASCADE_FALLBACK = CASCADE_TOTAL.labels("fallback")
@@ -1,32 +1,367 @@
-import pickle
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from . import metrics
+from .cache import LRUCache, message_cache_key
+from .compact_model import CompactIntentModel
+from .config import (
+    CACHE_MAX_SIZE,
+    CACHE_TTL_SECONDS,
+    CACHE_WARMUP_MESSAGES,
+    CASCADE_ESCALATION_THRESHOLD,
+    INTENT_CASCADE_ENABLED,
+    INTENT_FALLBACK_THRESHOLD,
+    INTENT_MODEL_FORMAT,
+    MODEL_WATCH_INTERVAL_SECONDS,
+)
+from .fast_path import FastPath
+from .registry import CASCADE_DIR_NAME, COMPACT_DIR_NAME, ManifestWatcher, ModelRegistry, load_model_files
+
 MODEL_DIR = Path("models")
+REGISTRY = ModelRegistry(MODEL_DIR / "registry")
+
+# Version name used for the plain models/*.pkl files when there is no registry
+LEGACY_VERSION = "legacy"
+
+
+@dataclass
+class CascadeStage:
+    """
+    Second, slower model of a cascade (<model dir>/cascade/, written by
+    train_intent_model.py --cascade): a sklearn classifier and a vectorizer
+    that works on raw text. Only sees messages the first model scored
+    below `escalate_below`.
+    """
+    model: object
+    vectorizer: object
+    escalate_below: float = CASCADE_ESCALATION_THRESHOLD
+
+
+@dataclass
+class ModelBundle:
+    """
+    Everything needed to classify a message with one model version.
+    Swapped as a single object so a request never mixes two versions.
+
+    `model` is either a sklearn classifier (with `vectorizer` the fitted
+    TfidfVectorizer or HashingTfidfVectorizer) or a CompactIntentModel,
+    which is its own vectorizer. `cascade` is the optional second stage.
+    """
+    version: str
+    model: object
+    vectorizer: object
+    cascade: CascadeStage | None = None
+    analyzer: object = field(init=False)
 
-# Load the trained model and vectorizer once, when this module is imported
-with open(MODEL_DIR / "intent_classifier.pkl", "rb") as f:
-    INTENT_MODEL = pickle.load(f)
+    def __post_init__(self):
+        # Text -> list of n-grams, exactly as the vectorizer tokenizes it
+        if isinstance(self.model, CompactIntentModel):
+            self.analyzer = self.model.analyze
+        else:
+            self.analyzer = self.vectorizer.build_analyzer()
 
-with open(MODEL_DIR / "vectorizer.pkl", "rb") as f:
-    VECTORIZER = pickle.load(f)
+    def featurize(self, ngrams: list[str]):
+        if isinstance(self.model, CompactIntentModel):
+            return [self.model.featurize(ngrams)]
+        if hasattr(self.vectorizer, "transform_ngrams"):
+            # HashingTfidfVectorizer (streaming-trained): no vocabulary
+            return self.vectorizer.transform_ngrams(ngrams)
+        # Only the sklearn path needs scipy
+        from .features import tfidf_row
+        return tfidf_row(self.vectorizer, ngrams)
 
 
-def predict_intent(user_text: str, threshold: float = 0.3) -> str:
+def _load_bundle(version: str) -> ModelBundle:
+    model_dir = MODEL_DIR if version == LEGACY_VERSION else REGISTRY.version_dir(version)
+    if version != LEGACY_VERSION and version not in REGISTRY.versions():
+        raise KeyError(f"Unknown model version {version!r}")
+
+    cascade_dir = model_dir / CASCADE_DIR_NAME
+    cascade = None
+    if INTENT_CASCADE_ENABLED and cascade_dir.is_dir():
+        cascade = CascadeStage(*load_model_files(cascade_dir))
+
+    compact_dir = model_dir / COMPACT_DIR_NAME
+    if INTENT_MODEL_FORMAT == "compact" and compact_dir.is_dir():
+        # NumPy-only inference, weights memory-mapped and shared by workers
+        model = CompactIntentModel(compact_dir)
+        return ModelBundle(version=version, model=model, vectorizer=model, cascade=cascade)
+
+    model, vectorizer = load_model_files(model_dir)
+    return ModelBundle(version=version, model=model, vectorizer=vectorizer, cascade=cascade)
+
+
+# Load the active model once, when this module is imported: the registry's
+# active version if there is a registry, else models/*.pkl
+_ACTIVE = _load_bundle(REGISTRY.read_manifest()["active"] or LEGACY_VERSION)
+_PREVIOUS: ModelBundle | None = None
+_SWAP_LOCK = threading.Lock()
+
+# Kept for callers that use the module globals directly; they always
+# point at the active bundle's objects
+INTENT_MODEL = _ACTIVE.model
+VECTORIZER = _ACTIVE.vectorizer
+ANALYZER = _ACTIVE.analyzer
+
+# (model version, normalized text, threshold) -> intent
+INTENT_CACHE = LRUCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+
+
+def active_model() -> ModelBundle:
+    """
+    The bundle currently serving traffic. Grab it once per request and use
+    it for every step, so a concurrent swap can't mix versions.
+    """
+    return _ACTIVE
+
+
+def active_model_version() -> str:
+    return _ACTIVE.version
+
+
+def _top_classes(model, X_vec) -> list[tuple[str, float]]:
+    # If the model supports probabilities, use them to decide fallback
+    if hasattr(model, "predict_proba"):
+        probs = model.predict_proba(X_vec)
+        best = probs.argmax(axis=1)
+        max_probs = probs.max(axis=1)
+        classes = model.classes_
+        return [(str(classes[i]), float(p)) for i, p in zip(best, max_probs)]
+    # No probability info available
+    return [(str(intent), 1.0) for intent in model.predict(X_vec)]
+
+
+def classify_vectors(
+    X_vec,
+    threshold: float = INTENT_FALLBACK_THRESHOLD,
+    bundle: ModelBundle | None = None,
+    texts: list[str] | None = None,
+) -> list[tuple[str, float]]:
+    """
+    Turn a feature matrix (one row per message) into (intent, confidence)
+    pairs, replacing low-confidence predictions with 'fallback'.
+
+    With `texts` (the messages behind the rows), rows the bundle's first
+    model is unsure about go to its cascade stage, if it has one, and
+    every row is counted per answering stage in metrics.CASCADE_TOTAL.
+    """
+    start = time.perf_counter()
+    bundle = bundle or _ACTIVE
+    results = _top_classes(bundle.model, X_vec)
+    metrics.CLASSIFY.observe_since(start)
+
+    if texts is not None:
+        results = _escalate(results, texts, threshold, bundle.cascade)
+
+    # Low confidence -> fallback
+    return [("fallback" if p < threshold else intent, p) for intent, p in results]
+
+
+def _escalate(results: list, texts: list[str], threshold: float, stage: CascadeStage | None) -> list:
+    """
+    Re-score the rows below the stage's escalation threshold with the
+    second model. Its answer is used when it clears `threshold`, else the
+    first model's answer stands.
+    """
+    stage1 = sum(1 for _, p in results if p >= threshold)
+    stage2 = 0
+    unsure = []
+    if stage is not None:
+        unsure = [i for i, (_, p) in enumerate(results) if p < stage.escalate_below]
+
+    if unsure:
+        start = time.perf_counter()
+        X_vec = stage.vectorizer.transform([texts[i] for i in unsure])
+        second = _top_classes(stage.model, X_vec)
+        metrics.CASCADE.observe_since(start)
+        results = list(results)
+        for i, (intent, p) in zip(unsure, second):
+            if p >= threshold:
+                if results[i][1] >= threshold:
+                    stage1 -= 1
+                results[i] = (intent, p)
+                stage2 += 1
+
+    fallback = len(results) - stage1 - stage2
+    if stage1:
+        metrics.CASCADE_STAGE1.inc(stage1)
+    if stage2:
+        metrics.CASCADE_STAGE2.inc(stage2)
+    if fallback:
+        metrics.CASCADE_FALLBACK.inc(fallback)
+    return results
+
+
+def featurize_ngrams(ngrams: list[str], bundle: ModelBundle | None = None):
+    """
+    Build the intent model's feature row from n-grams produced by the
+    bundle's analyzer.
+    """
+    return (bundle or _ACTIVE).featurize(ngrams)
+
+
+def _score_texts(texts: list[str], bundle: ModelBundle) -> list[tuple[str, float]]:
+    # Raw (intent, confidence) pairs, no fallback: builds the fast-path table
+    return classify_vectors(bundle.vectorizer.transform(texts), 0.0, bundle)
+
+
+# Rules that answer trivial messages before the model; one table per model version
+FAST_PATH = FastPath(_score_texts)
+
+
+def predict_intent(user_text: str, threshold: float = INTENT_FALLBACK_THRESHOLD) -> str:
     """
     Predict the intent of the user's message.
     If the model's confidence is too low, return 'fallback'.
     """
-    X_vec = VECTORIZER.transform([user_text])
+    bundle = _ACTIVE
+    hit = FAST_PATH.match(user_text, bundle, threshold)
+    if hit is not None:
+        return hit[0]
+    key = message_cache_key(user_text)
+    if key is None:
+        return _predict_intent_uncached(user_text, threshold, bundle)
+    return INTENT_CACHE.get_or_compute(
+        (bundle.version, key, threshold),
+        lambda: _predict_intent_uncached(user_text, threshold, bundle),
+    )
 
-    # If the model supports probabilities, use them to decide fallback
-    if hasattr(INTENT_MODEL, "predict_proba"):
-        probs = INTENT_MODEL.predict_proba(X_vec)[0]
-        max_prob = probs.max()
-        intent = INTENT_MODEL.classes_[probs.argmax()]
-        # Low confidence -> fallback
-        if max_prob < threshold:
-            return "fallback"
-        return intent
+
+def _predict_intent_uncached(user_text: str, threshold: float, bundle: ModelBundle) -> str:
+    start = time.perf_counter()
+    X_vec = bundle.vectorizer.transform([user_text])
+    metrics.FEATURIZE.observe_since(start)
+    return classify_vectors(X_vec, threshold, bundle, [user_text])[0][0]
+
+
+def predict_intents(
+    texts: list[str],
+    threshold: float = INTENT_FALLBACK_THRESHOLD,
+    bundle: ModelBundle | None = None,
+) -> list[str]:
+    """
+    Predict intents for many messages at once (with `bundle`; the active
+    model if None).
+
+    All messages are vectorized with a single sparse transform and scored
+    with a single predict_proba call, which is much cheaper than calling
+    predict_intent() once per message. Messages the fast path answers are
+    left out of that call.
+    """
+    bundle = bundle or _ACTIVE
+    hits = [FAST_PATH.match(text, bundle, threshold) for text in texts]
+    intents = [hit[0] if hit is not None else None for hit in hits]
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+    if not pending:
+        return intents
+
+    pending_texts = [texts[i] for i in pending]
+    start = time.perf_counter()
+    X_vec = bundle.vectorizer.transform(pending_texts)
+    metrics.FEATURIZE.observe_since(start)
+    for i, (intent, _) in zip(pending, classify_vectors(X_vec, threshold, bundle, pending_texts)):
+        intents[i] = intent
+    return intents
+
+
+# -------------------------
+# Model hot-swap
+# -------------------------
+
+# Called with the new bundle after every swap (e.g. to drop cached results)
+_SWAP_LISTENERS = []
+
+
+def on_model_swap(callback) -> None:
+    _SWAP_LISTENERS.append(callback)
+
+
+def _activate(bundle: ModelBundle) -> None:
+    global _ACTIVE, _PREVIOUS, INTENT_MODEL, VECTORIZER, ANALYZER
+
+    # Warm the new model before it sees traffic: first calls through
+    # sklearn / scipy are noticeably slower than steady state
+    X_vec = bundle.vectorizer.transform(CACHE_WARMUP_MESSAGES)
+    classify_vectors(X_vec, bundle=bundle)
+    if bundle.cascade is not None:
+        _top_classes(bundle.cascade.model, bundle.cascade.vectorizer.transform(CACHE_WARMUP_MESSAGES))
+    FAST_PATH.build(bundle)
+
+    _PREVIOUS, _ACTIVE = _ACTIVE, bundle
+    INTENT_MODEL, VECTORIZER, ANALYZER = bundle.model, bundle.vectorizer, bundle.analyzer
+
+    # Cache keys include the version, so this only frees memory
+    INTENT_CACHE.clear()
+    for callback in _SWAP_LISTENERS:
+        callback(bundle)
+
+
+def swap_model(version: str, persist: bool = True) -> str:
+    """
+    Load `version` from the registry, warm it, then switch traffic to it in
+    one reference assignment. In-flight requests finish on the old model.
+
+    With persist=True the registry manifest is updated too, so other server
+    processes and restarts follow. Returns the now-active version.
+    """
+    with _SWAP_LOCK:
+        if version == _ACTIVE.version:
+            return version
+        if _PREVIOUS is not None and _PREVIOUS.version == version:
+            bundle = _PREVIOUS  # rolling back: already loaded
+        else:
+            bundle = _load_bundle(version)
+        _activate(bundle)
+        if persist and version != LEGACY_VERSION:
+            REGISTRY.set_active(version)
+        return version
+
+
+def rollback_model(persist: bool = True) -> str:
+    """
+    Switch back to the previously active version. Returns the now-active version.
+    """
+    if _PREVIOUS is not None:
+        previous = _PREVIOUS.version
     else:
-        # No probability info available
-        return INTENT_MODEL.predict(X_vec)[0]
+        previous = REGISTRY.read_manifest()["previous"]
+    if previous is None:
+        raise LookupError("No previous model version to roll back to")
+    return swap_model(previous, persist=persist)
+
+
+def model_info() -> dict:
+    manifest = REGISTRY.read_manifest()
+    return {
+        "active": _ACTIVE.version,
+        "previous": _PREVIOUS.version if _PREVIOUS is not None else manifest["previous"],
+        "versions": manifest["versions"],
+        "cascade": cascade_stats(),
+    }
+
+
+def cascade_stats() -> dict:
+    """
+    Whether the active version has a second stage, its escalation
+    threshold, and how many messages each stage answered since start-up.
+    """
+    stage = _ACTIVE.cascade
+    answered = {labels[0]: count for labels, count in metrics.CASCADE_TOTAL.values().items()}
+    total = sum(answered.values())
+    return {
+        "enabled": INTENT_CASCADE_ENABLED,
+        "stage2_loaded": stage is not None,
+        "escalation_threshold": stage.escalate_below if stage is not None else None,
+        "answered": answered,
+        "fractions": {name: count / total for name, count in answered.items()} if total else {},
+    }
+
+
+# Follows the manifest, so a swap through one worker reaches all of them
+MODEL_WATCHER = ManifestWatcher(
+    REGISTRY,
+    on_change=lambda version: swap_model(version, persist=False),
+    interval=MODEL_WATCH_INTERVAL_SECONDS,
+)
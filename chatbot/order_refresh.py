@@ -0,0 +1,274 @@
+import csv
+import io
+import os
+import threading
+import time
+from pathlib import Path
+
+from .orders import ORDER_FIELDS, OverlayOrderStore
+
+# How many bytes before the read offset we remember, to tell an append
+# (old bytes untouched) from a rewrite of the file
+_FINGERPRINT_BYTES = 64
+
+
+def _normalize_order_id(order_id: str) -> str:
+    # Same normalization as the CSV loaders: numeric IDs lose leading zeros
+    order_id = order_id.strip()
+    if order_id.isdigit():
+        return str(int(order_id))
+    return order_id
+
+
+class _TailedCsv:
+    """
+    Remembers how far into a CSV file we've read, so later reads only
+    return rows appended since then.
+    """
+
+    def __init__(self, path: Path, already_applied: bool):
+        self.path = Path(path)
+        self.header = None
+        self.offset = 0
+        self.inode = None
+        self.fingerprint = b""
+        self.mtime = 0.0
+        if already_applied and self.path.exists():
+            # Contents were loaded by the initial store; start at the end
+            st = os.stat(self.path)
+            with open(self.path, "rb") as f:
+                self._read_header(f.readline())
+                f.seek(max(0, st.st_size - _FINGERPRINT_BYTES))
+                tail = f.read(_FINGERPRINT_BYTES)
+            self._advance(tail, st.st_size, st)
+
+    def _read_header(self, data: bytes) -> None:
+        first_line = data.split(b"\n", 1)[0].decode("utf-8").strip()
+        self.header = next(csv.reader([first_line])) if first_line else None
+
+    def _advance(self, consumed: bytes, offset: int, st) -> None:
+        self.offset = offset
+        self.inode = st.st_ino
+        self.mtime = st.st_mtime
+        if consumed:
+            self.fingerprint = consumed[-_FINGERPRINT_BYTES:]
+
+    def status(self) -> str:
+        """
+        'missing', 'unchanged', 'appended' or 'rewritten'.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return "missing"
+
+        if self.inode is None:
+            return "appended" if st.st_size > 0 else "unchanged"
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            return "rewritten"
+        if st.st_size == self.offset:
+            # Touched without growing -> edited in place
+            return "unchanged" if st.st_mtime == self.mtime else "rewritten"
+
+        # Same file, same size or larger: check the bytes we already read
+        # are still there, otherwise it was modified in place
+        start = self.offset - len(self.fingerprint)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            if f.read(len(self.fingerprint)) != self.fingerprint:
+                return "rewritten"
+        return "appended"
+
+    def reset(self) -> None:
+        self.header = None
+        self.offset = 0
+        self.inode = None
+        self.fingerprint = b""
+
+    def read_new_rows(self) -> list[dict]:
+        """
+        Parse complete lines appended since the last read.
+        A trailing partial line is left for the next call.
+        """
+        st = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+
+        chunk = data[:end]
+        text = chunk.decode("utf-8")
+        if self.header is None:
+            self._read_header(chunk)
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+        self._advance(chunk, self.offset + end, st)
+
+        if not self.header:
+            return []
+        return [
+            row for row in csv.DictReader(io.StringIO(text), fieldnames=self.header)
+            if row.get("order_id")
+        ]
+
+
+class OrderRefresher:
+    """
+    Background thread that keeps an OverlayOrderStore in sync with the
+    orders source without restarting the process.
+
+    - rows appended to orders.csv or to the delta file are parsed and
+      applied on their own (only those rows, not the whole file)
+    - if orders.csv is rewritten or edited in place, the store is
+      reloaded in full and the delta file re-applied on top of it aside;
+      both are swapped in as one atomic update
+    - a rewritten/truncated delta file is read again from the start
+
+    Delta rows may carry only some fields (e.g. "order_id,status"); the
+    other fields keep their current values.
+
+    replace_base(base, overlay), if given, publishes a full reload instead
+    of store.replace_base(); the order write log uses it to put its own
+    changes on top in the same step. after_refresh() runs at the end of
+    every refresh.
+    """
+
+    def __init__(
+        self,
+        store: OverlayOrderStore,
+        csv_path: Path,
+        reload,
+        delta_path: Path | None = None,
+        interval: float = 5.0,
+        replace_base=None,
+        after_refresh=None,
+    ):
+        self.store = store
+        self.interval = interval
+        self._reload = reload
+        self._replace_base = replace_base or store.replace_base
+        self._after_refresh = after_refresh
+        self._csv = _TailedCsv(csv_path, already_applied=True)
+        self._delta = _TailedCsv(delta_path, already_applied=False) if delta_path else None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refreshes = 0
+        self.full_reloads = 0
+        self.rows_applied_total = 0
+        self.last_rows_applied = 0
+        self.last_refresh_at = None
+        self.last_lag_seconds = None
+        self.errors = 0
+        self.last_error = None
+
+    def _merge(self, rows: list[dict], lookup=None) -> dict[str, dict]:
+        lookup = lookup or self.store.get_order
+        changes = {}
+        for row in rows:
+            order_id = _normalize_order_id(row["order_id"])
+            current = changes.get(order_id) or lookup(order_id) or {
+                field: "" for field in ORDER_FIELDS
+            }
+            updated = dict(current)
+            for field in ORDER_FIELDS:
+                value = row.get(field)
+                if value is not None and value != "":
+                    updated[field] = value.strip()
+            changes[order_id] = updated
+        return changes
+
+    def _apply_tail(self, tailed: _TailedCsv) -> int:
+        rows = tailed.read_new_rows()
+        changes = self._merge(rows)
+        applied = self.store.apply(changes)
+        if applied:
+            self.last_lag_seconds = max(0.0, time.time() - tailed.mtime)
+        return applied
+
+    def refresh_once(self) -> int:
+        """
+        Check the sources once and apply whatever changed.
+        Returns the number of rows applied.
+        """
+        with self._lock:
+            applied = 0
+
+            csv_status = self._csv.status()
+            if csv_status == "rewritten":
+                base = self._reload()
+                self._csv = _TailedCsv(self._csv.path, already_applied=True)
+                # The delta file sits on top of orders.csv: apply it again,
+                # before anyone can see the new base
+                overlay = {}
+                if self._delta is not None:
+                    self._delta.reset()
+                    if self._delta.status() != "missing":
+                        overlay = self._merge(self._delta.read_new_rows(), base.get_order)
+                self._replace_base(base, overlay)
+                self.full_reloads += 1
+                applied += len(self.store)
+                self.last_lag_seconds = max(0.0, time.time() - self._csv.mtime)
+            elif csv_status == "appended":
+                applied += self._apply_tail(self._csv)
+
+            if self._delta is not None:
+                delta_status = self._delta.status()
+                if delta_status == "rewritten":
+                    self._delta.reset()
+                    delta_status = "appended"
+                if delta_status == "appended":
+                    applied += self._apply_tail(self._delta)
+
+            if self._after_refresh is not None:
+                applied += self._after_refresh()
+
+            self.refreshes += 1
+            self.last_rows_applied = applied
+            self.rows_applied_total += applied
+            self.last_refresh_at = time.time()
+            return applied
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh_once()
+            except Exception as exc:  # keep refreshing after a bad file
+                self.errors += 1
+                self.last_error = repr(exc)
+
+    def start(self) -> None:
+        """
+        Start the background thread (no-op if already running).
+        Pending changes (e.g. an existing delta file) are applied first.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.refresh_once()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval,
+            "refreshes": self.refreshes,
+            "full_reloads": self.full_reloads,
+            "rows_applied_total": self.rows_applied_total,
+            "last_rows_applied": self.last_rows_applied,
+            "last_refresh_at": self.last_refresh_at,
+            "refresh_lag_seconds": self.last_lag_seconds,
+            "overlay_size": self.store.overlay_size,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
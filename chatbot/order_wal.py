@@ -0,0 +1,342 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from .orders import ORDER_FIELDS, OverlayOrderStore
+
+# fdatasync skips flushing file metadata we don't need (mtime); not on every OS
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+class CommitUncertain(Exception):
+    """
+    The change was appended to the log but its commit failed afterwards
+    (e.g. the fsync): it isn't visible yet, but it is in the log and will
+    be applied by the next read of it (next commit, sync() or restart).
+    """
+
+
+class OrderWriteLog:
+    """
+    Durable write path for an OverlayOrderStore.
+
+    - each change is one JSON line ({"ts", "order_id", "fields"}) appended
+      to the log file
+    - writers hand their change to a single committer thread and wait;
+      the committer writes everything pending with one write() and one
+      fsync (group commit), so concurrent cancellations share the cost
+    - only then is the batch published to the in-memory store, with one
+      atomic OverlayOrderStore.merge(): a lookup never sees a change that
+      isn't on disk yet
+    - replay() (also run by start()) applies the log to the store; a torn
+      last line (crash mid-write) is skipped
+
+    The store is updated from what is read back from the log, in file
+    order, so several processes (serve.py workers, process executors)
+    appending to the same file converge on the same state; sync() picks
+    up changes written by the others. replace_base() swaps in a reloaded
+    backend with the log's changes already on top.
+    """
+
+    def __init__(
+        self,
+        store: OverlayOrderStore,
+        path: Path,
+        fsync: bool = True,
+        commit_delay: float = 0.0,
+        max_batch: int = 1000,
+    ):
+        self.store = store
+        self.path = Path(path)
+        self.fsync = fsync
+        self.commit_delay = commit_delay
+        self.max_batch = max(1, int(max_batch))
+
+        self._fd = None
+        self._pid = None
+        # Bytes of the log already applied to the store
+        self._offset = 0
+        # Every change the log holds, merged per order (re-applied after
+        # the store's base is reloaded)
+        self._changes = {}
+        self._pending = []
+        self._cond = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._thread = None
+
+        self.writes = 0
+        self.rejected = 0
+        self.withdrawn = 0
+        self.commits = 0
+        self.fsyncs = 0
+        self.records_read = 0
+        self.records_replayed = 0
+        self.records_skipped = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_commit_seconds = None
+        self.max_batch_seen = 0
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+
+    def start(self) -> None:
+        """
+        Open the log, replay it into the store and start the committer
+        (no-op if already running in this process).
+        """
+        with self._start_lock:
+            if self._is_open():
+                if self._thread is not None and self._thread.is_alive():
+                    return
+            else:
+                # First start, or a forked child: needs its own file and thread
+                self._open_and_replay()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="order-wal-committer", daemon=True)
+            self._thread.start()
+
+    def replay(self) -> int:
+        """
+        Apply the log to the store without starting the committer, so
+        lookups see earlier changes before anything writes (no-op if the
+        log doesn't exist yet or is already open). Returns the number of
+        records replayed.
+        """
+        with self._start_lock:
+            if not self._is_open() and self.path.exists():
+                self._open_and_replay()
+            return self.records_replayed
+
+    def _is_open(self) -> bool:
+        return self._fd is not None and self._pid == os.getpid()
+
+    def _open_and_replay(self) -> None:
+        self._open()
+        self.records_read = 0
+        self._catch_up()
+        self.records_replayed = self.records_read
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            # Torn record from a crash: end it so the next one starts on
+            # its own line (the fragment is skipped when read)
+            os.write(fd, b"\n")
+        self._fd = fd
+        self._pid = os.getpid()
+        self._offset = 0
+        self._changes = {}
+        self._pending = []
+
+    def stop(self) -> None:
+        """
+        Commit whatever is pending, then stop the committer and close the log.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._start_lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+    # -------------------------
+    # Writes
+    # -------------------------
+
+    def submit(self, order_id: str, fields: dict, expected: dict | None = None) -> Future:
+        """
+        Queue a change; the future resolves to the updated record once it
+        is durable and visible, or to None if the order doesn't exist or
+        no longer matches `expected` (field -> value) at commit time.
+        """
+        self.start()
+        unknown = set(fields) - set(ORDER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown order fields: {sorted(unknown)}")
+        future = Future()
+        with self._cond:
+            self._pending.append((str(order_id), dict(fields), expected, future))
+            self._cond.notify()
+        return future
+
+    def write(self, order_id: str, fields: dict, expected: dict | None = None, timeout: float | None = None):
+        """
+        Blocking submit(): returns the updated record or None.
+
+        If the change is still queued after `timeout` seconds it is
+        withdrawn (never written) and TimeoutError is raised; one the
+        committer already picked up is waited for, so the caller always
+        learns its outcome. Raises CommitUncertain if it was appended but
+        the commit failed, or the committer's error if nothing was written.
+        """
+        future = self.submit(order_id, fields, expected)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                self.withdrawn += 1
+                raise
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            if self.commit_delay > 0 and not self._stopping:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        start = time.perf_counter()
+        # Drop changes their writer withdrew; the rest can't be withdrawn now
+        batch = [entry for entry in batch if entry[3].set_running_or_notify_cancel()]
+        accepted = []
+        written = False
+        try:
+            # Check every change against the store plus the earlier changes
+            # of the same batch
+            view = {}
+            lines = []
+            now = time.time()
+            for order_id, fields, expected, future in batch:
+                current = view.get(order_id) or self.store.get_order(order_id)
+                if current is None or (
+                    expected and any(current.get(k) != v for k, v in expected.items())
+                ):
+                    self.rejected += 1
+                    future.set_result(None)
+                    continue
+                view[order_id] = {**current, **fields}
+                accepted.append((order_id, future))
+                lines.append(json.dumps({"ts": now, "order_id": order_id, "fields": fields}) + "\n")
+            if not accepted:
+                return
+
+            # One write() with O_APPEND: other processes' records never
+            # interleave with ours
+            os.write(self._fd, "".join(lines).encode("utf-8"))
+            written = True
+            if self.fsync:
+                _fdatasync(self._fd)
+                self.fsyncs += 1
+            updated = self._catch_up()
+        except Exception as exc:
+            # Keep the committer alive; every writer still waiting hears
+            # about the failure (a lookup error fails the whole batch)
+            self.errors += 1
+            self.last_error = repr(exc)
+            if written:
+                exc = CommitUncertain(f"Appended to {self.path} but not committed: {exc!r}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.writes += len(accepted)
+        self.commits += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(accepted))
+        self.last_commit_seconds = time.perf_counter() - start
+        for order_id, future in accepted:
+            future.set_result(updated.get(order_id) or self.store.get_order(order_id))
+
+    # -------------------------
+    # Reads
+    # -------------------------
+
+    def _catch_up(self) -> dict[str, dict]:
+        """
+        Apply every complete record appended since the last call (ours
+        and other processes'). Returns the updated records.
+        """
+        with self._apply_lock:
+            return self.store.merge(self._read_new())
+
+    def _read_new(self) -> dict[str, dict]:
+        # Caller holds _apply_lock
+        size = os.fstat(self._fd).st_size
+        data = os.pread(self._fd, size - self._offset, self._offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return {}
+        self._offset += end
+
+        updates = {}
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            try:
+                record = json.loads(line)
+                order_id, fields = str(record["order_id"]), dict(record["fields"])
+            except (ValueError, KeyError, TypeError):
+                if line.strip():
+                    self.records_skipped += 1
+                continue
+            updates.setdefault(order_id, {}).update(fields)
+            self.records_read += 1
+        for order_id, fields in updates.items():
+            self._changes.setdefault(order_id, {}).update(fields)
+        return updates
+
+    def sync(self) -> int:
+        """
+        Apply changes other processes appended to the log. Returns the
+        number of orders updated.
+        """
+        if not self._is_open():
+            return 0
+        return len(self._catch_up())
+
+    def replace_base(self, base, overlay: dict[str, dict] | None = None) -> int:
+        """
+        Swap a reloaded backend into the store with `overlay` (full
+        records) and every change in the log on top, published as one
+        state: no lookup sees the new base without the log's changes, and
+        no commit lands in between. Returns the number of orders updated.
+        """
+        with self._apply_lock:
+            if self._is_open():
+                self._read_new()
+            return self.store.replace_base(base, overlay, self._changes)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "path": str(self.path),
+            "fsync": self.fsync,
+            "commit_delay_seconds": self.commit_delay,
+            "log_bytes": self._offset,
+            "orders_changed": len(self._changes),
+            "pending": pending,
+            "writes": self.writes,
+            "rejected": self.rejected,
+            "withdrawn": self.withdrawn,
+            "commits": self.commits,
+            "fsyncs": self.fsyncs,
+            "avg_batch": self.writes / self.commits if self.commits else 0.0,
+            "max_batch": self.max_batch_seen,
+            "last_commit_seconds": self.last_commit_seconds,
+            "records_read": self.records_read,
+            "records_replayed": self.records_replayed,
+            "records_skipped": self.records_skipped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
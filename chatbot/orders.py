@@ -0,0 +1,503 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+ORDER_FIELDS = ("status", "eta", "total", "shipping_provider")
+
+
+# -------------------------
+# Backend interface
+# -------------------------
+
+
+class OrderStore:
+    """
+    Read-only order lookup by order ID.
+
+    Backends return plain dicts with the ORDER_FIELDS keys (all strings),
+    or None when the order doesn't exist.
+    """
+
+    def get_order(self, order_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def get_orders(self, order_ids: list[str]) -> list[dict | None]:
+        """
+        Look up many orders at once; results are in the same order as
+        order_ids. Backends override this with a real bulk lookup.
+        """
+        return [self.get_order(order_id) for order_id in order_ids]
+
+    def __contains__(self, order_id: str) -> bool:
+        return self.get_order(order_id) is not None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+def _smallest_code_dtype(n_values: int):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_values <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.uint64
+
+
+def _integer_keys(ids: np.ndarray) -> np.ndarray | None:
+    """
+    IDs as int64 if every one of them is a plain integer, else None
+    ("00123" or "12a" can't round-trip through an integer key).
+    """
+    try:
+        keys = ids.astype(np.int64)
+    except (ValueError, OverflowError):
+        return None
+    if not (keys.astype(str) == ids.astype(str)).all():
+        return None
+    return keys
+
+
+# -------------------------
+# Compact in-memory backend
+# -------------------------
+
+
+class CompactOrderStore(OrderStore):
+    """
+    Column-oriented in-memory order store.
+
+    - order IDs are a sorted int64 array (or a fixed-width string array if
+      some IDs aren't plain integers), looked up with binary search
+    - every other field is interned: a small table of distinct strings plus
+      one uint8/uint16/... code per row
+
+    A row costs ~8 bytes of key plus a few bytes of codes, instead of
+    several Python objects per cell in a DataFrame.
+    """
+
+    def __init__(self, order_ids, columns: dict[str, tuple[list[str], np.ndarray]]):
+        self._keys = order_ids
+        self._columns = columns
+        self._int_keys = order_ids.dtype.kind == "i"
+
+    @classmethod
+    def from_frame(cls, df) -> "CompactOrderStore":
+        """
+        Build from a pandas DataFrame with order_id + ORDER_FIELDS columns.
+        """
+        import pandas as pd
+
+        ids = df["order_id"].to_numpy()
+        if ids.dtype.kind in "iu":
+            keys = ids.astype(np.int64)
+        else:
+            keys = _integer_keys(ids)
+            if keys is None:
+                keys = ids.astype(str)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+
+        # Duplicate IDs: like a CSV of updates, the last row wins
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        keys, order = keys[last], order[last]
+
+        columns = {}
+        for field in ORDER_FIELDS:
+            codes, uniques = pd.factorize(df[field].astype(str).to_numpy()[order])
+            columns[field] = (
+                [str(u) for u in uniques],
+                codes.astype(_smallest_code_dtype(len(uniques))),
+            )
+        return cls(keys, columns)
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "CompactOrderStore":
+        import pandas as pd
+
+        # Like the original DataFrame loader, numeric order IDs are parsed
+        # as integers (so "00123" and "123" are the same order)
+        df = pd.read_csv(path, dtype={field: str for field in ORDER_FIELDS})
+        return cls.from_frame(df)
+
+    @classmethod
+    def empty(cls) -> "CompactOrderStore":
+        columns = {field: ([], np.empty(0, dtype=np.uint8)) for field in ORDER_FIELDS}
+        return cls(np.empty(0, dtype=np.int64), columns)
+
+    # ---- snapshots: reload without parsing the CSV (or importing pandas) ----
+
+    def save(self, path: Path, source_signature: tuple[int, int] = (0, 0)) -> None:
+        """
+        Write the store's arrays to an .npz snapshot. source_signature
+        (size, mtime_ns) identifies the CSV it was built from.
+        """
+        path = Path(path)
+        arrays = {"keys": self._keys, "source_signature": np.array(source_signature, dtype=np.int64)}
+        for field, (uniques, codes) in self._columns.items():
+            arrays[f"{field}_codes"] = codes
+            arrays[f"{field}_uniques"] = np.array(uniques, dtype=str)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, source_signature: tuple[int, int] | None = None) -> "CompactOrderStore | None":
+        """
+        Load a snapshot; None if it doesn't exist or was built from a
+        different CSV than source_signature.
+        """
+        if not Path(path).exists():
+            return None
+        with np.load(path, allow_pickle=False) as snapshot:
+            if source_signature is not None and tuple(snapshot["source_signature"]) != tuple(source_signature):
+                return None
+            columns = {
+                field: (snapshot[f"{field}_uniques"].tolist(), snapshot[f"{field}_codes"])
+                for field in ORDER_FIELDS
+            }
+            return cls(snapshot["keys"], columns)
+
+    def _to_key(self, order_id: str):
+        """
+        Convert an ID to the key dtype. IDs that can't exist in the store
+        (e.g. non-numeric against an integer key array) become -1.
+        """
+        if not self._int_keys:
+            return order_id
+        if order_id.isdigit() and (order_id == "0" or order_id[0] != "0") and len(order_id) <= 18:
+            return int(order_id)
+        return -1
+
+    def _to_keys(self, order_ids: list[str]):
+        if not self._int_keys:
+            return np.array(order_ids, dtype=str)
+        return np.fromiter((self._to_key(i) for i in order_ids), dtype=np.int64, count=len(order_ids))
+
+    def _positions(self, order_ids: list[str]) -> np.ndarray:
+        """
+        Row position of each ID in the store, or -1 if missing.
+        """
+        if len(self._keys) == 0:
+            return np.full(len(order_ids), -1, dtype=np.int64)
+        keys = self._to_keys(order_ids)
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        return np.where(self._keys[pos] == keys, pos, -1)
+
+    def _row(self, pos: int) -> dict:
+        return {
+            field: uniques[codes[pos]]
+            for field, (uniques, codes) in self._columns.items()
+        }
+
+    def get_order(self, order_id: str) -> dict | None:
+        key = self._to_key(str(order_id))
+        pos = int(self._keys.searchsorted(key))
+        if pos >= len(self._keys) or self._keys[pos] != key:
+            return None
+        return self._row(pos)
+
+    def get_orders(self, order_ids: list[str]) -> list[dict | None]:
+        positions = self._positions([str(order_id) for order_id in order_ids])
+        found = np.flatnonzero(positions >= 0)
+
+        # Gather each column's codes for all found rows in one go
+        gathered = [
+            (field, uniques, codes[positions[found]].tolist())
+            for field, (uniques, codes) in self._columns.items()
+        ]
+        results = [None] * len(order_ids)
+        for j, i in enumerate(found.tolist()):
+            results[i] = {field: uniques[values[j]] for field, uniques, values in gathered}
+        return results
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the store's arrays and string tables.
+        """
+        total = self._keys.nbytes
+        for uniques, codes in self._columns.values():
+            total += codes.nbytes + sum(len(u) + 49 for u in uniques)
+        return total
+
+
+# -------------------------
+# On-disk SQLite backend
+# -------------------------
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    eta TEXT NOT NULL,
+    total TEXT NOT NULL,
+    shipping_provider TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_BATCH = 500
+
+
+def build_sqlite_store(csv_path: Path, db_path: Path, chunksize: int = 100_000) -> None:
+    """
+    Create (or replace) an indexed SQLite order database from a CSV file,
+    streaming the CSV in chunks so it never has to fit in memory.
+    """
+    import pandas as pd
+
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(_SQLITE_SCHEMA)
+        columns = ["order_id", *ORDER_FIELDS]
+        dtypes = {field: str for field in ORDER_FIELDS}
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+            # Same ID normalization as CompactOrderStore.from_csv
+            chunk["order_id"] = chunk["order_id"].astype(str)
+            conn.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)",
+                chunk[columns].astype(str).itertuples(index=False, name=None),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Swap in the finished file so readers never see a half-built database
+    tmp_path.replace(db_path)
+
+
+class SqliteOrderStore(OrderStore):
+    """
+    Order store backed by an indexed SQLite file, for order tables that
+    are too big to keep in RAM. Only the pages that are read get cached.
+
+    Each thread gets its own read-only connection.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def get_order(self, order_id: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT status, eta, total, shipping_provider FROM orders WHERE order_id = ?",
+            (str(order_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(ORDER_FIELDS, row))
+
+    def get_orders(self, order_ids: list[str]) -> list[dict | None]:
+        order_ids = [str(order_id) for order_id in order_ids]
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(order_ids), _SQLITE_BATCH):
+            batch = order_ids[start:start + _SQLITE_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                "SELECT order_id, status, eta, total, shipping_provider "
+                f"FROM orders WHERE order_id IN ({placeholders})",
+                batch,
+            )
+            for order_id, *values in rows:
+                found[order_id] = dict(zip(ORDER_FIELDS, values))
+        return [found.get(order_id) for order_id in order_ids]
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+# -------------------------
+# Live updates on top of a backend
+# -------------------------
+
+
+class OverlayOrderStore(OrderStore):
+    """
+    Wraps a (read-only) backend with a dict of changed orders.
+
+    Lookups check the overlay first, then the base store, and never block.
+    Writers (serialized by a lock) update the overlay in place one key at
+    a time: a single dict item assignment is atomic, and records are
+    always replaced, never modified, so a reader sees either the old or
+    the new version of an order. The base and the overlay that goes with
+    it are published together as one tuple, so replacing the base (and
+    the overlay rebuilt on top of it) is a single assignment too.
+    """
+
+    def __init__(self, base: OrderStore):
+        # (base, overlay, orders in the overlay but not in the base)
+        self._state = (base, {}, 0)
+        self._write_lock = threading.Lock()
+
+    @property
+    def base(self) -> OrderStore:
+        return self._state[0]
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self._state[1])
+
+    def get_order(self, order_id: str) -> dict | None:
+        base, overlay, _ = self._state
+        order_id = str(order_id)
+        record = overlay.get(order_id)
+        if record is not None:
+            return dict(record)
+        return base.get_order(order_id)
+
+    def get_orders(self, order_ids: list[str]) -> list[dict | None]:
+        base, overlay, _ = self._state
+        order_ids = [str(order_id) for order_id in order_ids]
+        if not overlay:
+            return base.get_orders(order_ids)
+
+        found = {order_id: overlay.get(order_id) for order_id in order_ids}
+        missing = [order_id for order_id, record in found.items() if record is None]
+        from_base = dict(zip(missing, base.get_orders(missing)))
+        return [
+            dict(found[order_id]) if found[order_id] is not None else from_base[order_id]
+            for order_id in order_ids
+        ]
+
+    def apply(self, changes: dict[str, dict]) -> int:
+        """
+        Publish changed orders (order_id -> full record), each one
+        atomically. Returns the number of orders applied.
+        """
+        if not changes:
+            return 0
+        changes = {str(order_id): dict(row) for order_id, row in changes.items()}
+        with self._write_lock:
+            base, overlay, n_new = self._state
+            added = [order_id for order_id in changes if order_id not in overlay]
+            n_new += sum(record is None for record in base.get_orders(added))
+            overlay.update(changes)
+            self._state = (base, overlay, n_new)
+        return len(changes)
+
+    def merge(self, updates: dict[str, dict]) -> dict[str, dict]:
+        """
+        Apply partial changes (order_id -> {field: value}) on top of the
+        current records, read and written under one lock. Orders that
+        don't exist are skipped. Returns the updated records.
+        """
+        if not updates:
+            return {}
+        with self._write_lock:
+            base, overlay, _ = self._state
+            updated = _merge_fields(base, overlay, updates)
+            overlay.update(updated)
+        return {order_id: dict(record) for order_id, record in updated.items()}
+
+    def replace_base(
+        self,
+        base: OrderStore,
+        overlay: dict[str, dict] | None = None,
+        updates: dict[str, dict] | None = None,
+    ) -> int:
+        """
+        Atomically swap in a freshly loaded backend, together with the
+        changes to keep on top of it: full records (`overlay`) and partial
+        ones merged over those (`updates`, as in merge()). Lookups see
+        either the old state or the complete new one. Returns the number
+        of orders in the new overlay.
+        """
+        overlay = {str(order_id): dict(row) for order_id, row in (overlay or {}).items()}
+        if updates:
+            overlay.update(_merge_fields(base, overlay, updates))
+        n_new = sum(record is None for record in base.get_orders(list(overlay)))
+        with self._write_lock:
+            self._state = (base, overlay, n_new)
+        return len(overlay)
+
+    def __len__(self) -> int:
+        base, _, n_new = self._state
+        return len(base) + n_new
+
+
+def _merge_fields(base: OrderStore, overlay: dict, updates: dict[str, dict]) -> dict[str, dict]:
+    """
+    New records for partial changes (order_id -> {field: value}) applied
+    on top of `overlay`, then `base`; unknown orders and fields are skipped.
+    """
+    updates = {str(order_id): fields for order_id, fields in updates.items()}
+    missing = [order_id for order_id in updates if order_id not in overlay]
+    from_base = dict(zip(missing, base.get_orders(missing)))
+    merged = {}
+    for order_id, fields in updates.items():
+        current = overlay.get(order_id) or from_base[order_id]
+        if current is None:
+            continue
+        record = dict(current)
+        record.update({k: v for k, v in fields.items() if k in ORDER_FIELDS})
+        merged[order_id] = record
+    return merged
+
+
+# -------------------------
+# Backend selection
+# -------------------------
+
+
+def load_order_store(
+    backend: str,
+    csv_path: Path,
+    db_path: Path | None = None,
+    rebuild: bool = False,
+) -> OrderStore:
+    """
+    Open the configured order store.
+
+    - "compact": load csv_path into a CompactOrderStore (via an .npz
+      snapshot next to the CSV when it's up to date)
+    - "sqlite": open db_path, building it from csv_path first if missing
+      (or always, with rebuild=True)
+
+    A missing CSV gives an empty store rather than a crash.
+    """
+    if backend == "compact":
+        if not Path(csv_path).exists():
+            return CompactOrderStore.empty()
+        # Reuse the .npz snapshot while the CSV is unchanged
+        st = os.stat(csv_path)
+        signature = (st.st_size, st.st_mtime_ns)
+        snapshot_path = Path(csv_path).with_suffix(".compact.npz")
+        store = None if rebuild else CompactOrderStore.load(snapshot_path, signature)
+        if store is None:
+            store = CompactOrderStore.from_csv(csv_path)
+            try:
+                store.save(snapshot_path, signature)
+            except OSError:
+                pass  # read-only data dir: just parse the CSV next time too
+        return store
+
+    if backend == "sqlite":
+        if db_path is None:
+            raise ValueError("The sqlite order store needs a db_path")
+        if rebuild or not Path(db_path).exists():
+            if not Path(csv_path).exists():
+                return CompactOrderStore.empty()
+            build_sqlite_store(csv_path, db_path)
+        return SqliteOrderStore(db_path)
+
+    raise ValueError(f"Unknown order store backend: {backend!r}")
@@ -0,0 +1,314 @@
+import time
+from dataclasses import dataclass, replace
+
+from . import faq, metrics, nlp
+from .cache import LRUCache, message_cache_key
+from .config import (
+    CACHE_MAX_SIZE,
+    CACHE_TTL_SECONDS,
+    CACHE_WARMUP_MESSAGES,
+    CHAT_DEGRADED_REPLY,
+    INTENT_FALLBACK_THRESHOLD,
+)
+from .faq import FaqMatch
+from .features import same_analyzer
+from .handlers import extract_order_id, handle_intent
+
+# Both vectorizers are TF-IDF (1,2)-grams with English stop words, so one
+# analysis pass can feed both. If that ever stops being true (e.g. one of
+# them is retrained with different settings) we analyze separately.
+# Checked once per model version and FAQ tenant.
+_SHARED_ANALYZER_BY_VERSION = {}
+
+
+def _shares_analyzer(
+    bundle: nlp.ModelBundle, tenant: str | None = None, kb: faq.FaqKnowledgeBase | None = None
+) -> bool:
+    shared = _SHARED_ANALYZER_BY_VERSION.get((bundle.version, tenant))
+    if shared is None:
+        shared = same_analyzer(bundle.vectorizer, faq.faq_vectorizer(tenant, kb))
+        _SHARED_ANALYZER_BY_VERSION[(bundle.version, tenant)] = shared
+    return shared
+
+
+@dataclass(frozen=True)
+class MessageAnalysis:
+    """
+    Everything the bot needs to know about one message.
+
+    `faq_match` is only filled in for 'fallback' messages; for every
+    other intent the FAQ search is skipped and it stays None.
+    `model_version` is the intent model the message was classified with.
+    """
+    intent: str
+    confidence: float
+    model_version: str
+    faq_match: FaqMatch | None = None
+
+
+# (model version, tenant, normalized text, threshold, faq_threshold) -> MessageAnalysis
+ANALYSIS_CACHE = LRUCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+
+
+def analyze_message(
+    user_text: str,
+    threshold: float = INTENT_FALLBACK_THRESHOLD,
+    faq_threshold: float = 0.25,
+    tenant: str | None = None,
+) -> MessageAnalysis:
+    """
+    Tokenize the message once and reuse the n-grams for both the intent
+    classifier and the FAQ similarity search (in the tenant's FAQ set;
+    the default one if None).
+
+    Messages a fast-path rule classifies (greetings, a bare order ID,
+    known texts; see nlp.FAST_PATH) skip the model and the caches. Other
+    results are cached by normalized text; messages containing an order
+    ID are never cached.
+    """
+    bundle = nlp.active_model()
+    hit = nlp.FAST_PATH.match(user_text, bundle, threshold)
+    if hit is not None:
+        return MessageAnalysis(intent=hit[0], confidence=hit[1], model_version=bundle.version)
+    key = message_cache_key(user_text)
+    if key is None:
+        return _analyze_uncached(user_text, threshold, faq_threshold, bundle, tenant)
+    return ANALYSIS_CACHE.get_or_compute(
+        (bundle.version, tenant, key, threshold, faq_threshold),
+        lambda: _analyze_uncached(user_text, threshold, faq_threshold, bundle, tenant),
+    )
+
+
+def _analyze_uncached(
+    user_text: str,
+    threshold: float,
+    faq_threshold: float,
+    bundle: nlp.ModelBundle,
+    tenant: str | None = None,
+) -> MessageAnalysis:
+    start = time.perf_counter()
+    ngrams = bundle.analyzer(user_text)
+    X_vec = nlp.featurize_ngrams(ngrams, bundle)
+    metrics.FEATURIZE.observe_since(start)
+    intent, confidence = nlp.classify_vectors(X_vec, threshold, bundle, [user_text])[0]
+
+    if intent != "fallback":
+        return MessageAnalysis(intent=intent, confidence=confidence, model_version=bundle.version)
+
+    if not user_text.strip():
+        faq_match = FaqMatch(answer=None, score=0.0)
+    else:
+        # One knowledge base instance for the whole query
+        kb = faq.knowledge_base(tenant)
+        if _shares_analyzer(bundle, tenant, kb):
+            query_vec = faq.featurize_ngrams(ngrams, kb=kb)
+        else:
+            query_vec = faq.vectorize_query(user_text, kb=kb)
+        faq_match = faq.search_vector(query_vec, faq_threshold, kb=kb)
+
+    return MessageAnalysis(
+        intent=intent, confidence=confidence, model_version=bundle.version, faq_match=faq_match
+    )
+
+
+# -------------------------
+# Full chat turn
+# -------------------------
+
+ORDER_INTENTS = {"order_status", "cancel_order"}
+
+
+@dataclass(frozen=True)
+class ChatTurn:
+    """
+    The outcome of one user message: intent, bot reply and the intent the
+    client should send back as last_intent on the next turn. order_id is
+    the order ID mentioned in an order-related message, if any. degraded
+    marks replies built without the model (see degraded_turn()).
+    """
+    intent: str
+    reply: str
+    next_intent: str | None
+    model_version: str
+    order_id: str | None = None
+    degraded: bool = False
+
+
+def carried_intent(user_text: str, last_intent: str | None) -> str | None:
+    """
+    Simple multi-turn handling: if user sends only digits and last_intent
+    was order-related, keep using last_intent instead of the classifier.
+    """
+    if user_text.isdigit() and last_intent in ORDER_INTENTS:
+        return last_intent
+    return None
+
+
+def classify_turn(
+    user_text: str,
+    last_intent: str | None = None,
+    tenant: str | None = None,
+) -> tuple[str, FaqMatch | None, str]:
+    """
+    First half of run_chat_turn(): the intent of a (stripped) message,
+    for fallbacks its FAQ match, and the version of the model that
+    classified it (pass it on to finish_turn()). Streaming front ends
+    send the intent before the reply is built.
+    """
+    intent = carried_intent(user_text, last_intent)
+    if intent is not None:
+        return intent, None, nlp.active_model_version()
+
+    # One analysis pass gives the intent and, for fallbacks, the FAQ match
+    analysis = analyze_message(user_text, tenant=tenant)
+    return analysis.intent, analysis.faq_match, analysis.model_version
+
+
+def finish_turn(
+    intent: str,
+    user_text: str,
+    faq_match: FaqMatch | None = None,
+    last_order_id: str | None = None,
+    tenant: str | None = None,
+    model_version: str | None = None,
+) -> ChatTurn:
+    """
+    Second half of run_chat_turn(): build the reply for a classified
+    message. model_version is the one classify_turn() returned (the
+    active model's if None), so a model swap in between doesn't
+    mislabel the turn.
+    """
+    reply = handle_intent(intent, user_text, faq_match, last_order_id, tenant)
+    if model_version is None:
+        model_version = nlp.active_model_version()
+
+    # Decide what next_intent the client should remember
+    if intent in ORDER_INTENTS:
+        return ChatTurn(intent, reply, intent, model_version, extract_order_id(user_text))
+    return ChatTurn(intent, reply, None, model_version)
+
+
+def run_chat_turn(
+    user_text: str,
+    last_intent: str | None = None,
+    last_order_id: str | None = None,
+    tenant: str | None = None,
+) -> ChatTurn:
+    """
+    Classify one message (honouring the multi-turn order flow) and build
+    the reply. Plain function of its arguments, so it can run in a worker
+    thread or process.
+
+    last_order_id (from the session, if the client has one) answers
+    follow-ups like "where is it?" that don't repeat the ID. tenant picks
+    the FAQ set fallbacks are answered from (default one if None).
+    """
+    user_text = user_text.strip()
+    intent, faq_match, model_version = classify_turn(user_text, last_intent, tenant)
+    return finish_turn(intent, user_text, faq_match, last_order_id, tenant, model_version)
+
+
+def degraded_turn(
+    user_text: str,
+    last_intent: str | None = None,
+    last_order_id: str | None = None,
+    tenant: str | None = None,
+) -> tuple[ChatTurn, str]:
+    """
+    run_chat_turn() without the model, caches or FAQ search, for when
+    the pipeline is saturated: cheap enough to run on the event loop.
+
+    Returns (turn, source): "fast_path" if a fast-path rule or the
+    multi-turn order flow classified the message (replied as usual),
+    else "canned" (CHAT_DEGRADED_REPLY, keeping last_intent for the next
+    turn). Cancellations are always canned: they wait for the order
+    write log's fsync.
+    """
+    user_text = user_text.strip()
+    bundle = nlp.active_model()
+    intent = carried_intent(user_text, last_intent)
+    if intent is None:
+        hit = nlp.FAST_PATH.match(user_text, bundle, INTENT_FALLBACK_THRESHOLD)
+        intent = hit[0] if hit is not None else None
+    if intent is None or intent == "cancel_order":
+        turn = ChatTurn("fallback", CHAT_DEGRADED_REPLY, last_intent, bundle.version, degraded=True)
+        return turn, "canned"
+    turn = finish_turn(intent, user_text, None, last_order_id, tenant, bundle.version)
+    return replace(turn, degraded=True), "fast_path"
+
+
+def run_chat_batch(items: list[tuple[str, str | None, str | None, str | None]]) -> list[ChatTurn]:
+    """
+    Batch version of run_chat_turn() for (message, last_intent,
+    last_order_id, tenant) tuples. Messages that need the classifier are
+    predicted together in one call.
+    """
+    texts = [message.strip() for message, _, _, _ in items]
+    intents = [
+        carried_intent(text, last_intent)
+        for text, (_, last_intent, _, _) in zip(texts, items)
+    ]
+
+    # Vectorize + classify everything that was not carried over in one go
+    bundle = nlp.active_model()
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+    predicted = nlp.predict_intents([texts[i] for i in pending], bundle=bundle)
+    for i, intent in zip(pending, predicted):
+        intents[i] = intent
+
+    return [
+        finish_turn(
+            intent, text, last_order_id=last_order_id, tenant=tenant, model_version=bundle.version
+        )
+        for intent, text, (_, _, last_order_id, tenant) in zip(intents, texts, items)
+    ]
+
+
+# -------------------------
+# Cache management
+# -------------------------
+
+
+def cache_stats() -> dict:
+    """
+    Hit / miss / eviction counters for every reply-path cache.
+    """
+    return {
+        "analysis": ANALYSIS_CACHE.stats(),
+        "intent": nlp.INTENT_CACHE.stats(),
+        "faq": faq.FAQ_CACHE.stats(),
+    }
+
+
+def clear_caches() -> None:
+    """
+    Drop all cached results, e.g. after the model or FAQ data changes.
+    """
+    ANALYSIS_CACHE.clear()
+    nlp.INTENT_CACHE.clear()
+    faq.FAQ_CACHE.clear()
+
+
+def warm_caches(messages: list[str] | None = None) -> int:
+    """
+    Pre-compute results for common messages so they are cache hits from
+    the first request. Returns the number of messages warmed.
+    """
+    if messages is None:
+        messages = CACHE_WARMUP_MESSAGES
+    for message in messages:
+        analysis = analyze_message(message)
+        nlp.predict_intent(message)
+        if analysis.intent == "fallback":
+            faq.semantic_faq_search(message)
+    return len(messages)
+
+
+def _on_model_swap(bundle: nlp.ModelBundle) -> None:
+    # Old-version entries can never be hit again (the version is part of
+    # the key): free them and pre-compute the common messages for the new one
+    ANALYSIS_CACHE.clear()
+    warm_caches()
+
+
+nlp.on_model_swap(_on_model_swap)
@@ -0,0 +1,280 @@
+import cProfile
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from .config import (
+    PROFILE_DIR,
+    PROFILE_ENABLED,
+    PROFILE_HEADER,
+    PROFILE_MAX_FILES,
+    PROFILE_MIN_LATENCY_SECONDS,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_INTERVAL_SECONDS,
+    PROFILE_SAMPLE_RATE,
+)
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_SUFFIXES = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+# cProfile can only run one profile at a time on Python 3.12+ (it hooks
+# the whole interpreter); concurrent requests run unprofiled instead
+_CPROFILE_LOCK = threading.Lock()
+
+
+# -------------------------
+# Profilers (run in the pipeline worker)
+# -------------------------
+
+
+def _frame_label(code, cache: dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        # No ";" or spaces: collapsed-stack lines are "a;b;c <count>"
+        label = f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ":").replace(" ", "_")
+        cache[code] = label
+    return label
+
+
+class _StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    helper thread and counts identical stacks (root first). Frames from
+    `root` up (the caller's and the thread's own) are left out.
+    """
+
+    def __init__(self, thread_id: int, interval: float, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self._labels = {}
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        labels = self._labels
+        root = self.root
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not root:
+                stack.append(_frame_label(frame.f_code, labels))
+                frame = frame.f_back
+            # Woken up just as the call returned: don't count the wait for us
+            if stack and not self._done.is_set():
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+
+
+def profiled_call(mode: str, interval: float, fn, *args):
+    """
+    Run fn(*args) under a profiler; returns (result, profile) where
+    profile is a pstats dict ("cprofile"), a collapsed stack -> samples
+    dict ("sample"), or None if it couldn't be profiled. Module-level so
+    process-pool workers can run it.
+    """
+    if mode == "sample":
+        with _StackSampler(threading.get_ident(), interval, root=sys._getframe()) as sampler:
+            result = fn(*args)
+        return result, dict(sampler.stacks)
+
+    if not _CPROFILE_LOCK.acquire(blocking=False):
+        return fn(*args), None
+    try:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args)
+        profiler.create_stats()
+        return result, profiler.stats
+    finally:
+        _CPROFILE_LOCK.release()
+
+
+# -------------------------
+# Request profiler (api.py)
+# -------------------------
+
+
+class RequestProfiler:
+    """
+    Picks the requests to profile and writes their profiles.
+
+    choose() is called for every request; while profiling is off it is a
+    single attribute check. While on, a request is profiled if it carries
+    the header (whose value may name the mode) or with probability
+    sample_rate. save() writes one file per profiled request that took at
+    least min_latency:
+
+        <UTC time>-<endpoint>-<intent>-<latency>ms-<n>.pstats     (cprofile)
+        <UTC time>-<endpoint>-<intent>-<latency>ms-<n>.collapsed  (sample)
+
+    .pstats files open with `python -m pstats <file>` or snakeviz;
+    .collapsed files with flamegraph.pl or speedscope.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = PROFILE_ENABLED,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        header: str = PROFILE_HEADER,
+        mode: str = PROFILE_MODE,
+        interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS,
+        min_latency: float = PROFILE_MIN_LATENCY_SECONDS,
+        profile_dir: str | Path = PROFILE_DIR,
+        max_files: int = PROFILE_MAX_FILES,
+    ):
+        self.enabled = False
+        self.header = header
+        self.profile_dir = Path(profile_dir)
+        self.max_files = max_files
+        self.until = None
+        self.configure(
+            enabled=enabled, sample_rate=sample_rate, mode=mode,
+            interval=interval, min_latency=min_latency,
+        )
+
+        self._lock = threading.Lock()
+        # Oldest first, including profiles written before a restart
+        self._files = deque(
+            sorted(p for p in self.profile_dir.glob("*") if p.suffix in (".pstats", ".collapsed"))
+        )
+        self._seq = 0
+        self.profiled = 0
+        self.written = 0
+        self.too_fast = 0
+        self.unprofiled = 0
+        self.errors = 0
+        self.last_error = None
+        self.recent = deque(maxlen=20)
+
+    def configure(
+        self,
+        enabled: bool | None = None,
+        sample_rate: float | None = None,
+        mode: str | None = None,
+        interval: float | None = None,
+        min_latency: float | None = None,
+        duration: float | None = None,
+    ) -> None:
+        """
+        Change any of the settings; duration (seconds) turns profiling
+        off again automatically. Raises ValueError for bad values.
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r} (expected one of {PROFILE_MODES})")
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if interval is not None and interval <= 0:
+            raise ValueError("interval must be positive")
+        if mode is not None:
+            self.mode = mode
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if interval is not None:
+            self.interval = interval
+        if min_latency is not None:
+            self.min_latency = max(0.0, min_latency)
+        if enabled is not None:
+            self.until = time.time() + duration if enabled and duration else None
+            self.enabled = enabled
+
+    def choose(self, header_value: str | None = None) -> str | None:
+        """
+        The profile mode for a request, or None to run it unprofiled.
+        """
+        if not self.enabled:
+            return None
+        if self.until is not None and time.time() >= self.until:
+            self.enabled = False
+            return None
+        if header_value:
+            return header_value if header_value in PROFILE_MODES else self.mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def save(self, mode: str, profile, endpoint: str, intent: str, latency: float) -> Path | None:
+        """
+        Write one request's profile, tagged with its endpoint, intent and
+        latency (seconds). Returns the file, or None if the request was
+        faster than min_latency or couldn't be profiled.
+        """
+        self.profiled += 1
+        if profile is None:
+            self.unprofiled += 1
+            return None
+        if latency < self.min_latency:
+            self.too_fast += 1
+            return None
+
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = "-".join([
+            stamp, endpoint.strip("/").replace("/", "_"), intent, f"{latency * 1000:.0f}ms", str(seq)
+        ]) + PROFILE_SUFFIXES[mode]
+        path = self.profile_dir / name
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            if mode == "cprofile":
+                # The format pstats.Stats(<file>) reads
+                with open(path, "wb") as f:
+                    marshal.dump(profile, f)
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in sorted(profile.items()):
+                        f.write(f"{stack} {count}\n")
+        except OSError as exc:
+            self.errors += 1
+            self.last_error = repr(exc)
+            return None
+
+        with self._lock:
+            self._files.append(path)
+            while len(self._files) > self.max_files:
+                self._files.popleft().unlink(missing_ok=True)
+        self.written += 1
+        self.recent.appendleft({
+            "file": str(path),
+            "endpoint": endpoint,
+            "intent": intent,
+            "latency_ms": round(latency * 1000, 2),
+            "mode": mode,
+        })
+        return path
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "until": self.until,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "header": self.header,
+            "sample_interval_seconds": self.interval,
+            "min_latency_seconds": self.min_latency,
+            "profile_dir": str(self.profile_dir),
+            "profiled": self.profiled,
+            "written": self.written,
+            "too_fast": self.too_fast,
+            "unprofiled": self.unprofiled,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "recent": list(self.recent),
+        }
+
+
+# Shared by the API endpoints
+REQUEST_PROFILER = RequestProfiler()
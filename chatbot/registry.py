@@ -0,0 +1,182 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Layout:
+#   models/registry/manifest.json
+#   models/registry/<version>/intent_classifier.pkl
+#   models/registry/<version>/vectorizer.pkl
+#   models/registry/<version>/compact/     (sklearn-free artifact, optional)
+#   models/registry/<version>/cascade/     (second-stage model files, optional)
+MODEL_FILES = ("intent_classifier.pkl", "vectorizer.pkl")
+COMPACT_DIR_NAME = "compact"
+CASCADE_DIR_NAME = "cascade"
+MANIFEST_NAME = "manifest.json"
+
+
+class ModelRegistry:
+    """
+    Versioned model directory with a JSON manifest.
+
+    The manifest lists every published version and which one is active,
+    so every server process (and every restart) agrees on what to serve.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def read_manifest(self) -> dict:
+        if not self.exists():
+            return {"active": None, "previous": None, "versions": []}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        # Atomic on POSIX and Windows: readers see the old or new manifest
+        os.replace(tmp_path, self.manifest_path)
+
+    def versions(self) -> list[str]:
+        return [entry["version"] for entry in self.read_manifest()["versions"]]
+
+    def version_dir(self, version: str) -> Path:
+        return self.root / version
+
+    def publish(
+        self,
+        source_dir: Path,
+        version: str | None = None,
+        metadata: dict | None = None,
+        activate: bool = False,
+    ) -> str:
+        """
+        Copy the model files from source_dir into a new version directory
+        and add it to the manifest. Returns the version name.
+        """
+        if version is None:
+            version = datetime.now().strftime("v%Y%m%d-%H%M%S")
+
+        with self._lock:
+            manifest = self.read_manifest()
+            if version in [entry["version"] for entry in manifest["versions"]]:
+                raise ValueError(f"Model version {version!r} already exists")
+
+            target = self.version_dir(version)
+            target.mkdir(parents=True, exist_ok=False)
+            for name in MODEL_FILES:
+                shutil.copy2(Path(source_dir) / name, target / name)
+            compact_dir = Path(source_dir) / COMPACT_DIR_NAME
+            if compact_dir.is_dir():
+                shutil.copytree(compact_dir, target / COMPACT_DIR_NAME)
+            cascade_dir = Path(source_dir) / CASCADE_DIR_NAME
+            if cascade_dir.is_dir():
+                shutil.copytree(cascade_dir, target / CASCADE_DIR_NAME)
+
+            manifest["versions"].append({
+                "version": version,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                **(metadata or {}),
+            })
+            if activate or manifest["active"] is None:
+                manifest["previous"] = manifest["active"]
+                manifest["active"] = version
+            self._write_manifest(manifest)
+        return version
+
+    def set_active(self, version: str) -> None:
+        """
+        Record `version` as the one to serve (the old one becomes 'previous').
+        """
+        with self._lock:
+            manifest = self.read_manifest()
+            if version not in [entry["version"] for entry in manifest["versions"]]:
+                raise KeyError(f"Unknown model version {version!r}")
+            if manifest["active"] != version:
+                manifest["previous"] = manifest["active"]
+                manifest["active"] = version
+                self._write_manifest(manifest)
+
+    def load(self, version: str):
+        """
+        Unpickle (classifier, vectorizer) for a version.
+        """
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version {version!r}")
+        return load_model_files(self.version_dir(version))
+
+
+def load_model_files(model_dir: Path):
+    """
+    Unpickle (classifier, vectorizer) from a directory.
+    """
+    model_dir = Path(model_dir)
+    with open(model_dir / "intent_classifier.pkl", "rb") as f:
+        model = pickle.load(f)
+    with open(model_dir / "vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    return model, vectorizer
+
+
+class ManifestWatcher:
+    """
+    Polls the registry manifest and calls on_change(version) when the
+    active version changes, so a swap done through one server process is
+    picked up by all the others.
+    """
+
+    def __init__(self, registry: ModelRegistry, on_change, interval: float = 10.0):
+        self.registry = registry
+        self.interval = interval
+        self._on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+        self._mtime = None
+        self.errors = 0
+        self.last_error = None
+
+    def check_once(self) -> None:
+        try:
+            mtime = os.stat(self.registry.manifest_path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        active = self.registry.read_manifest()["active"]
+        if active:
+            self._on_change(active)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as exc:  # a bad manifest must not kill the watcher
+                self.errors += 1
+                self.last_error = repr(exc)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.registry.exists():
+            self._mtime = os.stat(self.registry.manifest_path).st_mtime
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
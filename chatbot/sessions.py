@@ -0,0 +1,339 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+from .config import (
+    SESSION_DB_PATH,
+    SESSION_MAX_SESSIONS,
+    SESSION_SHARDS,
+    SESSION_STORE_BACKEND,
+    SESSION_TTL_SECONDS,
+)
+
+
+def new_session_id() -> str:
+    """
+    Random, URL-safe session ID (128 bits) issued by the server.
+    """
+    return secrets.token_urlsafe(16)
+
+
+class SessionState(NamedTuple):
+    """
+    Per-conversation record: a plain tuple, so hundreds of thousands of
+    them stay cheap. Stores replace records rather than mutate them.
+    """
+    last_intent: str | None = None
+    # Most recent order ID the user mentioned, for "where is it?" follow-ups
+    last_order_id: str | None = None
+    turns: int = 0
+    created_at: float = 0.0
+    # Set by the store on every put(); TTL counts from here
+    updated_at: float = 0.0
+
+    def advance(self, turn) -> "SessionState":
+        """
+        The state after a chat turn (a pipeline.ChatTurn).
+        """
+        return SessionState(
+            turn.next_intent,
+            turn.order_id or self.last_order_id,
+            self.turns + 1,
+            self.created_at,
+            self.updated_at,
+        )
+
+
+_make_state = SessionState._make
+
+
+# -------------------------
+# Backend interface
+# -------------------------
+
+
+class SessionStore:
+    """
+    Session ID -> SessionState, with expiry after `ttl` seconds without
+    a put(). get() returns None for unknown and expired sessions.
+
+    A backend for an external store (Redis, memcached, ...) implements
+    these methods; the in-memory store below is the local stand-in.
+    """
+
+    def get(self, session_id: str) -> SessionState | None:
+        raise NotImplementedError
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def create(self) -> tuple[str, SessionState]:
+        """
+        Start a new, empty session; returns its ID and state.
+        """
+        session_id = new_session_id()
+        state = SessionState(created_at=time.time())
+        self.put(session_id, state)
+        return session_id, state
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"size": len(self)}
+
+
+# -------------------------
+# In-memory backend
+# -------------------------
+
+
+class _Shard:
+    __slots__ = ("data", "lock", "hits", "misses", "expirations", "evictions")
+
+    def __init__(self):
+        # session_id -> SessionState, oldest updated_at first
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions in process memory, split into `shards` independently
+    locked LRU maps so concurrent requests rarely wait on each other.
+
+    Each shard is kept in put() order, which is also expiry order (the
+    TTL restarts on every put), so expired and least recently used
+    sessions are both dropped from the front: put() is amortized O(1)
+    and no background sweeper is needed. `max_sessions` is split evenly
+    across shards.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        ttl: float = SESSION_TTL_SECONDS,
+        shards: int = SESSION_SHARDS,
+        clock=time.time,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._clock = clock
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._shard_size = max(1, -(-max_sessions // len(self._shards)))
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get(self, session_id: str) -> SessionState | None:
+        shard = self._shard(session_id)
+        with shard.lock:
+            state = shard.data.get(session_id)
+            if state is None:
+                shard.misses += 1
+                return None
+            if state.updated_at + self.ttl <= self._clock():
+                del shard.data[session_id]
+                shard.expirations += 1
+                shard.misses += 1
+                return None
+            shard.hits += 1
+            return state
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        now = self._clock()
+        state = _make_state(state[:-1] + (now,))  # cheaper than _replace()
+        shard = self._shard(session_id)
+        with shard.lock:
+            data = shard.data
+            data[session_id] = state
+            data.move_to_end(session_id)
+
+            # Oldest first: stop at the first session that is still live
+            cutoff = now - self.ttl
+            while data:
+                oldest = next(iter(data.values()))
+                if oldest.updated_at > cutoff:
+                    break
+                data.popitem(last=False)
+                shard.expirations += 1
+            while len(data) > self._shard_size:
+                data.popitem(last=False)
+                shard.evictions += 1
+
+    def delete(self, session_id: str) -> bool:
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.data.pop(session_id, None) is not None
+
+    def sweep(self) -> int:
+        """
+        Drop every expired session now (put() only cleans its own shard).
+        Returns how many were dropped.
+        """
+        cutoff = self._clock() - self.ttl
+        dropped = 0
+        for shard in self._shards:
+            with shard.lock:
+                data = shard.data
+                while data and next(iter(data.values())).updated_at <= cutoff:
+                    data.popitem(last=False)
+                    shard.expirations += 1
+                    dropped += 1
+        return dropped
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self._shards)
+
+    def stats(self) -> dict:
+        totals = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+        for shard in self._shards:
+            with shard.lock:
+                for name in totals:
+                    totals[name] += getattr(shard, name)
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "shards": len(self._shards),
+            **totals,
+        }
+
+
+# -------------------------
+# SQLite backend
+# -------------------------
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite file, shared by every process that opens
+    it: with serve.py's pre-forked workers a conversation continues
+    whichever worker gets the next request.
+
+    Expired sessions are skipped on read; every `sweep_every` puts the
+    expired rows and the least recently updated rows beyond
+    `max_sessions` are deleted. Each thread gets its own connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path = SESSION_DB_PATH,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        ttl: float = SESSION_TTL_SECONDS,
+        sweep_every: int = 1000,
+        clock=time.time,
+    ):
+        self.db_path = Path(db_path)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._clock = clock
+        self._local = threading.local()
+        self._puts = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection opened before serve.py forked belongs to the parent
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id: str) -> SessionState | None:
+        row = self._conn().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, self._clock() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        return SessionState(*json.loads(row[0]))
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        now = self._clock()
+        state = state._replace(updated_at=now)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), now),
+            )
+        self._puts += 1
+        if self._puts % self.sweep_every == 0:
+            self.sweep()
+
+    def delete(self, session_id: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def sweep(self) -> int:
+        """
+        Delete expired sessions and trim to max_sessions; returns how many.
+        """
+        with self._conn() as conn:
+            expired = conn.execute(
+                "DELETE FROM sessions WHERE updated_at <= ?", (self._clock() - self.ttl,)
+            ).rowcount
+            evicted = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+        return expired + evicted
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE updated_at > ?", (self._clock() - self.ttl,)
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "size": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "path": str(self.db_path),
+        }
+
+
+def load_session_store(backend: str = SESSION_STORE_BACKEND, **kwargs) -> SessionStore:
+    """
+    Open the configured session store ("memory" or "sqlite").
+    """
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SqliteSessionStore(**kwargs)
+    raise ValueError(f"Unknown session store backend: {backend!r}")
+
+
+SESSION_STORE = load_session_store()
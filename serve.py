@@ -0,0 +1,127 @@
+"""
+Pre-fork server for api.py.
+
+Loads the intent model, FAQ index and order store once in this (parent)
+process, binds the listening socket, then forks the workers. The workers
+inherit the already-loaded data copy-on-write instead of each rebuilding
+it, so memory grows by a small per-worker delta rather than a full copy.
+
+- NumPy arrays (order store, FAQ postings, compact model) are shared
+  until someone writes to them; the model / index artifacts are
+  memory-mapped, so they sit in the shared page cache anyway
+- gc.freeze() moves everything loaded so far out of the collector's
+  reach, so a collection in a worker doesn't dirty the shared pages
+- Background threads (order refresher, model watcher, executor pool) are
+  started per worker by the API lifespan, after the fork
+
+Usage:
+    python serve.py                      # SERVE_WORKERS workers (default: one per core)
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from chatbot.config import SERVE_HOST, SERVE_PORT, SERVE_WORKERS
+
+
+def preload():
+    """
+    Import the app and load everything workers would otherwise load on
+    their own (models and orders load on import; the FAQ index lazily).
+    """
+    import api
+    from chatbot import faq, pipeline
+
+    faq.knowledge_base()
+    pipeline.warm_caches()
+    return api.app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    # The parent's handlers forward signals; workers let uvicorn handle them
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, log_level)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> None:
+    start = time.perf_counter()
+    app = preload()
+    # Keep the collector away from everything loaded so far (see above)
+    gc.collect()
+    gc.freeze()
+    print(f"[serve] models and indexes loaded in {time.perf_counter() - start:.2f}s")
+
+    sock = bind_socket(host, port)
+    children = {spawn(app, sock, log_level) for _ in range(workers)}
+    print(f"[serve] {workers} worker(s) on http://{host}:{port} (pids {sorted(children)})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Supervise: restart workers that die while we're not shutting down
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"[serve] worker {pid} exited ({status}), restarting", file=sys.stderr)
+            children.add(spawn(app, sock, log_level))
+
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for api.py")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
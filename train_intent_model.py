@@ -1,24 +1,44 @@
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import classification_report
+from sklearn.pipeline import make_union
+import argparse
+import os
 import pickle
+import resource
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+from chatbot.compact_model import export_compact_model
+from chatbot.features import HashingTfidfVectorizer
+from chatbot.registry import CASCADE_DIR_NAME, COMPACT_DIR_NAME, ModelRegistry
+
 # Paths
 DATA_PATH = Path("data/intents.csv")
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(exist_ok=True)
 
-def load_data():
-    print("DATA_PATH:", DATA_PATH)
-    print("Exists?:", DATA_PATH.exists())
-    df = pd.read_csv(DATA_PATH)
+def load_data(data_path: Path = DATA_PATH):
+    print("DATA_PATH:", data_path)
+    print("Exists?:", data_path.exists())
+    df = pd.read_csv(data_path)
     # columns: text, intent
     return df["text"], df["intent"]
 
-def train():
-    X, y = load_data()
+def train(
+    register: bool = False,
+    version: str | None = None,
+    activate: bool = False,
+    data_path: Path = DATA_PATH,
+    model_dir: Path = MODEL_DIR,
+    cascade: bool = False,
+):
+    X, y = load_data(data_path)
 
     # Convert ALL text to TF-IDF features (no train_test_split here)
     vectorizer = TfidfVectorizer(
@@ -37,15 +57,291 @@ def train():
     print("Training set performance (on all data):")
     print(classification_report(y, y_pred))
 
-    # Save model and vectorizer
-    with open(MODEL_DIR / "intent_classifier.pkl", "wb") as f:
+    save_model(clf, vectorizer, model_dir)
+
+    # sklearn-free copy for serving (INTENT_MODEL_FORMAT = "compact")
+    export_compact_model(clf, vectorizer, model_dir / COMPACT_DIR_NAME)
+    print(f"Saved compact inference artifact to '{model_dir / COMPACT_DIR_NAME}/'")
+
+    if cascade:
+        stage_clf, stage_vectorizer = train_cascade_stage(X, y)
+        print(f"Cascade stage 2 training accuracy: {stage_clf.score(stage_vectorizer.transform(X), y):.3f}")
+        save_model(stage_clf, stage_vectorizer, model_dir / CASCADE_DIR_NAME)
+    else:
+        remove_stale_cascade(model_dir)
+
+    # Optionally publish a new version that running servers can swap to
+    if register:
+        register_model(
+            model_dir,
+            version,
+            {"n_examples": int(len(y)), "classes": [str(c) for c in clf.classes_], "cascade": cascade},
+            activate,
+        )
+
+def train_cascade_stage(X, y):
+    """
+    Second cascade stage: word (1,2)-grams without stop-word removal plus
+    character (2,5)-grams, so typos and short messages still get signal,
+    and a less regularized LogisticRegression. Several times slower per
+    message than the first stage; only sees what that one is unsure about.
+    """
+    vectorizer = make_union(
+        TfidfVectorizer(lowercase=True, ngram_range=(1, 2), sublinear_tf=True),
+        TfidfVectorizer(lowercase=True, analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True),
+    )
+    clf = LogisticRegression(C=10, max_iter=2000)
+    clf.fit(vectorizer.fit_transform(X), y)
+    return clf, vectorizer
+
+def remove_stale_cascade(model_dir: Path):
+    # A stage trained for older model files must not be paired with new ones
+    stale = model_dir / CASCADE_DIR_NAME
+    if stale.is_dir():
+        shutil.rmtree(stale)
+        print(f"Removed '{stale}/' (train with --cascade to rebuild it)")
+
+def save_model(clf, vectorizer, model_dir: Path):
+    model_dir.mkdir(parents=True, exist_ok=True)
+    with open(model_dir / "intent_classifier.pkl", "wb") as f:
         pickle.dump(clf, f)
 
-    with open(MODEL_DIR / "vectorizer.pkl", "wb") as f:
+    with open(model_dir / "vectorizer.pkl", "wb") as f:
         pickle.dump(vectorizer, f)
 
-    print("\nSaved model to 'models/intent_classifier.pkl'")
-    print("Saved vectorizer to 'models/vectorizer.pkl'")
+    print(f"\nSaved model to '{model_dir / 'intent_classifier.pkl'}'")
+    print(f"Saved vectorizer to '{model_dir / 'vectorizer.pkl'}'")
+
+def register_model(model_dir: Path, version: str | None, metadata: dict, activate: bool):
+    registry = ModelRegistry(MODEL_DIR / "registry")
+    version = registry.publish(model_dir, version=version, metadata=metadata, activate=activate)
+    print(f"Registered model version '{version}' in 'models/registry/'")
+    if activate:
+        print("Marked it active: servers watching the registry will switch to it")
+
+
+# -------------------------
+# Streaming / out-of-core training (--streaming)
+# -------------------------
+#
+# Memory depends on --chunk-size and --n-features, not on the number of
+# rows or distinct n-grams:
+#   pass 1:  classes + document counts per CV fold (hashed n-grams)
+#   CV:      one process per (alpha, fold): partial_fit over the chunks
+#            of the other folds for --epochs passes, then score the fold
+#   final:   the best alpha trained on every row
+# Rows are assigned to folds by row number (row % folds) and shuffled
+# within each chunk; shuffle files that are sorted by intent first.
+
+def read_chunks(data_path: Path, chunk_size: int):
+    """
+    Yield (first row number, texts, intents) for each chunk of the CSV.
+    """
+    start = 0
+    reader = pd.read_csv(
+        data_path, usecols=["text", "intent"], dtype=str,
+        keep_default_na=False, chunksize=chunk_size,
+    )
+    for chunk in reader:
+        yield start, chunk["text"].to_numpy(), chunk["intent"].to_numpy()
+        start += len(chunk)
+
+def scan(data_path: Path, chunk_size: int, n_features: int, folds: int) -> dict:
+    """
+    Pass 1: classes, row count and per-fold document counts.
+    """
+    hasher = HashingTfidfVectorizer(n_features=n_features).hasher
+    classes = set()
+    doc_counts = np.zeros((folds, n_features), dtype=np.int64)
+    fold_rows = np.zeros(folds, dtype=np.int64)
+    for start, texts, intents in read_chunks(data_path, chunk_size):
+        classes.update(intents)
+        X = hasher.transform(texts)
+        fold_ids = np.arange(start, start + len(texts)) % folds
+        for fold in range(folds):
+            rows = X[fold_ids == fold]
+            doc_counts[fold] += np.bincount(rows.indices, minlength=n_features)
+            fold_rows[fold] += rows.shape[0]
+    return {
+        "classes": np.array(sorted(classes)),
+        "doc_counts": doc_counts,
+        "fold_rows": fold_rows,
+    }
+
+def fit_streaming(
+    data_path: Path,
+    vectorizer: HashingTfidfVectorizer,
+    classes: np.ndarray,
+    alpha: float,
+    epochs: int,
+    chunk_size: int,
+    holdout: tuple[int, int] | None = None,
+    seed: int = 0,
+) -> SGDClassifier:
+    """
+    Logistic regression by SGD, one partial_fit() per chunk and epoch.
+    holdout=(fold, folds) skips that fold's rows.
+    """
+    clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for start, texts, intents in read_chunks(data_path, chunk_size):
+            if holdout is not None:
+                fold, folds = holdout
+                keep = np.arange(start, start + len(texts)) % folds != fold
+                texts, intents = texts[keep], intents[keep]
+            if len(texts) == 0:
+                continue
+            order = rng.permutation(len(texts))
+            clf.partial_fit(vectorizer.transform(texts[order]), intents[order], classes=classes)
+    return clf
+
+def score_fold(data_path: Path, vectorizer, clf, chunk_size: int, fold: int, folds: int) -> tuple[int, int]:
+    correct = total = 0
+    for start, texts, intents in read_chunks(data_path, chunk_size):
+        held = np.arange(start, start + len(texts)) % folds == fold
+        if held.any():
+            predicted = clf.predict(vectorizer.transform(texts[held]))
+            correct += int((predicted == intents[held]).sum())
+            total += int(held.sum())
+    return correct, total
+
+# Set once per CV worker process by the pool initializer
+_CV = {}
+
+def _init_cv_worker(settings: dict):
+    _CV.update(settings)
+
+def _cv_job(alpha: float, fold: int) -> tuple[float, int, int, int]:
+    s = _CV
+    scanned = s["scan"]
+    # IDF from the training folds only
+    vectorizer = HashingTfidfVectorizer(n_features=s["n_features"]).set_counts(
+        scanned["fold_rows"].sum() - scanned["fold_rows"][fold],
+        scanned["doc_counts"].sum(axis=0) - scanned["doc_counts"][fold],
+    )
+    clf = fit_streaming(
+        s["data_path"], vectorizer, scanned["classes"], alpha, s["epochs"],
+        s["chunk_size"], holdout=(fold, s["folds"]),
+    )
+    correct, total = score_fold(s["data_path"], vectorizer, clf, s["chunk_size"], fold, s["folds"])
+    return alpha, fold, correct, total
+
+def train_streaming(
+    register: bool = False,
+    version: str | None = None,
+    activate: bool = False,
+    data_path: Path = DATA_PATH,
+    model_dir: Path = MODEL_DIR,
+    chunk_size: int = 100_000,
+    n_features: int = 2 ** 18,
+    epochs: int = 5,
+    alphas: tuple = (1e-5, 1e-4, 1e-3),
+    folds: int = 5,
+    jobs: int | None = None,
+):
+    print("DATA_PATH:", data_path)
+    scanned = scan(data_path, chunk_size, n_features, folds)
+    n_rows = int(scanned["fold_rows"].sum())
+    print(f"{n_rows} rows, {len(scanned['classes'])} intents")
+
+    # Cross-validated search over alpha, one process per (alpha, fold)
+    settings = {
+        "scan": scanned, "data_path": data_path, "n_features": n_features,
+        "epochs": epochs, "chunk_size": chunk_size, "folds": folds,
+    }
+    jobs = jobs or os.cpu_count()
+    grid = [(alpha, fold) for alpha in alphas for fold in range(folds)]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_cv_worker, initargs=(settings,)) as pool:
+        results = list(pool.map(_cv_job, *zip(*grid)))
+
+    accuracy = {}
+    for alpha in alphas:
+        correct = sum(c for a, _, c, _ in results if a == alpha)
+        total = sum(t for a, _, _, t in results if a == alpha)
+        accuracy[alpha] = correct / total if total else 0.0
+        print(f"alpha={alpha:g}: {folds}-fold CV accuracy {accuracy[alpha]:.3f}")
+    best = max(alphas, key=lambda alpha: accuracy[alpha])
+    print(f"Best alpha: {best:g}")
+
+    # Final model on every row (per-fold counts no longer needed)
+    classes = scanned["classes"]
+    vectorizer = HashingTfidfVectorizer(n_features=n_features).set_counts(
+        n_rows, scanned["doc_counts"].sum(axis=0)
+    )
+    del scanned, settings
+    clf = fit_streaming(data_path, vectorizer, classes, best, epochs, chunk_size)
+    vectorizer.finalize()
+    # Hashed columns no row used stay exactly 0: store coef_ sparse
+    clf.sparsify()
+
+    save_model(clf, vectorizer, model_dir)
+    remove_stale_cascade(model_dir)
+    # The compact format needs an explicit vocabulary: serve the pickles
+    stale = model_dir / COMPACT_DIR_NAME
+    if stale.is_dir():
+        shutil.rmtree(stale)
+        print(f"Removed '{stale}/' (the hashing model is served from the pickles)")
+
+    if register:
+        register_model(
+            model_dir,
+            version,
+            {
+                "n_examples": n_rows,
+                "classes": [str(c) for c in clf.classes_],
+                "training": "streaming",
+                "alpha": best,
+                "cv_accuracy": accuracy[best],
+            },
+            activate,
+        )
+
+def report_resources(start: float, streaming: bool):
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux; children = the CV worker processes
+    main_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    line = f"\nTraining time: {elapsed:.1f}s, peak memory: {main_mb:.0f}MB"
+    if streaming:
+        workers_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        line += f" (largest CV worker: {workers_mb:.0f}MB)"
+    print(line)
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train the intent classifier.")
+    parser.add_argument("--register", action="store_true",
+                        help="also publish the model as a new version in models/registry/")
+    parser.add_argument("--version", default=None,
+                        help="version name for --register (default: timestamp)")
+    parser.add_argument("--activate", action="store_true",
+                        help="with --register, make the new version the active one")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="labeled CSV (text, intent)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR, help="where to write the model files")
+    parser.add_argument("--cascade", action="store_true",
+                        help="also train a slower, more accurate second-stage model (<model dir>/cascade/)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="out-of-core training: chunked CSV, hashed features, SGD, parallel CV")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="--streaming: rows per chunk")
+    parser.add_argument("--n-features", type=int, default=2 ** 18,
+                        help="--streaming: hashed feature columns (SGD weights: intents x this x 8 bytes)")
+    parser.add_argument("--epochs", type=int, default=5, help="--streaming: passes over the data")
+    parser.add_argument("--alphas", type=float, nargs="+", default=[1e-5, 1e-4, 1e-3],
+                        help="--streaming: regularization strengths to cross-validate")
+    parser.add_argument("--folds", type=int, default=5, help="--streaming: CV folds")
+    parser.add_argument("--jobs", type=int, default=None, help="--streaming: CV processes (default: one per core)")
+    args = parser.parse_args()
+    if args.cascade and args.streaming:
+        parser.error("--cascade needs the in-memory mode (character n-grams have no streaming version)")
+
+    start = time.perf_counter()
+    if args.streaming:
+        train_streaming(
+            register=args.register, version=args.version, activate=args.activate,
+            data_path=args.data, model_dir=args.model_dir, chunk_size=args.chunk_size,
+            n_features=args.n_features, epochs=args.epochs, alphas=tuple(args.alphas),
+            folds=args.folds, jobs=args.jobs,
+        )
+    else:
+        train(register=args.register, version=args.version, activate=args.activate,
+              data_path=args.data, model_dir=args.model_dir, cascade=args.cascade)
+    report_resources(start, args.streaming)